@@ -1,9 +1,11 @@
+import asyncio
 import json
 import operator
-from typing import Annotated, List, TypedDict, Union, Dict, Any
+import os
+from functools import lru_cache
+from typing import Annotated, List, TypedDict, Union, Dict, Any, Optional
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
@@ -12,25 +14,45 @@ from utils.deployment_tools import (
     get_service_metadata,
     generate_deployment_plan,
     trigger_ci_pipeline,
+    start_ci_build,
+    wait_for_ci_builds,
     deploy_to_k8s,
     get_deployment_metrics,
     promote_rollout,
     rollback_deployment,
-    trigger_static_site_deployment
+    run_progressive_canary,
+    trigger_static_site_deployment,
+    lookup_service,
+    SUPPORTED_STRATEGIES
 )
 from utils.prompts import DEPLOYMENT_PLANNER_PROMPT, METRIC_ANALYZER_PROMPT
+from utils.verification import describe_findings, evaluate_metrics, policy_for_service
+from utils.telemetry import ARTIFACT_REUSE, PLAN_CACHE, instrument_node
+from utils.artifact_index import REUSABLE_STEPS, artifact_key, get_artifact_index, image_tag_for
+from utils.plan_cache import get_plan_cache, plan_key
+from utils.compaction import compact_messages
+from utils.deadline import time_left
 
 from dotenv import load_dotenv
 load_dotenv()
 
 # --- State Definition ---
 class DeploymentState(TypedDict):
-    messages: Annotated[List[BaseMessage], operator.add]
+    messages: Annotated[List[BaseMessage], compact_messages] # Recent window only, see utils/compaction.py
+    step_results: Annotated[List[Dict[str, Any]], operator.add] # Outcome of every executed step
     service_id: str
+    strategy: str
+    planning_mode: str # "auto" (rules when possible), "llm"
+    request_hash: str # Hash of the deploy request payload, for idempotent retries
+    commit_sha: str # Commit being deployed; keys the artifact index
+    image_tag: str # Image built (or previously built) for commit_sha
     plan: Dict[str, Any]
     current_step_index: int
-    deployment_status: str # "planning", "executing", "verifying", "completed", "failed", "rolled_back"
+    deployment_status: str # "planning", "executing", "verifying", "completed", "failed", "rolled_back", "suspended"
     rollout_id: str # ID of the active rollout (for promote/rollback)
+    pending_builds: Dict[str, Dict[str, Any]] # In-flight CI build_id -> {"step_index", "step_name"}
+    verdict: Dict[str, Any] # Structured verification result (decision, violations, metrics)
+    error: str # Why the deployment failed (deployment_status "failed")
     # Static site params
     github_token: str
     repo_url: str
@@ -40,24 +62,84 @@ class DeploymentState(TypedDict):
     build_command: str
 
 # --- Models & Tools ---
-llm = ChatOpenAI(model="gpt-4.1", temperature=0)
+# Models are constructed on first use: importing this module must stay cheap,
+# and deterministic paths (rule-based planning/verification) never need them.
 
 # Tools for the planner
 planner_tools = [get_service_metadata, generate_deployment_plan]
-planner_llm = llm.bind_tools(planner_tools)
 
 # Tools for the executor (CI/CD & Deploy)
-executor_tools = [trigger_ci_pipeline, deploy_to_k8s, trigger_static_site_deployment]
-executor_llm = llm.bind_tools(executor_tools, tool_choice="required")
+executor_tools = [start_ci_build, wait_for_ci_builds, trigger_ci_pipeline, deploy_to_k8s, trigger_static_site_deployment]
 
 # Tools for the verifier (Metrics & Rollback)
 verifier_tools = [get_deployment_metrics, promote_rollout, rollback_deployment]
-verifier_llm = llm.bind_tools(verifier_tools)
+# Run by the verifier node itself for progressive rollouts, never offered to the model
+verifier_node_tools = verifier_tools + [run_progressive_canary]
+
+@lru_cache(maxsize=None)
+def get_llm():
+    from langchain_openai import ChatOpenAI
+    from utils.llm_cache import get_llm_cache, llm_cache_mode
+
+    kwargs = {}
+    if llm_cache_mode() == "replay" and not os.environ.get("OPENAI_API_KEY"):
+        # Replay serves every call from the cache; the key is never sent
+        kwargs["api_key"] = "replay-only"
+    return ChatOpenAI(model="gpt-4.1", temperature=0, cache=get_llm_cache(), **kwargs)
+
+@lru_cache(maxsize=None)
+def get_planner_llm():
+    return get_llm().bind_tools(planner_tools)
+
+@lru_cache(maxsize=None)
+def get_executor_llm():
+    return get_llm().bind_tools(executor_tools, tool_choice="required")
+
+@lru_cache(maxsize=None)
+def get_verifier_llm():
+    return get_llm().bind_tools(verifier_tools)
 
 
 # --- Nodes ---
 
-def planner_node(state: DeploymentState):
+def state_plan_key(state: DeploymentState):
+    """Plan cache key for the request, or None if the service is not registered."""
+    service = lookup_service(state.get("service_id"))
+    if not service or not state.get("strategy"):
+        return None
+    return plan_key(service, state["strategy"])
+
+
+def cached_plan(state: DeploymentState):
+    """
+    Returns a previously built plan for the same service metadata, strategy
+    and policy version, whichever planner produced it.
+    """
+    key = state_plan_key(state)
+    if not key:
+        return None
+    plan = get_plan_cache().get(key)
+    PLAN_CACHE.inc(result="hit" if plan else "miss", planning_mode=state.get("planning_mode") or "auto")
+    return plan
+
+
+def rule_based_plan(state: DeploymentState):
+    """
+    Builds the plan without the LLM when the service is registered and the
+    strategy is one we know. Returns None if the request needs the LLM planner.
+    """
+    service_id = state.get("service_id")
+    strategy = state.get("strategy")
+
+    if state.get("planning_mode") == "llm":
+        return None
+    if strategy not in SUPPORTED_STRATEGIES or not lookup_service(service_id):
+        return None
+
+    return json.loads(generate_deployment_plan.invoke({"service_id": service_id, "strategy": strategy}))
+
+
+async def planner_node(state: DeploymentState):
     """
     Generates the deployment plan.
     """
@@ -68,8 +150,32 @@ def planner_node(state: DeploymentState):
     if state.get("plan"):
         return {"deployment_status": "executing"}
 
+    # Same inputs as an earlier deployment: reuse its plan, even in llm mode.
+    # Only on the first pass; later passes are the LLM planner's tool loop.
+    # Registry lookups behind these read SQLite on a cache miss: off the event loop
+    plan = await asyncio.to_thread(cached_plan, state) if isinstance(messages[-1], HumanMessage) else None
+    if plan:
+        print(f"📋 Cached plan with {len(plan['steps'])} steps.")
+        return {
+            "messages": [AIMessage(content=f"Cached {plan['strategy']} plan for {plan['service_id']}: {[s['name'] for s in plan['steps']]}")],
+            "plan": plan,
+            "current_step_index": 0,
+            "deployment_status": "executing"
+        }
+
+    # Fast path: plan deterministically, no model round-trip
+    plan = await asyncio.to_thread(rule_based_plan, state)
+    if plan:
+        print(f"📋 Rule-based plan with {len(plan['steps'])} steps.")
+        return {
+            "messages": [AIMessage(content=f"Rule-based {plan['strategy']} plan for {plan['service_id']}: {[s['name'] for s in plan['steps']]}")],
+            "plan": plan,
+            "current_step_index": 0,
+            "deployment_status": "executing"
+        }
+
     # Invoke LLM to get service info or generate plan
-    response = planner_llm.invoke(messages)
+    response = await get_planner_llm().ainvoke(messages)
     return {"messages": [response]}
 
 
@@ -90,6 +196,9 @@ def plan_parser_node(state: DeploymentState):
             
             if "steps" in plan_data:
                 print(f"📋 Plan generated with {len(plan_data['steps'])} steps.")
+                key = state_plan_key(state)
+                if key:
+                    get_plan_cache().put(key, plan_data)
                 return {
                     "plan": plan_data, 
                     "current_step_index": 0,
@@ -102,23 +211,16 @@ def plan_parser_node(state: DeploymentState):
     return {}
 
 
-def executor_node(state: DeploymentState):
+# Deployed when no commit_sha was requested
+DEFAULT_IMAGE_TAG = "v1.2.1"
+
+
+def step_tool_call(step_name: str, state: DeploymentState):
     """
-    Executes the current step in the plan.
+    Maps a plan step to the tool call that executes it, or None.
     """
-    print(f"--- EXECUTOR NODE (Step {state.get('current_step_index')}) ---")
-    plan = state.get("plan")
-    idx = state.get("current_step_index", 0)
-    
-    if not plan or idx >= len(plan["steps"]):
-        return {"deployment_status": "completed"}
-    
-    step = plan["steps"][idx]
-    step_name = step["name"]
     service_id = state["service_id"]
-    
-    print(f"🚀 Executing Step: {step_name}")
-    
+
     # Logic to map step names to tool calls
     # In a more advanced agent, the LLM would decide this mapping.
     # Here we map explicitly for deterministic execution in the Hackathon.
@@ -126,21 +228,21 @@ def executor_node(state: DeploymentState):
     tool_call_id = "call_" + step_name
     
     if step_name in ["run_unit_tests", "run_lint", "security_scan", "build_image"]:
-        # Manually construct tool call for trigger_ci_pipeline
-        tool_call = {
-            "name": "trigger_ci_pipeline",
-            "args": {"service_id": service_id, "step_name": step_name},
+        # Start the build only; the executor waits for all started builds together
+        return {
+            "name": "start_ci_build",
+            "args": {"service_id": service_id, "step_name": step_name, "commit_sha": state.get("commit_sha", "")},
             "id": tool_call_id
         }
     elif step_name == "deploy_canary":
-        tool_call = {
+        return {
             "name": "deploy_to_k8s",
-            "args": {"service_id": service_id, "version": "v1.2.1", "strategy": "canary"},
+            "args": {"service_id": service_id, "version": state.get("image_tag") or DEFAULT_IMAGE_TAG, "strategy": "progressive" if state.get("strategy") == "progressive" else "canary"},
             "id": tool_call_id
         }
     elif step_name == "deploy_static_site":
         # Use params from state or defaults
-        tool_call = {
+        return {
             "name": "trigger_static_site_deployment",
             "args": {
                 "repo_url": state.get("repo_url", ""),
@@ -152,73 +254,438 @@ def executor_node(state: DeploymentState):
             },
             "id": tool_call_id
         }
-    elif step_name == "verify_metrics":
+    return None
+
+
+def state_artifact_key(state: DeploymentState):
+    """Artifact index key of the build this deployment runs, or None without a commit SHA."""
+    if not state.get("commit_sha"):
+        return None
+    service = lookup_service(state["service_id"]) or {}
+    return artifact_key(state.get("repo_url") or service.get("repo_url", ""), state["commit_sha"], service)
+
+
+def reused_steps(state: DeploymentState, batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Steps of the batch already recorded as successful for this build."""
+    key = state_artifact_key(state)
+    if key is None or not any(s["name"] in REUSABLE_STEPS for s in batch):
+        return {}
+    recorded = get_artifact_index().lookup(key)
+    return {s["name"]: recorded[s["name"]] for s in batch if s["name"] in REUSABLE_STEPS and s["name"] in recorded}
+
+
+def record_artifact(state: DeploymentState, step_name: str, build_id: str, updates: Dict[str, Any]):
+    """Indexes a successful reusable CI step; `build_image` also sets the image tag to deploy."""
+    if step_name not in REUSABLE_STEPS or not state.get("commit_sha"):
+        return
+    image_tag = image_tag_for(state["commit_sha"]) if step_name == "build_image" else None
+    if image_tag:
+        updates["image_tag"] = image_tag
+    key = state_artifact_key(state)
+    if key is not None:
+        get_artifact_index().record(key, step_name, build_id, image_tag)
+
+
+def executor_node(state: DeploymentState, config):
+    """
+    Executes the current step in the plan.
+    Consecutive steps of the same group are issued together as one batch
+    of tool calls, which ToolNode runs concurrently.
+    Once the run's time budget is spent it stops at the step boundary with
+    status "suspended"; the checkpoint keeps the position (step index,
+    rollout_id, pending builds) for POST /deploy/{thread_id}/resume.
+    """
+    print(f"--- EXECUTOR NODE (Step {state.get('current_step_index')}) ---")
+    plan = state.get("plan")
+    idx = state.get("current_step_index", 0)
+
+    if state.get("deployment_status") in ("rolled_back", "failed", "suspended"):
+        return {}
+
+    remaining = time_left(config)
+    if remaining is not None and remaining <= 0 and plan and idx < len(plan["steps"]):
+        print(f"⏸️  Time budget spent, suspending at step {idx}")
+        return {"deployment_status": "suspended"}
+    
+    pending_builds = state.get("pending_builds") or {}
+    if pending_builds:
+        print(f"⏳ Waiting for CI builds: {list(pending_builds)}")
+        args = {"build_ids": list(pending_builds)}
+        if remaining is not None:
+            # Builds still running at the deadline stay pending for the resumed run
+            args["timeout_seconds"] = remaining
+        return {"messages": [AIMessage(content="", tool_calls=[{
+            "name": "wait_for_ci_builds",
+            "args": args,
+            "id": "call_wait_for_ci_builds"
+        }])]}
+
+    if not plan or idx >= len(plan["steps"]):
+        return {"deployment_status": "completed"}
+    
+    step = plan["steps"][idx]
+    step_name = step["name"]
+    
+    if step_name == "verify_metrics":
         return {"deployment_status": "verifying"}
     elif step_name == "promote_full":
         return {"deployment_status": "completed"}
+
+    batch = [step]
+    if step.get("group"):
+        for next_step in plan["steps"][idx + 1:]:
+            if next_step.get("group") != step["group"]:
+                break
+            batch.append(next_step)
+
+    batch_end = idx + len(batch)
+    updates = {}
+    reused = reused_steps(state, batch)
+    if reused:
+        # Same commit and build config already passed these steps: skip them
+        print(f"♻️  Reusing recorded artifacts for {list(reused)} ({state['commit_sha'][:12]})")
+        plan = {**plan, "steps": [dict(s) for s in plan["steps"]]}
+        for step in plan["steps"][idx:batch_end]:
+            if step["name"] in reused:
+                step.update(status="success", reused=True)
+                ARTIFACT_REUSE.inc(step=step["name"])
+        updates = {
+            "plan": plan,
+            "step_results": [{"step": name, "status": "success", "tool": "artifact_index", "result": record}
+                             for name, record in reused.items()]
+        }
+        if reused.get("build_image", {}).get("image_tag"):
+            updates["image_tag"] = reused["build_image"]["image_tag"]
+        batch = [s for s in batch if s["name"] not in reused]
+
+    current = {**state, **updates}
+    if current.get("commit_sha") and not current.get("image_tag") and any(s["name"] == "deploy_canary" for s in batch):
+        # A requested commit is only ever deployed from its own build
+        error = f"deploy_canary: no artifact for commit {current['commit_sha'][:12]}"
+        print(f"❌ Deployment failed: {error}")
+        plan = {**plan, "steps": [dict(s) for s in plan["steps"]]}
+        for step in plan["steps"][idx:batch_end]:
+            if step["name"] == "deploy_canary":
+                step.update(status="failed", error=error)
+        return {**updates, "plan": plan, "deployment_status": "failed", "error": error,
+                "messages": [AIMessage(content=f"Deployment failed: {error}")]}
+
+    print(f"🚀 Executing Step(s): {[s['name'] for s in batch]}")
+    tool_calls = [call for call in (step_tool_call(s["name"], current) for s in batch) if call]
+    if remaining is not None:
+        for call in tool_calls:
+            if call["name"] == "deploy_to_k8s":
+                # A rollout still in progress at the deadline suspends the run at this step
+                call["args"]["timeout_seconds"] = remaining
         
-    if tool_call:
-        from langchain_core.messages import AIMessage
-        return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+    if tool_calls:
+        return {**updates, "messages": [AIMessage(content="", tool_calls=tool_calls)]}
         
-    return {"current_step_index": idx + 1}
+    return {**updates, "current_step_index": batch_end}
 
 
 def execution_result_node(state: DeploymentState):
     """
-    Processes the result of the execution tool call.
+    Merges the results of the executed tool call(s) into the plan.
+    Started CI builds are recorded in `pending_builds`; the index only
+    advances once every build of the batch has finished.
     """
     print("--- EXECUTION_RESULT NODE ---")
     messages = state["messages"]
-    last_message = messages[-1]
-    
-    if isinstance(last_message, ToolMessage):
-        # Check if it was a deployment to capture rollout_id
-        content = last_message.content
+    idx = state["current_step_index"]
+
+    results = []
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            break
+        results.append(message)
+
+    if not results:
+        return {}
+
+    plan = {**state["plan"], "steps": [dict(s) for s in state["plan"]["steps"]]}
+    steps = plan["steps"]
+    step_ids = {"call_" + s["name"]: i for i, s in enumerate(steps) if i >= idx}
+    pending_builds = dict(state.get("pending_builds") or {})
+    step_results = []
+    updates = {"plan": plan, "step_results": step_results}
+
+    for message in reversed(results):
         try:
-            data = json.loads(content)
-            updates = {"current_step_index": state["current_step_index"] + 1}
-            
-            if "rollout_id" in data:
-                updates["rollout_id"] = data["rollout_id"]
-                
+            data = json.loads(message.content)
+        except json.JSONDecodeError:
+            data = {}
+
+        if message.name == "wait_for_ci_builds":
+            for build_id, build in data.get("builds", {}).items():
+                if build_id in pending_builds and build["status"] != "running":
+                    step = steps[pending_builds.pop(build_id)["step_index"]]
+                    step["status"] = build["status"]
+                    if build["status"] == "failed":
+                        step["error"] = f"CI build {build_id} ended {build.get('build_status', 'FAILED')}"
+                    step_results.append({"step": step["name"], "status": build["status"], "tool": "start_ci_build", "result": build})
+                    if build["status"] == "success":
+                        record_artifact(state, step["name"], build_id, updates)
+            continue
+
+        step_idx = step_ids.get(message.tool_call_id)
+        if step_idx is None:
+            continue
+
+        if message.name == "start_ci_build" and data.get("build_id"):
+            pending_builds[data["build_id"]] = {"step_index": step_idx, "step_name": steps[step_idx]["name"]}
+            steps[step_idx].update(status="running", build_id=data["build_id"])
+        else:
+            steps[step_idx]["status"] = data.get("status", "success")
+            if steps[step_idx]["status"] == "failed":
+                steps[step_idx]["error"] = data.get("error") or data.get("message") or f"{message.name} failed"
+            step_results.append({"step": steps[step_idx]["name"], "status": steps[step_idx]["status"], "tool": message.name, "result": data})
+            if message.name == "trigger_ci_pipeline" and steps[step_idx]["status"] == "success":
+                record_artifact(state, steps[step_idx]["name"], data.get("build_id"), updates)
+
+        # Check if it was a deployment to capture rollout_id
+        if "rollout_id" in data:
+            updates["rollout_id"] = data["rollout_id"]
+
+    updates["pending_builds"] = pending_builds
+    suspended = [i for i, s in enumerate(steps) if i >= idx and s["status"] == "suspended"]
+    if suspended:
+        # Cut short by the time budget: the step runs again on resume
+        for i in suspended:
+            steps[i]["status"] = "pending"
+        print(f"⏸️  Time budget spent during {steps[suspended[0]]['name']}, suspending")
+        updates.update(deployment_status="suspended", current_step_index=suspended[0])
+        return updates
+
+    if not pending_builds:
+        # Every later step depends on the earlier ones: once the batch has
+        # settled, a failed step ends the deployment
+        failed = [s for s in steps[idx:] if s["status"] == "failed"]
+        if failed:
+            error = "; ".join(f"{s['name']}: {s.get('error', 'failed')}" for s in failed)
+            print(f"❌ Deployment failed: {error}")
+            updates.update(deployment_status="failed", error=error,
+                           messages=[AIMessage(content=f"Deployment failed: {error}")])
             return updates
-        except:
-            return {"current_step_index": state["current_step_index"] + 1}
-            
-    return {}
 
+        # Advance past every step of the batch that has an outcome
+        next_idx = idx
+        while next_idx < len(steps) and steps[next_idx]["status"] not in ("pending", "running"):
+            next_idx += 1
+        updates["current_step_index"] = max(next_idx, idx + 1)
+
+    return updates
+
+
+async def fetch_verdict(state: DeploymentState, config):
+    """
+    Verdict for the active rollout. By default it comes from the batched
+    metrics collector, which verifies all in-flight rollouts in one query;
+    with METRICS_COLLECTOR=off, or if the collector fails or does not
+    answer in time, metrics are fetched for this service alone.
+    """
+    service_id = state["service_id"]
+    if os.environ.get("METRICS_COLLECTOR", "batch") == "batch":
+        from utils.metrics_collector import get_collector
+
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id", "")
+        future = get_collector().request(thread_id, service_id, state.get("rollout_id", "unknown"))
+        timeout = float(os.environ.get("METRICS_WAIT_TIMEOUT", "30"))
+        remaining = time_left(config)
+        if remaining is not None:
+            timeout = max(0.0, min(timeout, remaining))
+        try:
+            # Shielded: timing out must not cancel the collector's future
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            print("⚠️  Metrics collector timed out, fetching metrics directly")
+        except Exception as e:
+            print(f"⚠️  Metrics collector failed ({e}), fetching metrics directly")
+
+    metrics = json.loads(await get_deployment_metrics.ainvoke({"service_id": service_id}))
+    return evaluate_metrics(metrics, policy_for_service(await asyncio.to_thread(lookup_service, service_id)))
 
-def verifier_node(state: DeploymentState):
+
+def budget_args(config) -> Dict[str, Any]:
+    """`timeout_seconds` for a promote/rollback/canary call: the run's time budget left, if it has one."""
+    remaining = time_left(config)
+    return {} if remaining is None else {"timeout_seconds": remaining}
+
+
+def promotion_failure(result: str, verdict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    State updates ending the deployment when promote_rollout failed, or
+    suspending it when the promotion ran out of time budget; None if it succeeded.
     """
-    Analyzes metrics and decides to promote or rollback.
+    try:
+        data = json.loads(result)
+    except ValueError:
+        # ToolNode reports a raised tool error as plain text
+        data = {"status": "failed", "error": result}
+    if data.get("status") == "suspended":
+        # The resumed run verifies again and re-applies the same manifest
+        print(f"⏸️  {data.get('message')}, suspending")
+        return {"messages": [AIMessage(content=data.get("message", "Promotion suspended"))], "deployment_status": "suspended"}
+    if data.get("status") != "failed":
+        return None
+    error = f"promote_rollout: {data.get('error') or 'failed'}"
+    print(f"❌ Deployment failed: {error}")
+    return {
+        "messages": [AIMessage(content=f"Deployment failed: {error}")],
+        "verdict": verdict,
+        "step_results": [{"step": "verify_metrics", "status": "failed", "tool": "promote_rollout", "result": data}],
+        "deployment_status": "failed",
+        "error": error,
+    }
+
+
+async def verifier_node(state: DeploymentState, config):
+    """
+    Checks canary metrics against the service's threshold policy and
+    promotes or rolls back directly. Only borderline metrics go to the LLM.
     """
     print("--- VERIFIER NODE ---")
     service_id = state["service_id"]
     rollout_id = state.get("rollout_id", "unknown")
-    
-    prompt = METRIC_ANALYZER_PROMPT.format(service_id=service_id, rollout_id=rollout_id)
-    
-    # We pass the conversation history + specific prompt
-    response = verifier_llm.invoke([HumanMessage(content=prompt)])
-    return {"messages": [response]}
+    idx = state["current_step_index"]
+
+    remaining = time_left(config)
+    if remaining is not None and remaining <= 0:
+        print("⏸️  Time budget spent, suspending before verification")
+        return {"deployment_status": "suspended"}
+
+    if state.get("strategy") == "progressive":
+        # Stage-by-stage rollout with streaming metrics; decided in verifier_result
+        stages = (await asyncio.to_thread(lookup_service, service_id) or {}).get("progressive_stages")
+        # Stops short of the deadline; the resumed run verifies again
+        args = {"service_id": service_id, "rollout_id": rollout_id, "stages": stages, **budget_args(config)}
+        return {"messages": [AIMessage(content="", tool_calls=[{
+            "name": "run_progressive_canary",
+            "args": args,
+            "id": "call_run_progressive_canary"
+        }])]}
+
+    verdict = await fetch_verdict(state, config)
+    metrics = verdict["metrics"]
+    print(f"🔎 Verdict: {verdict['decision']}")
+
+    if verdict["decision"] == "promote":
+        promoted = await promote_rollout.ainvoke({"service_id": service_id, "rollout_id": rollout_id, **budget_args(config)})
+        failure = promotion_failure(promoted, {**verdict, "source": "rules"})
+        if failure:
+            return failure
+        return {
+            "messages": [AIMessage(content="Verification Successful: Promoting to stable.")],
+            "verdict": {**verdict, "source": "rules"},
+            "step_results": [{"step": "verify_metrics", "status": "promote", "tool": "promote_rollout", "result": verdict}],
+            "deployment_status": "executing",
+            "current_step_index": idx + 1
+        }
+
+    if verdict["decision"] == "rollback":
+        reason = f"Threshold exceeded: {describe_findings(verdict['violations'])}"
+        await rollback_deployment.ainvoke({"service_id": service_id, "rollout_id": rollout_id, "reason": reason, **budget_args(config)})
+        return {
+            "messages": [AIMessage(content=f"Verification Failed: Rolling back due to {reason}.")],
+            "verdict": {**verdict, "source": "rules"},
+            "step_results": [{"step": "verify_metrics", "status": "rollback", "tool": "rollback_deployment", "result": verdict}],
+            "deployment_status": "rolled_back"
+        }
+
+    # Borderline: let the LLM weigh the gray-zone metrics
+    prompt = METRIC_ANALYZER_PROMPT.format(
+        service_id=service_id,
+        rollout_id=rollout_id,
+        metrics=json.dumps(metrics),
+        borderline=describe_findings(verdict["borderline"]),
+        **{k: v for k, v in verdict["policy"].items() if k.startswith("max_")}
+    )
+    response = await get_verifier_llm().ainvoke([HumanMessage(content=prompt)])
+
+    if not response.tool_calls:
+        # No decision from the model: fail safe
+        reason = f"Inconclusive verification of borderline metrics: {describe_findings(verdict['borderline'])}"
+        await rollback_deployment.ainvoke({"service_id": service_id, "rollout_id": rollout_id, "reason": reason, **budget_args(config)})
+        return {
+            "messages": [response],
+            "verdict": {**verdict, "decision": "rollback", "source": "rules"},
+            "step_results": [{"step": "verify_metrics", "status": "rollback", "tool": "rollback_deployment", "result": verdict}],
+            "deployment_status": "rolled_back"
+        }
+
+    return {"messages": [response], "verdict": {**verdict, "source": "llm"}}
 
 
-def verifier_result_node(state: DeploymentState):
+async def progressive_result(state: DeploymentState, result: Dict[str, Any], config=None):
     """
-    Processes the result of verification.
+    Promotes a rollout that passed every stage and rolls back one that was aborted.
+    One cut short by the time budget suspends the run at the verify step.
+    """
+    service_id = state["service_id"]
+    rollout_id = state.get("rollout_id", "unknown")
+    stages = [s["traffic_percent"] for s in result.get("stages", [])]
+
+    if result.get("status") == "incomplete":
+        return {
+            "messages": [AIMessage(content=f"Progressive rollout stopped at {result.get('stopped_at_percent')}% traffic: time budget spent.")],
+            "deployment_status": "suspended"
+        }
+
+    if result.get("status") == "promoted":
+        promoted = await promote_rollout.ainvoke({"service_id": service_id, "rollout_id": rollout_id, **budget_args(config)})
+        verdict = {"decision": "promote", "source": "progressive", **result}
+        failure = promotion_failure(promoted, verdict)
+        if failure:
+            return failure
+        return {
+            "messages": [AIMessage(content=f"Progressive rollout healthy through {stages}% in {result['elapsed_seconds']}s: promoted.")],
+            "verdict": verdict,
+            "step_results": [{"step": "verify_metrics", "status": "promote", "tool": "promote_rollout", "result": verdict}],
+            "deployment_status": "executing",
+            "current_step_index": state["current_step_index"] + 1
+        }
+
+    reason = result.get("error") or f"Aborted at {result.get('aborted_at_percent')}% traffic: {describe_findings(result.get('violations', []))}"
+    await rollback_deployment.ainvoke({"service_id": service_id, "rollout_id": rollout_id, "reason": reason, **budget_args(config)})
+    verdict = {"decision": "rollback", "source": "progressive", **result}
+    return {
+        "messages": [AIMessage(content=f"Progressive rollout failed: {reason}. Rolled back after {result.get('elapsed_seconds')}s.")],
+        "verdict": verdict,
+        "step_results": [{"step": "verify_metrics", "status": "rollback", "tool": "rollback_deployment", "result": verdict}],
+        "deployment_status": "rolled_back"
+    }
+
+
+async def verifier_result_node(state: DeploymentState, config):
+    """
+    Processes the promote/rollback decision made by the LLM for borderline
+    metrics, or the outcome of a progressive rollout.
     """
     print("--- VERIFIER_RESULT NODE ---")
     messages = state["messages"]
     last_message = messages[-1]
+    verdict = state.get("verdict") or {}
     
     if isinstance(last_message, ToolMessage):
-        content = last_message.content
-        if "Promoting" in content or "Promotion completed" in content:
+        if last_message.name == "run_progressive_canary":
+            return await progressive_result(state, json.loads(last_message.content), config)
+        if last_message.name == "promote_rollout":
+             failure = promotion_failure(last_message.content, verdict)
+             if failure:
+                 return failure
              # Move to next step (which might be promote_full or finish)
-             return {"deployment_status": "executing", "current_step_index": state["current_step_index"] + 1}
-        elif "Rolling back" in content or "Rollback completed" in content:
-             return {"deployment_status": "rolled_back"}
+             return {
+                 "verdict": {**verdict, "decision": "promote"},
+                 "step_results": [{"step": "verify_metrics", "status": "promote", "tool": "promote_rollout", "result": verdict}],
+                 "deployment_status": "executing",
+                 "current_step_index": state["current_step_index"] + 1
+             }
+        elif last_message.name == "rollback_deployment":
+             return {
+                 "verdict": {**verdict, "decision": "rollback"},
+                 "step_results": [{"step": "verify_metrics", "status": "rollback", "tool": "rollback_deployment", "result": verdict}],
+                 "deployment_status": "rolled_back"
+             }
              
     return {}
 
@@ -227,18 +694,18 @@ def verifier_result_node(state: DeploymentState):
 
 workflow = StateGraph(DeploymentState)
 
-# Add Nodes
-workflow.add_node("planner", planner_node)
-workflow.add_node("plan_parser", plan_parser_node)
-workflow.add_node("executor", executor_node)
-workflow.add_node("execution_result", execution_result_node)
-workflow.add_node("verifier", verifier_node)
-workflow.add_node("verifier_result", verifier_result_node)
+# Add Nodes (timed into /metrics and the per-deployment breakdown)
+workflow.add_node("planner", instrument_node("planner", planner_node))
+workflow.add_node("plan_parser", instrument_node("plan_parser", plan_parser_node))
+workflow.add_node("executor", instrument_node("executor", executor_node))
+workflow.add_node("execution_result", instrument_node("execution_result", execution_result_node))
+workflow.add_node("verifier", instrument_node("verifier", verifier_node))
+workflow.add_node("verifier_result", instrument_node("verifier_result", verifier_result_node))
 
 # Add Tool Nodes
 workflow.add_node("planner_tools", ToolNode(planner_tools))
 workflow.add_node("executor_tools", ToolNode(executor_tools))
-workflow.add_node("verifier_tools", ToolNode(verifier_tools))
+workflow.add_node("verifier_tools", ToolNode(verifier_node_tools))
 
 # Set Entry Point
 workflow.set_entry_point("planner")
@@ -273,6 +740,10 @@ def should_continue_execution(state):
         return END
     if status == "rolled_back":
         return END
+    if status == "failed":
+        return END
+    if status == "suspended":
+        return END # Continued by POST /deploy/{thread_id}/resume
         
     messages = state["messages"]
     last_message = messages[-1]
@@ -305,8 +776,16 @@ workflow.add_edge("verifier_tools", "verifier_result")
 workflow.add_edge("verifier_result", "executor") # Back to executor loop
 
 
-from langgraph.checkpoint.memory import InMemorySaver
+from utils.checkpointer import create_checkpointer
 
-def build_graph():
-    checkpointer = InMemorySaver()
-    return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
+def build_graph(checkpointer=None):
+    """
+    Compiles the workflow. Any BaseCheckpointSaver can be passed in; by default
+    the one selected by the CHECKPOINTER env var is used (see utils/checkpointer.py).
+    """
+    if checkpointer is None:
+        checkpointer = create_checkpointer()
+    if os.environ.get("METRICS_COLLECTOR", "batch") == "batch":
+        from utils.metrics_collector import attach_checkpointer
+        attach_checkpointer(checkpointer)
+    return workflow.compile(checkpointer=checkpointer)
@@ -0,0 +1,219 @@
+"""
+End-to-end benchmark of the deployment graph.
+
+Drives N concurrent deployments through `server.app` (in-process ASGI
+client) with a scripted fake chat model and the seeded mock tools, and
+reports:
+  - latency_ms:        end-to-end POST /deploy latency (p50/p95/p99)
+  - supersteps:        graph supersteps per deployment
+  - checkpoint_bytes:  serialized size of each deployment's final checkpoint
+  - memory:            tracemalloc growth/peak and max RSS over the run
+
+Usage:
+    python benchmarks/e2e.py --deployments 50 --concurrency 10 --output e2e.json
+    python benchmarks/e2e.py --planning-mode llm --llm-latency-ms 300 --latency-scale 0.2
+    python benchmarks/e2e.py --max-p95-ms 4000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_environment(args, workdir: str) -> None:
+    """Must run before the repo modules are imported: they read these at import time."""
+    scale = args.latency_scale
+    os.environ.update({
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+        "USE_REAL_AWS": "false",
+        "MOCK_SEED": str(args.seed),
+        "MOCK_LATENCY_SCALE": str(scale),
+        "CI_POLL_MIN_SECONDS": str(max(0.01, 0.5 * scale)),
+        "PROGRESSIVE_STAGE_SECONDS": str(max(0.05, 10 * scale)),
+        "PROGRESSIVE_SAMPLE_INTERVAL": str(max(0.01, 1 * scale)),
+        "METRICS_CYCLE_SECONDS": str(max(0.01, 1 * scale)),
+        "LLM_CACHE_MODE": "off",
+        "CHECKPOINTER": args.checkpointer,
+        "CHECKPOINT_DB_PATH": os.path.join(workdir, "checkpoints.sqlite"),
+        "SERVICE_REGISTRY_PATH": os.path.join(workdir, "services.sqlite"),
+        "ARTIFACT_INDEX_PATH": os.path.join(workdir, "artifacts.sqlite"),
+        "RELEASE_LEDGER_PATH": os.path.join(workdir, "releases.sqlite"),
+    })
+    os.environ.pop("K8S_API_URL", None)
+    os.environ.pop("STATIC_SITE_DEPLOY_API_URL", None)
+    sys.path.insert(0, REPO_ROOT)
+
+
+def scripted_chat_model(latency_ms: float):
+    """
+    Chat model that answers like the real planner/verifier would: look up the
+    service, generate the plan, and promote gray-zone rollouts.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class ScriptedChatModel(BaseChatModel):
+        latency_ms: float = 0
+        calls: int = 0
+
+        @property
+        def _llm_type(self) -> str:
+            return "scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _reply(self, messages) -> AIMessage:
+            first = messages[0].content
+            done = {m.name for m in messages if isinstance(m, ToolMessage)}
+            if "Rollout ID:" in first:
+                service_id = re.search(r"Service: (\S+)", first).group(1)
+                rollout_id = re.search(r"Rollout ID: (\S+)", first).group(1)
+                return AIMessage(content="", tool_calls=[{"name": "promote_rollout", "id": f"call_promote_{self.calls}",
+                                                          "args": {"service_id": service_id, "rollout_id": rollout_id}}])
+            service_id = re.search(r"service '([^']+)'", first).group(1)
+            strategy = re.search(r"using '([^']+)'", first).group(1)
+            if "get_service_metadata" not in done:
+                return AIMessage(content="", tool_calls=[{"name": "get_service_metadata", "id": f"call_meta_{self.calls}",
+                                                          "args": {"service_id": service_id}}])
+            return AIMessage(content="", tool_calls=[{"name": "generate_deployment_plan", "id": f"call_plan_{self.calls}",
+                                                      "args": {"service_id": service_id, "strategy": strategy}}])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            self.calls += 1
+            time.sleep(self.latency_ms / 1000)
+            return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    return ScriptedChatModel(latency_ms=latency_ms)
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "mean": statistics.fmean(ordered),
+            "min": ordered[0], "max": ordered[-1]}
+
+
+async def run_benchmark(args) -> dict:
+    import agent
+    import httpx
+    import server
+
+    model = scripted_chat_model(args.llm_latency_ms)
+    agent.get_llm = lambda: model
+    graph = server.get_agent()
+
+    services = args.services.split(",")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    run_id = f"bench-{int(time.time())}"
+
+    async def deploy(client, i: int) -> dict:
+        thread_id = f"{run_id}-{i}"
+        body = {"thread_id": thread_id, "service_id": services[i % len(services)],
+                "strategy": args.strategy, "planning_mode": args.planning_mode}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/deploy", json=body)
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        config = {"configurable": {"thread_id": thread_id}}
+        checkpoint = await graph.checkpointer.aget_tuple(config)
+        return {
+            "thread_id": thread_id,
+            "http_status": response.status_code,
+            "status": response.json().get("status") if response.status_code == 200 else "error",
+            "latency_ms": latency_ms,
+            "supersteps": checkpoint.metadata.get("step", 0) + 1 if checkpoint else 0,
+            "checkpoint_bytes": len(graph.checkpointer.serde.dumps_typed(checkpoint.checkpoint)[1]) if checkpoint else 0,
+        }
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # One warm-up deployment so imports and graph compilation aren't measured
+        await deploy(client, -1)
+        model.calls = 0
+
+        tracemalloc.start()
+        memory_before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(deploy(client, i) for i in range(args.deployments)))
+        wall_seconds = time.perf_counter() - started
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    statuses = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    return {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "verbose", "max_p95_ms")},
+        "python": sys.version.split()[0],
+        "summary": {
+            "wall_seconds": wall_seconds,
+            "throughput_per_second": len(results) / wall_seconds,
+            "statuses": statuses,
+            "llm_calls": model.calls,
+            "latency_ms": percentiles([r["latency_ms"] for r in results]),
+            "supersteps": percentiles([r["supersteps"] for r in results]),
+            "checkpoint_bytes": percentiles([r["checkpoint_bytes"] for r in results]),
+            "memory": {
+                "traced_growth_bytes": memory_after - memory_before,
+                "traced_peak_bytes": memory_peak,
+                "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+        },
+        "deployments": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deployments", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--services", default="demo-api,demo-frontend", help="Comma-separated, assigned round-robin")
+    parser.add_argument("--strategy", default="canary")
+    parser.add_argument("--planning-mode", default="auto", choices=("auto", "llm"))
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated latency of each fake LLM call")
+    parser.add_argument("--latency-scale", type=float, default=0.1, help="Scales the mock tools' simulated latencies")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checkpointer", default="sqlite", choices=("sqlite", "memory"))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the graph's progress logs")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if p95 latency exceeds this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="kube-garden-bench-") as workdir:
+        configure_environment(args, workdir)
+        # The graph logs every node and tool call; keep only the summary unless asked
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(run_benchmark(args))
+
+    print(json.dumps(result["summary"], indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    p95 = result["summary"]["latency_ms"]["p95"]
+    if args.max_p95_ms and p95 > args.max_p95_ms:
+        print(f"❌ Latency regression: p95 {p95:.1f}ms > {args.max_p95_ms}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
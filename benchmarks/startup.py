@@ -0,0 +1,101 @@
+"""
+Cold-start benchmark for the Lambda entry point.
+
+Each sample runs in a fresh interpreter and measures:
+  - import_ms:         `import server`
+  - first_root_ms:     first GET / through the Mangum handler
+  - first_agent_ms:    building the agent graph on first use
+
+Usage:
+    python benchmarks/startup.py --runs 5 --output startup.json
+    python benchmarks/startup.py --max-import-ms 800 --max-first-root-ms 50
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_SCRIPT = r"""
+import json, sys, time
+
+t0 = time.perf_counter()
+import server
+t1 = time.perf_counter()
+
+event = {
+    "resource": "/", "path": "/", "httpMethod": "GET", "headers": {"host": "localhost"},
+    "multiValueHeaders": {}, "queryStringParameters": None, "multiValueQueryStringParameters": None,
+    "pathParameters": None, "stageVariables": None, "body": None, "isBase64Encoded": False,
+    "requestContext": {"resourcePath": "/", "httpMethod": "GET", "path": "/Prod/", "stage": "Prod",
+                       "identity": {"sourceIp": "127.0.0.1"}, "requestId": "bench"},
+}
+response = server.handler(event, None)
+t2 = time.perf_counter()
+assert response["statusCode"] == 200, response
+
+heavy_loaded = any(m.startswith(("langchain", "langgraph", "openai")) for m in sys.modules)
+
+server.get_agent()
+t3 = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_root_ms": (t2 - t1) * 1000,
+    "first_agent_ms": (t3 - t2) * 1000,
+    "agent_stack_loaded_before_first_use": heavy_loaded,
+}))
+"""
+
+
+def run_sample() -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark")}
+    out = subprocess.run(
+        [sys.executable, "-c", SAMPLE_SCRIPT],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if median import time exceeds this")
+    parser.add_argument("--max-first-root-ms", type=float, help="Fail if median first GET / exceeds this")
+    args = parser.parse_args()
+
+    samples = [run_sample() for _ in range(args.runs)]
+    summary = {
+        key: {
+            "median": statistics.median(s[key] for s in samples),
+            "min": min(s[key] for s in samples),
+            "max": max(s[key] for s in samples),
+        }
+        for key in ("import_ms", "first_root_ms", "first_agent_ms")
+    }
+    summary["agent_stack_loaded_before_first_use"] = any(s["agent_stack_loaded_before_first_use"] for s in samples)
+    result = {"runs": args.runs, "python": sys.version.split()[0], "summary": summary, "samples": samples}
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if summary["agent_stack_loaded_before_first_use"]:
+        failures.append("agent stack was imported before first use")
+    if args.max_import_ms and summary["import_ms"]["median"] > args.max_import_ms:
+        failures.append(f"import_ms {summary['import_ms']['median']:.1f} > {args.max_import_ms}")
+    if args.max_first_root_ms and summary["first_root_ms"]["median"] > args.max_first_root_ms:
+        failures.append(f"first_root_ms {summary['first_root_ms']['median']:.1f} > {args.max_first_root_ms}")
+    if failures:
+        print("❌ Startup regression: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
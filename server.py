@@ -1,20 +1,38 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import time
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from mangum import Mangum
-from langchain.messages import HumanMessage
-from agent import build_graph
+from utils.deadline import reinvoke_resume, run_deadline
+from utils.idempotency import TERMINAL_STATUSES, InFlightDeployments, Running, request_hash
+from utils.job_queue import DeploymentWorkerPool
+from utils.progress import ProgressBroker, format_sse, stream_progress
+from utils.telemetry import deployment_timings, record_deployment, render_metrics
 
 app = FastAPI()
 
-# Initialize the agent graph
-agent = build_graph()
+# The agent graph (and the langchain/langgraph stack behind it) is built on
+# first use, so cold starts and GET / don't pay for it.
+_agent = None
 
-class DeployRequest(BaseModel):
+def get_agent():
+    global _agent
+    if _agent is None:
+        from agent import build_graph
+        _agent = build_graph()
+    return _agent
+
+class ServiceDeployment(BaseModel):
     service_id: str
-    thread_id: str
     strategy: str = "canary"
     message: str = "Deploying new version"
+    # "auto": rule-based planning for registered services, LLM otherwise
+    # "llm": always ask the LLM planner
+    planning_mode: str = "auto"
     # Static site params
     github_token: Optional[str] = None
     repo_url: Optional[str] = None
@@ -22,70 +40,548 @@ class DeployRequest(BaseModel):
     branch: Optional[str] = "main"
     output_dir: Optional[str] = "dist"
     build_command: Optional[str] = "npm run build"
+    # Commit to build and deploy; already built commits skip tests and image build
+    commit_sha: Optional[str] = None
+
+class DeployRequest(ServiceDeployment):
+    thread_id: str
+    # Run in the background worker pool and return immediately with "queued"
+    async_mode: bool = False
+
+class BatchDeployRequest(BaseModel):
+    batch_id: str
+    services: List[ServiceDeployment]
+    # service_id -> services that must finish successfully before it starts
+    depends_on: Dict[str, List[str]] = {}
+    max_concurrency: Optional[int] = None
+    max_per_namespace: Optional[int] = None
+
+class BulkStatusRequest(BaseModel):
+    thread_ids: List[str]
+    # thread_id -> ETag from the previous poll; unchanged deployments aren't loaded
+    etags: Dict[str, str] = {}
+    # thread_id -> `next_cursor` from the previous poll, for only newer log lines
+    since: Dict[str, int] = {}
+    limit: Optional[int] = None
+
+class RollbackRequest(BaseModel):
+    service_id: str
+    reason: str = "Manual rollback"
+    # Rollout to undo; defaults to the currently promoted release
+    rollout_id: Optional[str] = None
 
 class DeployResponse(BaseModel):
     status: str
+    thread_id: Optional[str] = None
     plan: Optional[Dict[str, Any]] = None
     current_step_index: Optional[int] = None
     logs: Optional[List[str]] = None
+    # Pass as `cursor` to fetch only newer log lines
+    next_cursor: Optional[int] = None
+    step_results: Optional[List[Dict[str, Any]]] = None
+    verdict: Optional[Dict[str, Any]] = None
+    # Per-deployment latency/token breakdown (nodes, tools, llm)
+    timings: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def build_inputs(request: ServiceDeployment) -> Dict[str, Any]:
+    from langchain_core.messages import HumanMessage
+
+    # Initial message to start the planning
+    user_msg = f"Deploy service '{request.service_id}' using '{request.strategy}' strategy. Note: {request.message}"
+
+    return {
+        "messages": [HumanMessage(content=user_msg)],
+        "service_id": request.service_id,
+        "strategy": request.strategy,
+        "planning_mode": request.planning_mode,
+        "request_hash": request_hash(request.model_dump()),
+        "github_token": request.github_token or "",
+        "repo_url": request.repo_url or "",
+        "app_name": request.app_name or request.service_id,
+        "branch": request.branch or "main",
+        "output_dir": request.output_dir or "dist",
+        "build_command": request.build_command or "npm run build",
+        "commit_sha": request.commit_sha or ""
+    }
+
+
+def build_config(thread_id: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    from utils.telemetry_callbacks import get_callback_handler
+
+    configurable = {"thread_id": thread_id}
+    if deadline is not None:
+        # The executor suspends at a step boundary once this passes (see utils/deadline.py)
+        configurable["deadline"] = deadline
+    return {
+        "configurable": configurable,
+        "recursion_limit": 100,
+        "callbacks": [get_callback_handler()]
+    }
+
+
+def state_response(thread_id: str, values: Dict[str, Any], status: Optional[str] = None,
+                   cursor: Optional[int] = None, limit: Optional[int] = None,
+                   error: Optional[str] = None) -> DeployResponse:
+    from utils.compaction import paginate_logs
+
+    logs, next_cursor = paginate_logs(values.get("messages", []), cursor, limit)
+    return DeployResponse(
+        status=status or values.get("deployment_status", "unknown"),
+        thread_id=thread_id,
+        plan=values.get("plan"),
+        current_step_index=values.get("current_step_index"),
+        logs=logs,
+        next_cursor=next_cursor,
+        step_results=values.get("step_results"),
+        verdict=values.get("verdict"),
+        timings=deployment_timings(thread_id),
+        error=error or values.get("error")
+    )
+
+
+# Deployments running in this process, so retries attach instead of re-running
+in_flight = InFlightDeployments()
+
+
+def check_same_request(stored_hash: Optional[str], payload_hash: str, thread_id: str) -> None:
+    if stored_hash and stored_hash != payload_hash:
+        raise HTTPException(status_code=409, detail=f"Thread '{thread_id}' already holds a different deployment request")
+
+
+async def resume_input(config: Dict[str, Any], values: Dict[str, Any]) -> None:
+    """
+    Readies a stopped deployment to continue from its checkpoint; the graph is
+    then run with None as input. A run killed mid-step still has its next
+    node pending. A suspended run ended cleanly, so it is re-entered at the
+    executor, which continues from `current_step_index` and `pending_builds`.
+    """
+    if values.get("deployment_status") == "suspended":
+        await get_agent().aupdate_state(config, {"deployment_status": "executing"}, as_node="execution_result")
+    return None
+
+
+async def run_deployment(thread_id: str, inputs: Optional[Dict[str, Any]], config: Dict[str, Any],
+                         running: Running, aws_context: Any = None) -> DeployResponse:
+    """Runs the graph for a thread the caller already claimed in `in_flight`, and releases it."""
+    started = time.perf_counter()
+    try:
+        result = await get_agent().ainvoke(inputs, config=config)
+    finally:
+        in_flight.finish(thread_id, running)
+    status = result.get("deployment_status", "unknown")
+    record_deployment(thread_id, status, time.perf_counter() - started)
+    if status == "suspended" and aws_context is not None and os.environ.get("DEPLOY_SELF_REINVOKE", "").lower() == "true":
+        await asyncio.to_thread(reinvoke_resume, thread_id, aws_context)
+    return state_response(thread_id, result)
+
+
+async def finish_deployment(thread_id: str, started: float) -> str:
+    state = await get_agent().aget_state({"configurable": {"thread_id": thread_id}})
+    status = state.values.get("deployment_status", "unknown")
+    record_deployment(thread_id, status, time.perf_counter() - started)
+    return status
+
+
+# Progress events of background deployments, consumed by the SSE endpoint
+progress_broker = ProgressBroker()
+
+# Strong references to detached /deploy/stream runs until they finish
+_background_runs: set = set()
+
+
+async def run_streamed_deployment(thread_id: str, inputs: Optional[Dict[str, Any]], config: Dict[str, Any],
+                                  running: Running):
+    """
+    Runs a /deploy/stream deployment, publishing its progress to the broker.
+    Returns the closing SSE event as (event type, data).
+    """
+    started = time.perf_counter()
+    try:
+        async for event in stream_progress(get_agent(), inputs, config):
+            progress_broker.publish(thread_id, event)
+        status = await finish_deployment(thread_id, started)
+        return "end", {"status": status, "timings": deployment_timings(thread_id)}
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return "error", {"status": "failed", "error": str(e)}
+    finally:
+        in_flight.finish(thread_id, running)
+        progress_broker.close(thread_id)
+
+
+async def run_deployment_job(job: Dict[str, Any]):
+    thread_id = job["thread_id"]
+    started = time.perf_counter()
+    try:
+        async for event in stream_progress(get_agent(), job["inputs"], job["config"]):
+            progress_broker.publish(thread_id, event)
+        await finish_deployment(thread_id, started)
+    finally:
+        in_flight.finish(thread_id, job["claim"])
+        progress_broker.close(thread_id)
+
+
+# Background workers for async_mode deployments
+worker_pool = DeploymentWorkerPool(run_deployment_job)
+
+
+async def run_batch_service(job: Dict[str, Any]) -> str:
+    inputs = build_inputs(ServiceDeployment(**job))
+    if job["plan"]:
+        # Planned together with the rest of the batch; skip the planner
+        inputs.update(plan=job["plan"], current_step_index=0, deployment_status="executing")
+
+    started = time.perf_counter()
+    result = await get_agent().ainvoke(inputs, config=build_config(job["thread_id"]))
+    status = result.get("deployment_status", "unknown")
+    record_deployment(job["thread_id"], status, time.perf_counter() - started)
+    return status
+
+
+_batch_scheduler = None
+
+def get_batch_scheduler():
+    """Process-wide scheduler; BATCH_MAX_CONCURRENCY / BATCH_MAX_PER_NAMESPACE bound all batches together."""
+    global _batch_scheduler
+    if _batch_scheduler is None:
+        from utils.batch import BatchScheduler
+        _batch_scheduler = BatchScheduler(run_batch_service)
+    return _batch_scheduler
+
 
 @app.get("/")
 def read_root():
     return {"message": "Kube-Garden Deployment Agent is running"}
 
 @app.post("/deploy", response_model=DeployResponse)
-async def deploy(request: DeployRequest):
-    config = {"configurable": {"thread_id": request.thread_id}, "recursion_limit": 100}
+async def deploy(request: DeployRequest, http_request: Request):
+    """
+    Idempotent per thread_id: a retry of a running deployment waits for it
+    (or returns "running" in async_mode), a retry of a finished one returns
+    its result, and a different payload on the same thread_id is a 409.
+    On Lambda the run stops with "suspended" before the invocation times out.
+    """
+    thread_id = request.thread_id
+    aws_context = http_request.scope.get("aws.context")
+    config = build_config(thread_id, run_deadline(aws_context))
+    payload_hash = request_hash(request.model_dump())
     
+    running = in_flight.get(thread_id)
+    if running:
+        check_same_request(running.request_hash, payload_hash, thread_id)
+        if request.async_mode:
+            return DeployResponse(status="running", thread_id=thread_id)
+        await asyncio.shield(running.done)
+        state = await get_agent().aget_state(config)
+        check_same_request(state.values.get("request_hash"), payload_hash, thread_id)
+        return state_response(thread_id, state.values)
+
+    # Claimed before the first await: concurrent retries attach to this run
+    claim = in_flight.start(thread_id, payload_hash)
+    handed_off = False
     try:
-        # Initial message to start the planning
-        user_msg = f"Deploy service '{request.service_id}' using '{request.strategy}' strategy. Note: {request.message}"
-        
-        # Run the agent
-        inputs = {
-            "messages": [HumanMessage(content=user_msg)], 
-            "service_id": request.service_id,
-            "github_token": request.github_token or "",
-            "repo_url": request.repo_url or "",
-            "app_name": request.app_name or request.service_id,
-            "branch": request.branch or "main",
-            "output_dir": request.output_dir or "dist",
-            "build_command": request.build_command or "npm run build"
-        }
-        
-        result = await agent.ainvoke(inputs, config=config)
-        
-        return DeployResponse(
-            status=result.get("deployment_status", "unknown"),
-            plan=result.get("plan"),
-            current_step_index=result.get("current_step_index"),
-            logs=[m.content for m in result["messages"] if hasattr(m, "content")]
-        )
+        state = await get_agent().aget_state(config)
+        if state and state.values:
+            check_same_request(state.values.get("request_hash"), payload_hash, thread_id)
+            if state.values.get("deployment_status") in TERMINAL_STATUSES:
+                return state_response(thread_id, state.values)
+            # Suspended or interrupted (e.g. the process restarted): continue from the checkpoint
+            inputs = await resume_input(config, state.values)
+        else:
+            inputs = build_inputs(request)
+
+        if request.async_mode:
+            progress_broker.open(thread_id)
+            await worker_pool.submit({
+                "thread_id": thread_id,
+                "service_id": request.service_id,
+                "inputs": inputs,
+                "config": config,
+                "claim": claim
+            })
+            # The job releases the claim when it finishes
+            handed_off = True
+            return DeployResponse(status="queued", thread_id=thread_id)
 
+        handed_off = True
+        return await run_deployment(thread_id, inputs, config, claim, aws_context)
+
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not handed_off:
+            in_flight.finish(thread_id, claim)
 
-@app.get("/deploy/{thread_id}/status", response_model=DeployResponse)
-async def get_status(thread_id: str):
+@app.post("/deploy/batch")
+async def deploy_batch(request: BatchDeployRequest):
+    """
+    Plans and deploys several services together, honoring `depends_on`.
+    Returns the aggregate status document immediately; poll GET /deploy/batch/{batch_id}.
+    """
+    from utils.batch import BatchValidationError
+
+    try:
+        return get_batch_scheduler().submit(request.batch_id, [s.model_dump() for s in request.services], request.depends_on,
+                                            request.max_concurrency, request.max_per_namespace)
+    except BatchValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/deploy/batch/{batch_id}")
+async def get_batch_status(batch_id: str):
+    batches = get_batch_scheduler().batches
+    if batch_id in batches:
+        return batches[batch_id]
+    raise HTTPException(status_code=404, detail="Batch not found")
+
+@app.post("/deploy/stream")
+async def deploy_stream(request: DeployRequest, http_request: Request):
+    """
+    Runs the deployment and streams node-by-node progress as Server-Sent Events.
+    """
+    thread_id = request.thread_id
+    config = build_config(thread_id, run_deadline(http_request.scope.get("aws.context")))
+    inputs = build_inputs(request)
+
+    # Same idempotency rules as /deploy, except that a running deployment can't be re-streamed here
+    running = in_flight.get(thread_id)
+    if running:
+        check_same_request(running.request_hash, inputs["request_hash"], thread_id)
+        raise HTTPException(status_code=409, detail=f"Deployment '{thread_id}' is running; follow it via /deploy/{thread_id}/events or /status")
+    claim = in_flight.start(thread_id, inputs["request_hash"])
+    try:
+        state = await get_agent().aget_state(config)
+        if state and state.values:
+            check_same_request(state.values.get("request_hash"), inputs["request_hash"], thread_id)
+            if state.values.get("deployment_status") in TERMINAL_STATUSES:
+                in_flight.finish(thread_id, claim)
+                done = {"status": state.values["deployment_status"], "timings": deployment_timings(thread_id)}
+                return StreamingResponse(iter([format_sse(done, event_type="end")]), media_type="text/event-stream")
+            inputs = await resume_input(config, state.values)
+    except BaseException:
+        in_flight.finish(thread_id, claim)
+        raise
+
+    # The run is detached from the response: a client that disconnects early
+    # stops receiving events, but the deployment finishes and releases its claim
+    progress_broker.open(thread_id)
+    run = asyncio.create_task(run_streamed_deployment(thread_id, inputs, config, claim))
+    _background_runs.add(run)
+    run.add_done_callback(_background_runs.discard)
+
+    async def events():
+        async for event in progress_broker.subscribe(thread_id):
+            yield format_sse(event)
+        event_type, event = await asyncio.shield(run)
+        yield format_sse(event, event_type=event_type)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/deploy/{thread_id}/resume", response_model=DeployResponse)
+async def resume_deployment(thread_id: str, http_request: Request):
+    """
+    Continues a suspended (or interrupted) deployment from its last checkpoint.
+    Steps that already finished are not run again; a finished deployment
+    just returns its result.
+    """
+    aws_context = http_request.scope.get("aws.context")
+    config = build_config(thread_id, run_deadline(aws_context))
+
+    if in_flight.get(thread_id):
+        raise HTTPException(status_code=409, detail=f"Deployment '{thread_id}' is already running")
+    claim = in_flight.start(thread_id, "")
+    handed_off = False
+    try:
+        state = await get_agent().aget_state(config)
+        if not state or not state.values:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+        values = state.values
+        if values.get("deployment_status") in TERMINAL_STATUSES:
+            return state_response(thread_id, values)
+
+        inputs = await resume_input(config, values)
+        handed_off = True
+        return await run_deployment(thread_id, inputs, config, claim, aws_context)
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if not handed_off:
+            in_flight.finish(thread_id, claim)
+
+@app.get("/deploy/{thread_id}/events")
+async def deploy_events(thread_id: str):
+    """
+    Streams progress of a background (async_mode) deployment as Server-Sent Events.
+    """
     config = {"configurable": {"thread_id": thread_id}}
-    
+
+    if not progress_broker.is_active(thread_id):
+        state = await get_agent().aget_state(config)
+        if not state or not state.values:
+            raise HTTPException(status_code=404, detail="Deployment not found")
+
+    async def events():
+        async for event in progress_broker.subscribe(thread_id):
+            yield format_sse(event)
+        state = await get_agent().aget_state(config)
+        job = worker_pool.job_status(thread_id)
+        end = {"status": state.values.get("deployment_status", "unknown")}
+        if job and job["status"] == "failed":
+            end = {"status": "failed", "error": job.get("error")}
+        yield format_sse(end, event_type="end")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def status_etag(checkpoint_id: Optional[str], job: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Weak ETag of a deployment's status document: it changes with every new
+    checkpoint, or when the worker pool reports the job queued or failed.
+    None for an unknown deployment.
+    """
+    if checkpoint_id is None and job is None:
+        return None
+    parts = [checkpoint_id or "none"]
+    if job and job["status"] in ("queued", "failed"):
+        parts.append(job["status"])
+    return 'W/"%s"' % ":".join(parts)
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or etag is None:
+        return False
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+async def latest_checkpoint_ids(thread_ids: List[str]) -> Dict[str, str]:
+    """Latest checkpoint id per thread, without loading the checkpoints where the store allows it."""
+    checkpointer = get_agent().checkpointer
+    if hasattr(checkpointer, "alatest_checkpoint_ids"):
+        return await checkpointer.alatest_checkpoint_ids(thread_ids)
+    saved = await asyncio.gather(*(checkpointer.aget_tuple({"configurable": {"thread_id": t}}) for t in thread_ids))
+    return {t: c.config["configurable"]["checkpoint_id"] for t, c in zip(thread_ids, saved) if c}
+
+
+async def load_status(thread_id: str, cursor: Optional[int] = None, limit: Optional[int] = None):
+    """
+    (status document, ETag) of a deployment, or (None, None) if it is unknown.
+    Reads the latest checkpoint directly instead of `aget_state`, which also
+    works out the graph's next tasks.
+    """
+    saved = await get_agent().checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+    job = worker_pool.job_status(thread_id)
+    values = saved.checkpoint["channel_values"] if saved else {}
+    etag = status_etag(saved.config["configurable"]["checkpoint_id"] if saved else None, job)
+
+    if not values:
+        if job:
+            return DeployResponse(status=job["status"], thread_id=thread_id, error=job.get("error")), etag
+        return None, None
+
+    status = values.get("deployment_status", "unknown")
+    # The checkpointer only knows about runs that have started; a re-queued
+    # thread or a crashed job is reported from the worker pool instead.
+    if job and job["status"] in ("queued", "failed"):
+        status = job["status"]
+    return state_response(thread_id, values, status, cursor, limit, error=job.get("error") if job else None), etag
+
+
+@app.get("/deploy/{thread_id}/status", response_model=DeployResponse)
+async def get_status(thread_id: str, response: Response, cursor: Optional[int] = None, since: Optional[int] = None,
+                     limit: Optional[int] = None, if_none_match: Optional[str] = Header(None)):
+    """
+    Returns the deployment status with an ETag derived from the latest
+    checkpoint id; send it back as If-None-Match to get 304 Not Modified
+    while nothing changed. Logs are paginated: pass the previous response's
+    `next_cursor` as `cursor` (or `since`) to get only newer lines.
+    """
     try:
-        state = await agent.aget_state(config)
-        if not state:
+        if if_none_match:
+            checkpoint_ids = await latest_checkpoint_ids([thread_id])
+            etag = status_etag(checkpoint_ids.get(thread_id), worker_pool.job_status(thread_id))
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+        document, etag = await load_status(thread_id, cursor if cursor is not None else since, limit)
+        if document is None:
             raise HTTPException(status_code=404, detail="Deployment not found")
-            
-        result = state.values
-        
-        return DeployResponse(
-            status=result.get("deployment_status", "unknown"),
-            plan=result.get("plan"),
-            current_step_index=result.get("current_step_index"),
-            logs=[m.content for m in result["messages"] if hasattr(m, "content")]
-        )
+        response.headers["ETag"] = etag
+        return document
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/deploy/status")
+async def get_statuses(request: BulkStatusRequest):
+    """
+    Status of many deployments in one call. Deployments whose ETag matches
+    `etags` come back as {"not_modified": true} without being loaded, so a
+    dashboard's polling cost follows what changed, not how many it watches.
+    """
+    try:
+        checkpoint_ids = await latest_checkpoint_ids(request.thread_ids)
+        results: Dict[str, Dict[str, Any]] = {}
+        changed = []
+        for thread_id in request.thread_ids:
+            etag = status_etag(checkpoint_ids.get(thread_id), worker_pool.job_status(thread_id))
+            if etag_matches(request.etags.get(thread_id), etag):
+                results[thread_id] = {"thread_id": thread_id, "etag": etag, "not_modified": True}
+            else:
+                changed.append(thread_id)
+
+        loaded = await asyncio.gather(*(load_status(t, request.since.get(t), request.limit) for t in changed))
+        for thread_id, (document, etag) in zip(changed, loaded):
+            if document is None:
+                results[thread_id] = {"thread_id": thread_id, "status": "not_found"}
+            else:
+                results[thread_id] = {**document.model_dump(exclude_none=True), "etag": etag}
+        return {"deployments": [results[t] for t in request.thread_ids]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/rollback")
+async def rollback(request: RollbackRequest):
+    """
+    Re-applies the service's last-known-good release from the release ledger
+    directly, without running the graph (no planner, CI or verifier LLM calls).
+    """
+    from utils.deployment_tools import lookup_service, rollback_deployment
+    from utils.release_ledger import get_release_ledger
+
+    service = await asyncio.to_thread(lookup_service, request.service_id)
+    if service is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    rollout_id = request.rollout_id
+    if not rollout_id:
+        current = await asyncio.to_thread(lambda: get_release_ledger().last_known_good(
+            request.service_id, service.get("namespace", "default")))
+        if current is None:
+            raise HTTPException(status_code=404, detail="No promoted release on record")
+        rollout_id = current["rollout_id"]
+    result = json.loads(await rollback_deployment.ainvoke(
+        {"service_id": request.service_id, "rollout_id": rollout_id, "reason": request.reason}))
+    if result["status"] != "success":
+        raise HTTPException(status_code=502, detail=result)
+    return {"rolled_back": rollout_id, **result}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Node, tool and LLM latency histograms and token counters (Prometheus text format).
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Mangum handler for AWS Lambda
 handler = Mangum(app)
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the suite off the shared /tmp databases and out of real sleeps
+_state_dir = tempfile.mkdtemp(prefix="kube-garden-tests-")
+for name in ("ARTIFACT_INDEX_PATH", "RELEASE_LEDGER_PATH", "LLM_CACHE_PATH", "SERVICE_REGISTRY_PATH", "CHECKPOINT_DB_PATH"):
+    os.environ.setdefault(name, os.path.join(_state_dir, name.lower().replace("_path", ".sqlite")))
+os.environ.setdefault("MOCK_LATENCY_SCALE", "0")
+os.environ.setdefault("MOCK_SEED", "7")
+
+import asyncio  # noqa: E402
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def healthy_pipeline(monkeypatch):
+    """Deployments that always pass: CI builds succeed and verification promotes, without the LLM."""
+    import agent
+    from utils import ci_tracker
+
+    monkeypatch.setattr(ci_tracker, "_fake_client", ci_tracker.FakeCodeBuildClient(0, 0, failure_rate=0, seed=1))
+    monkeypatch.setattr(ci_tracker, "_trackers", {})
+    monkeypatch.setenv("CI_POLL_MIN_SECONDS", "0.01")
+    monkeypatch.setenv("METRICS_COLLECTOR", "off")
+
+    async def promote(state, config):
+        return {"decision": "promote", "violations": [], "borderline": [], "metrics": {}, "policy": {}}
+
+    monkeypatch.setattr(agent, "fetch_verdict", promote)
+
+
+@pytest.fixture
+def api():
+    """
+    Sends requests to the FastAPI app, concurrently on one event loop:
+    api(("POST", "/deploy", {"json": ...}), ...) returns their responses.
+    """
+    import httpx
+    import server
+
+    def send(*requests):
+        async def main():
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+                return await asyncio.gather(*(client.request(method, path, **(kwargs[0] if kwargs else {}))
+                                              for method, path, *kwargs in requests))
+
+        return asyncio.run(main())
+
+    return send
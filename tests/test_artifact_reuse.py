@@ -0,0 +1,81 @@
+import pytest
+
+from utils import ci_tracker
+from utils.artifact_index import ArtifactIndex, artifact_key, build_config_hash, image_tag_for
+
+SERVICE = {"build_command": "make", "dockerfile": "Dockerfile", "runtime": "python3.12"}
+
+
+@pytest.fixture
+def deploy(api, healthy_pipeline, request):
+    """Deploys demo-api at a commit; returns the response and the CI builds it started."""
+    calls = []
+
+    def run(commit_sha):
+        before = len(ci_tracker._fake_client.builds)
+        thread_id = f"reuse-{request.node.name}-{len(calls)}"
+        response, = api(("POST", "/deploy", {"json": {
+            "thread_id": thread_id, "service_id": "demo-api", "commit_sha": commit_sha}}))
+        calls.append(thread_id)
+        return response.json(), len(ci_tracker._fake_client.builds) - before
+
+    return run
+
+
+def reused(response):
+    return sorted(s["name"] for s in response["plan"]["steps"] if s.get("reused"))
+
+
+def test_second_deploy_of_a_commit_reuses_its_artifacts(deploy):
+    first, first_builds = deploy("1" * 40)
+    second, second_builds = deploy("1" * 40)
+
+    assert first["status"] == second["status"] == "completed"
+    assert reused(first) == []
+    assert reused(second) == ["build_image", "run_unit_tests"]
+    # Only the steps that aren't reusable ran again
+    assert second_builds == first_builds - 2
+    reuse_results = [r for r in second["step_results"] if r["tool"] == "artifact_index"]
+    assert {r["step"] for r in reuse_results} == {"run_unit_tests", "build_image"}
+    assert next(r for r in reuse_results if r["step"] == "build_image")["result"]["image_tag"] == image_tag_for("1" * 40)
+
+
+def test_other_commit_is_not_reused(deploy):
+    deploy("2" * 40)
+    other, builds = deploy("3" * 40)
+
+    assert other["status"] == "completed"
+    assert reused(other) == []
+    assert builds == 4
+
+
+def test_failed_build_is_not_reused(deploy, monkeypatch):
+    monkeypatch.setattr(ci_tracker._fake_client, "failure_rate", 1)
+    failed, _ = deploy("4" * 40)
+    assert failed["status"] != "completed"
+
+    monkeypatch.setattr(ci_tracker._fake_client, "failure_rate", 0)
+    retried, builds = deploy("4" * 40)
+
+    assert retried["status"] == "completed"
+    assert reused(retried) == []
+    assert builds == 4
+
+
+def test_index_is_keyed_by_repo_commit_and_build_config(tmp_path):
+    index = ArtifactIndex(str(tmp_path / "artifacts.sqlite"))
+    key = artifact_key("https://github.com/acme/demo-api", "5" * 40, SERVICE)
+    index.record(key, "build_image", "build:1", image_tag_for("5" * 40))
+
+    assert index.lookup(key)["build_image"]["image_tag"] == "sha-555555555555"
+    assert index.lookup(key._replace(commit_sha="6" * 40)) == {}
+    assert index.lookup(artifact_key(key.repo_url, key.commit_sha, {**SERVICE, "runtime": "python3.13"})) == {}
+    assert build_config_hash(SERVICE) == build_config_hash({**SERVICE, "replicas": 3})
+
+    index.forget(key)
+    assert index.lookup(key) == {}
+
+
+def test_build_without_a_commit_has_no_key():
+    assert artifact_key("https://github.com/acme/demo-api", "", SERVICE) is None
+    assert artifact_key("", "7" * 40, SERVICE) is None
@@ -0,0 +1,48 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from utils.deployment_tools import (
+    deploy_to_k8s,
+    generate_deployment_plan,
+    get_service_metadata,
+    promote_rollout,
+    rollback_deployment,
+)
+from utils.release_ledger import ReleaseLedger
+from utils.service_registry import ServiceRegistry
+
+
+@pytest.fixture
+def sqlite_threads(monkeypatch):
+    """Thread ids that called into the registry or the release ledger."""
+    threads = set()
+    for cls, names in ((ServiceRegistry, ("get", "get_many")),
+                       (ReleaseLedger, ("stage", "release", "promote", "mark_rolled_back", "last_known_good"))):
+        for name in names:
+            original = getattr(cls, name)
+
+            def recorded(self, *args, _original=original, **kwargs):
+                threads.add(threading.get_ident())
+                return _original(self, *args, **kwargs)
+            monkeypatch.setattr(cls, name, recorded)
+    return threads
+
+
+def test_async_tools_keep_sqlite_off_the_event_loop(sqlite_threads, monkeypatch):
+    monkeypatch.delenv("K8S_API_URL", raising=False)
+    monkeypatch.delenv("USE_REAL_AWS", raising=False)
+
+    async def main():
+        await get_service_metadata.ainvoke({"service_id": "demo-api"})
+        await generate_deployment_plan.ainvoke({"service_id": "demo-api", "strategy": "canary"})
+        deployed = json.loads(await deploy_to_k8s.ainvoke({"service_id": "demo-api", "version": "v2", "strategy": "canary"}))
+        await promote_rollout.ainvoke({"service_id": "demo-api", "rollout_id": deployed["rollout_id"]})
+        await rollback_deployment.ainvoke({"service_id": "demo-api", "rollout_id": deployed["rollout_id"], "reason": "test"})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert sqlite_threads
+    assert loop_thread not in sqlite_threads
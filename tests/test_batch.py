@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from utils.batch import BatchScheduler, BatchValidationError
+
+
+class Recorder:
+    def __init__(self, seconds=0.02):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, job):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.seconds)
+        self.running -= 1
+        return "failed" if job["service_id"].startswith("bad") else "completed"
+
+
+def items(prefix, n):
+    return [{"service_id": f"{prefix}{i}", "strategy": "canary"} for i in range(n)]
+
+
+async def drain(scheduler):
+    while scheduler._tasks:
+        await asyncio.sleep(0.01)
+
+
+def test_limits_hold_across_batches():
+    async def main():
+        recorder = Recorder()
+        scheduler = BatchScheduler(recorder, max_concurrency=3, max_per_namespace=3)
+        first = scheduler.submit("b1", items("a", 5), {}, max_concurrency=100)
+        second = scheduler.submit("b2", items("b", 5), {})
+        await drain(scheduler)
+        return recorder, first, second
+
+    recorder, first, second = asyncio.run(main())
+    assert recorder.peak == 3
+    assert first["limits"] == {"max_concurrency": 3, "max_per_namespace": 3}
+    assert first["status"] == second["status"] == "completed"
+
+
+def test_batch_can_ask_for_lower_limits():
+    async def main():
+        recorder = Recorder()
+        scheduler = BatchScheduler(recorder, max_concurrency=8, max_per_namespace=8)
+        doc = scheduler.submit("b1", items("a", 6), {}, max_concurrency=2)
+        await drain(scheduler)
+        return recorder, doc
+
+    recorder, doc = asyncio.run(main())
+    assert recorder.peak == 2
+    assert doc["limits"]["max_concurrency"] == 2
+
+
+def test_rejects_limits_below_one():
+    async def main():
+        scheduler = BatchScheduler(Recorder(), max_concurrency=2, max_per_namespace=2)
+        with pytest.raises(BatchValidationError):
+            scheduler.submit("b1", items("a", 1), {}, max_per_namespace=0)
+        assert "b1" not in scheduler.batches
+
+    asyncio.run(main())
+
+
+def test_failed_dependency_skips_dependents():
+    async def main():
+        scheduler = BatchScheduler(Recorder(), max_concurrency=2, max_per_namespace=2)
+        doc = scheduler.submit("b1", [{"service_id": "bad", "strategy": "canary"}, {"service_id": "web", "strategy": "canary"}],
+                               {"web": ["bad"]})
+        await drain(scheduler)
+        return doc
+
+    doc = asyncio.run(main())
+    assert doc["services"]["web"]["status"] == "skipped"
+    assert doc["status"] == "failed"
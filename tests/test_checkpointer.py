@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from utils.checkpointer import SQLiteCheckpointer
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), max_checkpoints_per_thread=3, trim_batch=2)
+    yield saver
+    saver.conn.close()
+
+
+def put(saver, thread_id, values, parent_id=None, step=0):
+    """Writes a checkpoint whose channels all get a new version; returns its config."""
+    checkpoint = empty_checkpoint()
+    versions = {}
+    previous = saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+    for channel in values:
+        current = previous.checkpoint["channel_versions"].get(channel) if previous else None
+        versions[channel] = saver.get_next_version(current, None)
+    if previous:
+        checkpoint["channel_versions"] = {**previous.checkpoint["channel_versions"], **versions}
+    else:
+        checkpoint["channel_versions"] = versions
+    checkpoint["channel_values"] = values
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    if parent_id:
+        config["configurable"]["checkpoint_id"] = parent_id
+    return saver.put(config, checkpoint, {"source": "loop", "step": step}, versions)
+
+
+def test_put_get_and_list_round_trip(saver):
+    first = put(saver, "t1", {"service_id": "demo-api", "deployment_status": "pending"})
+    second = put(saver, "t1", {"deployment_status": "deploying"}, parent_id=first["configurable"]["checkpoint_id"], step=1)
+    saver.put_writes(second, [("deployment_status", "verifying"), ("step_results", [{"step": "deploy"}])], task_id="task-1")
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "t1"}})
+
+    assert latest.config == second
+    # Unchanged channels resolve to the blob stored by the earlier checkpoint
+    assert latest.checkpoint["channel_values"] == {"service_id": "demo-api", "deployment_status": "deploying"}
+    assert latest.metadata == {"source": "loop", "step": 1}
+    assert latest.parent_config == first
+    assert latest.pending_writes == [
+        ("task-1", "deployment_status", "verifying"),
+        ("task-1", "step_results", [{"step": "deploy"}]),
+    ]
+
+    listed = list(saver.list({"configurable": {"thread_id": "t1"}}))
+    assert [item.config for item in listed] == [second, first]
+    assert listed[1].parent_config is None
+    assert listed[1].checkpoint["channel_values"]["deployment_status"] == "pending"
+    assert [item.config for item in saver.list(None, filter={"step": 0})] == [first]
+    assert [item.config for item in saver.list(None, before=second)] == [first]
+    assert saver.get_tuple(first).checkpoint["channel_values"]["deployment_status"] == "pending"
+
+
+def test_metadata_is_loaded_with_its_own_serde_type(saver):
+    config = put(saver, "t1", {"deployment_status": "pending"})
+
+    checkpoint_type, metadata_type = saver.conn.execute(
+        "SELECT type, metadata_type FROM checkpoints WHERE checkpoint_id=?", (config["configurable"]["checkpoint_id"],)
+    ).fetchone()
+    assert metadata_type == saver.serde.dumps_typed({"source": "loop"})[0]
+    assert saver.get_tuple(config).metadata["source"] == "loop"
+    assert checkpoint_type
+
+
+def test_trim_keeps_newest_checkpoints_and_their_blobs(saver):
+    configs = [put(saver, "t1", {"service_id": "demo-api", "deployment_status": "pending"})]
+    for step in range(1, 6):
+        configs.append(put(saver, "t1", {"deployment_status": f"step-{step}"}, configs[-1]["configurable"]["checkpoint_id"], step))
+
+    # A cap of three with a batch of two: the fifth put trimmed back to three,
+    # the sixth is waiting for the next batch
+    assert [item.config for item in saver.list({"configurable": {"thread_id": "t1"}})] == configs[-4:][::-1]
+    saver._trim_thread("t1", "")
+    assert len(list(saver.list({"configurable": {"thread_id": "t1"}}))) == 4
+    saver._trim_thread("t1", "", force=True)
+    assert [item.config for item in saver.list({"configurable": {"thread_id": "t1"}})] == configs[-3:][::-1]
+
+    oldest_kept = saver.get_tuple(configs[-3])
+    # service_id was only written by the first, now trimmed, checkpoint
+    assert oldest_kept.checkpoint["channel_values"] == {"service_id": "demo-api", "deployment_status": "step-3"}
+    (blobs,) = saver.conn.execute("SELECT COUNT(*) FROM blobs WHERE channel='deployment_status'").fetchone()
+    assert blobs == 3
+
+
+def test_terminal_status_trims_immediately(saver):
+    config = put(saver, "t1", {"deployment_status": "pending"})
+    for step in range(1, 4):
+        status = "completed" if step == 3 else f"step-{step}"
+        config = put(saver, "t1", {"deployment_status": status}, config["configurable"]["checkpoint_id"], step)
+
+    assert len(list(saver.list({"configurable": {"thread_id": "t1"}}))) == 3
+
+
+def test_eviction_removes_only_expired_terminal_threads(saver):
+    for thread_id, status in [("done", "completed"), ("failed", "failed"), ("running", "verifying"), ("fresh", "completed")]:
+        put(saver, thread_id, {"deployment_status": status})
+    long_ago = time.time() - saver.ttl_seconds - 60
+    saver.conn.execute("UPDATE threads SET updated_at=? WHERE thread_id IN ('done', 'failed', 'running')", (long_ago,))
+
+    assert saver.evict_finished() == 2
+
+    remaining = {item.config["configurable"]["thread_id"] for item in saver.list(None)}
+    assert remaining == {"running", "fresh"}
+    (orphans,) = saver.conn.execute("SELECT COUNT(*) FROM blobs WHERE thread_id IN ('done', 'failed')").fetchone()
+    assert orphans == 0
@@ -0,0 +1,73 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from utils import ci_tracker
+from utils.ci_tracker import BuildTracker, FakeCodeBuildClient
+
+
+class FakeClock:
+    """Stands in for the `time` module in utils.ci_tracker: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+def test_failed_build_is_reported():
+    client = FakeCodeBuildClient(0, 0, failure_rate=1, seed=1)
+    tracker = BuildTracker(client, min_interval=0.01, max_interval=0.01)
+    build = tracker.start("demo-api", "run_unit_tests")
+
+    assert tracker.wait_sync([build["build_id"]])[build["build_id"]]["status"] == "failed"
+    assert asyncio.run(tracker.wait([build["build_id"]]))[build["build_id"]]["build_status"] == "FAILED"
+
+
+def test_poll_interval_backs_off_and_resets(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ci_tracker, "time", clock)
+    client = FakeCodeBuildClient(1.0, 1.0, failure_rate=0, seed=1)
+    tracker = BuildTracker(client, min_interval=0.1, max_interval=0.4, backoff=2)
+
+    first = tracker.start("demo-api", "run_unit_tests")["build_id"]
+    clock.now = 0.7
+    second = tracker.start("demo-api", "run_lint")["build_id"]
+    clock.now = 0.0
+    done = tracker.wait_sync([first, second])
+
+    assert {b["status"] for b in done.values()} == {"success"}
+    # 0.2, 0.4, 0.4 until the first build finishes at 1.0, then back to the minimum
+    assert clock.sleeps[:3] == [0.2, 0.4, 0.4]
+    assert clock.sleeps[3] == 0.1
+    # One batched lookup per poll covers both builds
+    assert client.batch_calls == len(clock.sleeps) + 1
+
+
+def test_failed_ci_step_fails_the_deployment(monkeypatch):
+    import agent
+
+    monkeypatch.setattr(ci_tracker, "_fake_client", FakeCodeBuildClient(0, 0, failure_rate=1, seed=1))
+    monkeypatch.setattr(ci_tracker, "_trackers", {})
+    monkeypatch.setenv("CI_POLL_MIN_SECONDS", "0.01")
+    monkeypatch.setenv("METRICS_COLLECTOR", "off")
+
+    graph = agent.build_graph(MemorySaver())
+    result = asyncio.run(graph.ainvoke(
+        {"messages": [HumanMessage(content="Deploy demo-api")], "service_id": "demo-api", "strategy": "canary",
+         "planning_mode": "auto", "step_results": []},
+        {"configurable": {"thread_id": "ci-failure"}, "recursion_limit": 100},
+    ))
+
+    assert result["deployment_status"] == "failed"
+    assert "ended FAILED" in result["error"]
+    steps = {s["name"]: s["status"] for s in result["plan"]["steps"]}
+    assert steps["deploy_canary"] == "pending"
+    assert not result.get("rollout_id")
@@ -0,0 +1,99 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from utils import compaction
+from utils.compaction import SUMMARY_ID, compact_messages, message_seq, paginate_logs
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    monkeypatch.setattr(compaction, "MESSAGE_WINDOW", 4)
+
+
+def ai(content):
+    return AIMessage(content=content)
+
+
+def tool(content, name="wait_for_ci_builds"):
+    return ToolMessage(content=content, name=name, tool_call_id="call_" + name)
+
+
+def history(count):
+    """The request followed by `count` AI messages, added one node update at a time."""
+    messages = compact_messages([], [HumanMessage(content="Deploy demo-api")])
+    for i in range(count):
+        messages = compact_messages(messages, [ai(f"step {i}")])
+    return messages
+
+
+def test_ids_are_assigned_in_sequence():
+    messages = compact_messages([], [HumanMessage(content="Deploy"), ai("plan")])
+    messages = compact_messages(messages, [ai("run"), tool("done")])
+
+    assert [m.id for m in messages] == ["msg-0", "msg-1", "msg-2", "msg-3"]
+    assert [message_seq(m) for m in messages] == [0, 1, 2, 3]
+
+
+def test_window_is_kept_whole_until_it_overflows():
+    # Request + window + room for the summary
+    assert len(history(5)) == 6
+    assert all(m.id != SUMMARY_ID for m in history(5))
+
+
+def test_summary_replaces_messages_past_the_window():
+    messages = history(8)
+
+    assert isinstance(messages[0], HumanMessage)
+    assert messages[1].id == SUMMARY_ID
+    assert [m.content for m in messages[2:]] == ["step 4", "step 5", "step 6", "step 7"]
+    assert messages[1].additional_kwargs["compacted"] == 4
+
+    # A later overflow folds more messages into the same running summary
+    messages = compact_messages(messages, [ai("step 8")])
+    assert [m.id for m in messages].count(SUMMARY_ID) == 1
+    assert messages[1].additional_kwargs["compacted"] == 5
+    assert [message_seq(m) for m in messages[2:]] == [6, 7, 8, 9]
+
+
+def test_window_never_starts_with_a_tool_result():
+    messages = compact_messages([], [HumanMessage(content="Deploy")])
+    for i in range(3):
+        messages = compact_messages(messages, [ai(f"call {i}"), tool(f"result {i}", name=f"tool_{i}")])
+
+    assert not isinstance(messages[2], ToolMessage)
+    assert messages[1].additional_kwargs["tools"] == ["tool_0"]
+
+
+def test_reapplying_messages_is_a_no_op():
+    messages = history(8)
+
+    assert compact_messages(messages, messages[-3:]) == messages
+    assert compact_messages(messages, messages) == messages
+    # Messages already folded into the summary are not brought back
+    assert compact_messages(messages, [ai("step 0").model_copy(update={"id": "msg-1"})]) == messages
+
+
+def test_reapplied_message_with_the_same_id_replaces_it():
+    messages = history(3)
+    edited = messages[-1].model_copy(update={"content": "step 2 (edited)"})
+
+    updated = compact_messages(messages, [edited])
+
+    assert [m.id for m in updated] == [m.id for m in messages]
+    assert updated[-1].content == "step 2 (edited)"
+
+
+def test_paginate_logs():
+    messages = history(8)
+
+    logs, cursor = paginate_logs(messages)
+    assert logs[0] == "Deploy demo-api"
+    assert logs[1].startswith("[4 earlier messages compacted")
+    assert cursor == 8
+
+    page, page_cursor = paginate_logs(messages, cursor=5, limit=1)
+    assert page == ["step 5"]
+    assert page_cursor == 6
+    assert paginate_logs(messages, cursor=page_cursor) == (["step 6", "step 7"], 8)
+    # Caught up: the cursor stays where it was
+    assert paginate_logs(messages, cursor=8) == ([], 8)
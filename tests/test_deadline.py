@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from utils import deployment_tools, k8s_clients
+from utils.fake_kube_api import FakeKubeAPI
+
+
+@pytest.fixture
+def kube(monkeypatch, healthy_pipeline):
+    kube_api = FakeKubeAPI(rollout_seconds=1.0)
+    monkeypatch.setenv("K8S_API_URL", kube_api.start())
+    monkeypatch.setattr(k8s_clients, "_manager", None)
+    yield kube_api
+    kube_api.stop()
+
+
+def steps(response):
+    return {s["name"]: s["status"] for s in response["plan"]["steps"]}
+
+
+def test_rollout_wait_is_capped_by_the_budget_then_resumed(kube, api, monkeypatch):
+    monkeypatch.setenv("DEPLOY_TIME_BUDGET_SECONDS", "0.3")
+
+    started = time.monotonic()
+    first, = api(("POST", "/deploy", {"json": {"thread_id": "budget-1", "service_id": "demo-api"}}))
+    first = first.json()
+
+    # The one-second rollout did not hold the run past its budget
+    assert time.monotonic() - started < 1.0
+    assert first["status"] == "suspended"
+    assert steps(first)["run_unit_tests"] == "success"
+    assert steps(first)["deploy_canary"] == "pending"
+    assert first["plan"]["steps"][first["current_step_index"]]["name"] == "deploy_canary"
+
+    monkeypatch.delenv("DEPLOY_TIME_BUDGET_SECONDS")
+    resumed, = api(("POST", "/deploy/budget-1/resume"))
+    resumed = resumed.json()
+
+    assert resumed["status"] == "completed"
+    assert steps(resumed)["deploy_canary"] == "success"
+    # Finished steps were not run again
+    assert [r["step"] for r in resumed["step_results"]].count("run_unit_tests") == 1
+    assert ("default", "demo-api-canary") not in kube.deployments
+
+
+def test_verifier_suspends_when_the_budget_is_gone(monkeypatch):
+    import agent
+
+    monkeypatch.setattr(agent, "fetch_verdict", lambda state, config: pytest.fail("verified past the deadline"))
+    state = {"service_id": "demo-api", "rollout_id": "ro-1", "current_step_index": 3, "strategy": "canary"}
+
+    update = asyncio.run(agent.verifier_node(state, {"configurable": {"deadline": time.time() - 1}}))
+
+    assert update == {"deployment_status": "suspended"}
+
+
+def test_promote_still_rolling_out_at_the_deadline_is_suspended(kube):
+    deployed = json.loads(deployment_tools.deploy_to_k8s.invoke(
+        {"service_id": "demo-api", "version": "v2.0.0", "strategy": "canary"}))
+    assert deployed["status"] == "success"
+
+    promoted = json.loads(deployment_tools.promote_rollout.invoke(
+        {"service_id": "demo-api", "rollout_id": deployed["rollout_id"], "timeout_seconds": 0.1}))
+
+    assert promoted["status"] == "suspended"
+    # Not promoted yet: the canary stays until the resumed run promotes again
+    assert ("default", "demo-api-canary") in kube.deployments
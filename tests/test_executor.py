@@ -0,0 +1,89 @@
+import json
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+import agent
+from utils import ci_tracker
+
+
+def canary_plan():
+    return json.loads(agent.generate_deployment_plan.invoke({"service_id": "demo-api", "strategy": "canary"}))
+
+
+def started(step_name):
+    return ToolMessage(content=json.dumps({"status": "started", "build_id": f"build-{step_name}", "step_name": step_name}),
+                       name="start_ci_build", tool_call_id=f"call_{step_name}")
+
+
+def waited(**statuses):
+    builds = {f"build-{name}": {"status": status, "build_status": status.upper()} for name, status in statuses.items()}
+    return ToolMessage(content=json.dumps({"builds": builds}), name="wait_for_ci_builds", tool_call_id="call_wait_for_ci_builds")
+
+
+def test_ci_group_is_issued_as_one_batch():
+    state = {"service_id": "demo-api", "plan": canary_plan(), "current_step_index": 0, "messages": []}
+
+    update = agent.executor_node(state, {})
+
+    calls = update["messages"][0].tool_calls
+    assert [c["args"]["step_name"] for c in calls] == ["run_unit_tests", "run_lint", "security_scan"]
+    assert {c["name"] for c in calls} == {"start_ci_build"}
+
+    # build_image is not part of the group and runs on its own
+    update = agent.executor_node({**state, "current_step_index": 3}, {})
+    assert [c["args"]["step_name"] for c in update["messages"][0].tool_calls] == ["build_image"]
+
+
+def test_batch_results_are_merged_before_advancing():
+    plan = canary_plan()
+    state = {"service_id": "demo-api", "plan": plan, "current_step_index": 0, "pending_builds": {},
+             # ToolNode may finish the calls in any order
+             "messages": [AIMessage(content=""), started("security_scan"), started("run_unit_tests"), started("run_lint")]}
+
+    update = agent.execution_result_node(state)
+
+    assert [s["status"] for s in update["plan"]["steps"][:3]] == ["running"] * 3
+    assert {b["step_name"] for b in update["pending_builds"].values()} == {"run_unit_tests", "run_lint", "security_scan"}
+    assert "current_step_index" not in update
+
+    # One build finishes first: the index waits for the rest of the batch
+    state = {**state, **update, "messages": [AIMessage(content=""), waited(run_lint="success")]}
+    update = agent.execution_result_node(state)
+    assert set(update["pending_builds"]) == {"build-run_unit_tests", "build-security_scan"}
+    assert "current_step_index" not in update
+
+    state = {**state, **update, "messages": [AIMessage(content=""), waited(run_unit_tests="success", security_scan="success")]}
+    update = agent.execution_result_node(state)
+    assert update["current_step_index"] == 3
+    assert [s["status"] for s in update["plan"]["steps"][:3]] == ["success"] * 3
+    assert {r["step"] for r in update["step_results"]} == {"run_unit_tests", "security_scan"}
+
+
+def test_failed_build_in_the_batch_fails_the_deployment_once_settled():
+    plan = canary_plan()
+    for i, step in enumerate(plan["steps"][:3]):
+        step.update(status="running", build_id=f"build-{step['name']}")
+    pending = {f"build-{s['name']}": {"step_index": i, "step_name": s["name"]} for i, s in enumerate(plan["steps"][:3])}
+    state = {"service_id": "demo-api", "plan": plan, "current_step_index": 0, "pending_builds": pending,
+             "messages": [AIMessage(content=""), waited(run_unit_tests="success", run_lint="failed", security_scan="success")]}
+
+    update = agent.execution_result_node(state)
+
+    assert update["deployment_status"] == "failed"
+    assert update["error"] == "run_lint: CI build build-run_lint ended FAILED"
+    assert [s["status"] for s in update["plan"]["steps"][:3]] == ["success", "failed", "success"]
+
+
+def test_ci_group_builds_run_concurrently(api, healthy_pipeline, monkeypatch):
+    client = ci_tracker.FakeCodeBuildClient(0.3, 0.3, failure_rate=0, seed=1)
+    monkeypatch.setattr(ci_tracker, "_fake_client", client)
+
+    response, = api(("POST", "/deploy", {"json": {"thread_id": "executor-ci-group", "service_id": "demo-api"}}))
+    assert response.json()["status"] == "completed"
+
+    ends = {next(v["value"] for v in b["environmentVariables"] if v["name"] == "CI_STEP"): b["ends_at"]
+            for b in client.builds.values()}
+    group = [ends["run_unit_tests"], ends["run_lint"], ends["security_scan"]]
+    # The three grouped builds were started together, build_image once all had finished
+    assert max(group) - min(group) < 0.1
+    assert ends["build_image"] - max(group) >= 0.25
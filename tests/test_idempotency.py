@@ -0,0 +1,68 @@
+import pytest
+
+import server
+from utils import deployment_tools
+from utils.idempotency import request_hash
+
+REQUEST = {"thread_id": "idem-1", "service_id": "demo-api", "github_token": "ghp_first"}
+
+
+@pytest.fixture
+def runs(monkeypatch, healthy_pipeline):
+    """Thread ids the graph was actually run for, in order."""
+    started = []
+    run_deployment = server.run_deployment
+
+    async def counting(thread_id, *args, **kwargs):
+        started.append(thread_id)
+        return await run_deployment(thread_id, *args, **kwargs)
+
+    monkeypatch.setattr(server, "run_deployment", counting)
+    return started
+
+
+def deploy(body):
+    return ("POST", "/deploy", {"json": body})
+
+
+def test_request_hash_ignores_credentials_and_transport_fields():
+    base = {"service_id": "demo-api", "strategy": "canary", "github_token": "ghp_a", "thread_id": "t1", "async_mode": False}
+
+    assert request_hash(base) == request_hash({**base, "github_token": "ghp_b", "thread_id": "t2", "async_mode": True})
+    assert request_hash(base) != request_hash({**base, "strategy": "rolling"})
+
+
+def test_retry_of_a_finished_deployment_replays_its_result(api, runs):
+    first, = api(deploy(REQUEST))
+    # A rotated token is still the same request
+    retry, = api(deploy({**REQUEST, "github_token": "ghp_rotated"}))
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["status"] == first.json()["status"] == "completed"
+    assert retry.json()["plan"] == first.json()["plan"]
+    assert runs == ["idem-1"]
+
+
+def test_different_request_on_the_same_thread_is_a_conflict(api, runs):
+    api(deploy({**REQUEST, "thread_id": "idem-2"}))
+
+    conflict, = api(deploy({**REQUEST, "thread_id": "idem-2", "strategy": "rolling"}))
+
+    assert conflict.status_code == 409
+    assert runs == ["idem-2"]
+
+
+def test_concurrent_duplicates_attach_to_one_run(api, runs, monkeypatch):
+    # Slow enough that the duplicates arrive while the first one runs
+    monkeypatch.setattr(deployment_tools, "MOCK_LATENCY_SCALE", 0.1)
+    body = {**REQUEST, "thread_id": "idem-3"}
+
+    responses = api(deploy(body), deploy(body), deploy({**body, "async_mode": True}))
+
+    assert runs == ["idem-3"]
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert [r.json()["status"] for r in responses[:2]] == ["completed", "completed"]
+    assert responses[0].json()["step_results"] == responses[1].json()["step_results"]
+    # async_mode reports the running deployment instead of queueing another
+    assert responses[2].json()["status"] == "running"
+    assert server.in_flight.get("idem-3") is None
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.fake_kube_api import FakeKubeAPI
+from utils.k8s_clients import FIELD_MANAGER, ClusterClientManager, deployment_manifest
+
+SERVICE = {"id": "demo-api", "namespace": "default", "canary_replicas": 2}
+
+
+@pytest.fixture
+def kube():
+    api = FakeKubeAPI(rollout_seconds=0.2)
+    manager = ClusterClientManager(api_url=api.start())
+    yield api, manager
+    api.stop()
+
+
+def test_server_side_apply_then_watch_until_ready(kube):
+    api, manager = kube
+    manifest = deployment_manifest(SERVICE, "demo-api-canary", "v2", "canary")
+
+    applied = manager.apply("c", manifest)
+    started = time.monotonic()
+    ready, deployment = manager.wait_for_rollout("c", "default", "demo-api-canary", timeout=5)
+
+    assert applied.metadata.generation == 1
+    assert api.applies == [{"name": "demo-api-canary", "field_manager": FIELD_MANAGER, "force": "true"}]
+    assert ready
+    assert deployment.status.available_replicas == 2
+    # Woken by the watch event, not by a fixed poll interval
+    assert time.monotonic() - started < 1
+
+
+def test_async_apply_then_watch_until_ready(kube):
+    api, manager = kube
+    manifest = deployment_manifest(SERVICE, "demo-api-canary", "v2", "canary")
+
+    async def main():
+        applied = await manager.aapply("c", manifest)
+        ready, deployment = await manager.await_rollout("c", "default", "demo-api-canary", timeout=5)
+        return applied, ready, deployment
+
+    applied, ready, deployment = asyncio.run(main())
+    assert applied["metadata"]["generation"] == 1
+    assert ready
+    assert deployment["status"]["availableReplicas"] == 2
+
+
+def test_reapplying_the_same_spec_is_already_ready(kube):
+    api, manager = kube
+    manifest = deployment_manifest(SERVICE, "demo-api-canary", "v2", "canary")
+    manager.apply("c", manifest)
+    assert manager.wait_for_rollout("c", "default", "demo-api-canary", timeout=5)[0]
+
+    again = manager.apply("c", manifest)
+    requests = api.requests
+    ready, _ = manager.wait_for_rollout("c", "default", "demo-api-canary", timeout=5)
+
+    assert again.metadata.generation == 1
+    assert ready
+    # A single list answers it; no watch was opened
+    assert api.requests == requests + 1
+
+
+def test_rollout_not_ready_before_timeout():
+    api = FakeKubeAPI(rollout_seconds=30)
+    manager = ClusterClientManager(api_url=api.start())
+    try:
+        manager.apply("c", deployment_manifest(SERVICE, "demo-api", "v2", "rolling"))
+        ready, _ = manager.wait_for_rollout("c", "default", "demo-api", timeout=1)
+        assert not ready
+    finally:
+        api.stop()
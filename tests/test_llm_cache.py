@@ -0,0 +1,105 @@
+import pytest
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from utils.llm_cache import LLMCacheMiss, TieredLLMCache, cache_key, normalize_prompt
+
+LLM = "gpt-4o-mini|tools=deploy_to_k8s"
+
+
+def prompt(*messages):
+    """Serializes a conversation the way the chat model passes it to the cache."""
+    return dumps(list(messages))
+
+
+def reply(content="Deploying canary"):
+    return [ChatGeneration(message=AIMessage(content=content))]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "llm-cache.sqlite")
+
+
+def test_volatile_fields_do_not_change_the_key():
+    first = prompt(HumanMessage(content="Deploy demo-api", id="msg-0"),
+                   AIMessage(content="ok", id="run-1", usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12},
+                             response_metadata={"model_name": "gpt-4o-mini"}))
+    second = prompt(HumanMessage(content="Deploy demo-api", id="msg-7"),
+                    AIMessage(content="ok", id="run-2", usage_metadata={"input_tokens": 11, "output_tokens": 3, "total_tokens": 14}))
+
+    assert normalize_prompt(first) == normalize_prompt(second)
+    assert cache_key(normalize_prompt(first), LLM) == cache_key(normalize_prompt(second), LLM)
+
+
+def test_content_and_model_change_the_key():
+    base = normalize_prompt(prompt(HumanMessage(content="Deploy demo-api")))
+    other = normalize_prompt(prompt(HumanMessage(content="Deploy web-app")))
+
+    assert base != other
+    assert cache_key(base, LLM) != cache_key(base, "gpt-4o|tools=deploy_to_k8s")
+
+
+def test_non_json_prompt_is_left_alone():
+    assert normalize_prompt("plain text prompt") == "plain text prompt"
+
+
+def test_readwrite_serves_hits_across_restarts(cache_path):
+    cache = TieredLLMCache(cache_path)
+    key_prompt = prompt(HumanMessage(content="Deploy demo-api", id="a"))
+    assert cache.lookup(key_prompt, LLM) is None
+
+    cache.update(key_prompt, LLM, reply())
+    restarted = TieredLLMCache(cache_path)
+    hit = restarted.lookup(prompt(HumanMessage(content="Deploy demo-api", id="b")), LLM)
+
+    assert hit[0].message.content == "Deploying canary"
+    assert (cache.misses, restarted.hits) == (1, 1)
+
+
+def test_plain_generations_round_trip(cache_path):
+    cache = TieredLLMCache(cache_path)
+    cache.update("plain text prompt", LLM, [Generation(text="done")])
+
+    assert cache.lookup("plain text prompt", LLM) == [Generation(text="done")]
+
+
+def test_record_always_calls_the_model_and_stores(cache_path):
+    recorder = TieredLLMCache(cache_path, mode="record")
+    key_prompt = prompt(HumanMessage(content="Deploy demo-api"))
+    recorder.update(key_prompt, LLM, reply("first"))
+
+    assert recorder.lookup(key_prompt, LLM) is None
+    recorder.update(key_prompt, LLM, reply("second"))
+    assert TieredLLMCache(cache_path).lookup(key_prompt, LLM)[0].message.content == "second"
+
+
+def test_replay_serves_recordings_and_raises_on_a_miss(cache_path):
+    key_prompt = prompt(HumanMessage(content="Deploy demo-api"))
+    TieredLLMCache(cache_path, mode="record").update(key_prompt, LLM, reply())
+    replay = TieredLLMCache(cache_path, mode="replay")
+
+    assert replay.lookup(key_prompt, LLM)[0].message.content == "Deploying canary"
+    with pytest.raises(LLMCacheMiss, match="LLM_CACHE_MODE=replay"):
+        replay.lookup(prompt(HumanMessage(content="Deploy web-app")), LLM)
+
+    # Replay never writes, so the miss stays a miss
+    replay.update(prompt(HumanMessage(content="Deploy web-app")), LLM, reply())
+    with pytest.raises(LLMCacheMiss):
+        replay.lookup(prompt(HumanMessage(content="Deploy web-app")), LLM)
+
+
+def test_memory_tier_is_bounded(cache_path):
+    cache = TieredLLMCache(cache_path, memory_size=2)
+    for name in ("a", "b", "c"):
+        cache.update(prompt(HumanMessage(content=name)), LLM, reply(name))
+
+    assert len(cache._memory) == 2
+    # Evicted from memory, still served from SQLite
+    assert cache.lookup(prompt(HumanMessage(content="a")), LLM)[0].message.content == "a"
+
+
+def test_unknown_mode_is_rejected(cache_path):
+    with pytest.raises(ValueError, match="Unknown LLM cache mode"):
+        TieredLLMCache(cache_path, mode="sometimes")
@@ -0,0 +1,147 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils import metrics_collector
+from utils.metrics_collector import SERIES, FakeMetricsSource, MetricsCollector, score_rollouts
+from utils.verification import ThresholdPolicy
+
+
+class NoDataSource(FakeMetricsSource):
+    """FakeMetricsSource whose listed rollouts report no datapoints, like an empty CloudWatch window."""
+
+    def __init__(self, empty, partial=()):
+        super().__init__(points=4)
+        self.empty = set(empty)
+        self.partial = set(partial)
+
+    def query(self, rollouts):
+        series = super().query(rollouts)
+        for i, (_, rollout_id) in enumerate(rollouts):
+            for metric in SERIES:
+                if rollout_id in self.empty:
+                    series[metric][i, :] = np.nan
+                elif rollout_id in self.partial:
+                    series[metric][i, 1:] = np.nan
+        return series
+
+
+def test_no_datapoints_is_borderline_and_json_safe():
+    source = NoDataSource(empty={"r-empty"})
+    series = source.query([("svc", "r-empty"), ("svc", "r-ok")])
+    empty, ok = score_rollouts(series, [ThresholdPolicy(), ThresholdPolicy()])
+
+    assert empty["decision"] == "borderline"
+    assert empty["metrics"] == {metric: None for metric in SERIES}
+    assert {f["metric"] for f in empty["borderline"]} == set(SERIES)
+    assert empty["health_score"] == 0.0
+    json.dumps(empty, allow_nan=False)
+    assert ok["decision"] in ("promote", "borderline", "rollback")
+
+
+def test_single_missing_metric_blocks_promotion():
+    series = {
+        "avg_latency_ms": np.array([[20.0, 30.0]]),
+        "error_rate_percent": np.array([[np.nan, np.nan]]),
+        "cpu_usage_percent": np.array([[10.0, 10.0]]),
+    }
+    verdict, = score_rollouts(series, [ThresholdPolicy()])
+    assert verdict["decision"] == "borderline"
+    assert verdict["metrics"]["error_rate_percent"] is None
+    assert verdict["metrics"]["avg_latency_ms"] == 25.0
+
+
+def test_partial_series_uses_available_points():
+    source = NoDataSource(empty=(), partial={"r-partial"})
+    series = source.query([("svc", "r-partial")])
+    verdict, = score_rollouts(series, [ThresholdPolicy()])
+    assert all(value is not None for value in verdict["metrics"].values())
+    json.dumps(verdict, allow_nan=False)
+
+
+def test_violation_still_rolls_back_next_to_missing_metric():
+    series = {
+        "avg_latency_ms": np.array([[900.0]]),
+        "error_rate_percent": np.array([[np.nan]]),
+        "cpu_usage_percent": np.array([[10.0]]),
+    }
+    verdict, = score_rollouts(series, [ThresholdPolicy()])
+    assert verdict["decision"] == "rollback"
+
+
+class VerifyingCheckpointer:
+    def __init__(self, threads):
+        self.threads = threads
+        self.loads = 0
+        self.calls = []
+
+    def active_threads(self, status, max_age_seconds=None, limit=-1):
+        self.calls.append((status, max_age_seconds, limit))
+        return list(self.threads)
+
+    def get_tuple(self, config):
+        self.loads += 1
+        thread_id = config["configurable"]["thread_id"]
+        return SimpleNamespace(checkpoint={"channel_values": {"service_id": "svc", "rollout_id": f"r-{thread_id}"}})
+
+
+def test_active_rollouts_loads_each_checkpoint_once():
+    checkpointer = VerifyingCheckpointer(["t1", "t2"])
+    collector = MetricsCollector(FakeMetricsSource(), cycle_seconds=0, checkpointer=checkpointer)
+    collector.active_ttl_seconds, collector.max_active = 60, 10
+
+    assert collector.active_rollouts() == [("t1", "svc", "r-t1"), ("t2", "svc", "r-t2")]
+    assert collector.active_rollouts() == [("t1", "svc", "r-t1"), ("t2", "svc", "r-t2")]
+    assert checkpointer.loads == 2
+    assert checkpointer.calls[-1] == ("verifying", 60, 10)
+
+    checkpointer.threads = ["t2"]
+    assert collector.active_rollouts() == [("t2", "svc", "r-t2")]
+    assert list(collector._active) == ["t2"]
+
+
+def test_get_collector_use_real_aws_is_case_insensitive(monkeypatch):
+    built = []
+    monkeypatch.setattr(metrics_collector, "CloudWatchMetricsSource", lambda namespace: built.append(namespace) or FakeMetricsSource())
+    monkeypatch.setattr(metrics_collector, "_collector", None)
+    monkeypatch.setenv("USE_REAL_AWS", "True")
+    metrics_collector.get_collector()
+    assert built == ["KubeGarden/Rollouts"]
+
+
+def test_checkpointer_active_threads_skips_stale_and_caps(tmp_path):
+    import time
+
+    from utils.checkpointer import SQLiteCheckpointer
+
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"))
+    now = time.time()
+    checkpointer.conn.executemany(
+        "INSERT INTO threads (thread_id, status, updated_at) VALUES (?, ?, ?)",
+        [("stale", "verifying", now - 3600), ("old", "verifying", now - 10), ("new", "verifying", now), ("done", "completed", now)],
+    )
+    assert checkpointer.active_threads("verifying") == ["new", "old", "stale"]
+    assert checkpointer.active_threads("verifying", max_age_seconds=60) == ["new", "old"]
+    assert checkpointer.active_threads("verifying", max_age_seconds=60, limit=1) == ["new"]
+
+
+def test_fetch_verdict_falls_back_when_the_collector_fails(monkeypatch):
+    import asyncio
+    from concurrent.futures import Future
+
+    import agent
+
+    class FailingCollector:
+        def request(self, thread_id, service_id, rollout_id):
+            future = Future()
+            future.set_exception(RuntimeError("CloudWatch unavailable"))
+            return future
+
+    monkeypatch.setattr(metrics_collector, "_collector", FailingCollector())
+    monkeypatch.setenv("METRICS_COLLECTOR", "batch")
+
+    verdict = asyncio.run(agent.fetch_verdict({"service_id": "demo-api", "rollout_id": "r-1"}, {}))
+
+    assert verdict["decision"] in ("promote", "borderline", "rollback")
+    assert set(verdict["metrics"]) >= {"avg_latency_ms", "error_rate_percent"}
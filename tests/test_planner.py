@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import agent
+from utils.deployment_tools import SUPPORTED_STRATEGIES
+
+# Steps the executor knows how to run (see step_tool_call and executor_node)
+EXECUTABLE_STEPS = {"run_unit_tests", "run_lint", "security_scan", "build_image",
+                    "deploy_canary", "deploy_static_site", "verify_metrics", "promote_full"}
+
+
+def assert_plan_schema(plan, service_id, strategy):
+    """The shape plan_parser_node accepts from the LLM planner's generate_deployment_plan call."""
+    assert set(plan) == {"service_id", "strategy", "steps"}
+    assert (plan["service_id"], plan["strategy"]) == (service_id, strategy)
+    assert plan["steps"]
+    for step in plan["steps"]:
+        assert set(step) <= {"name", "description", "status", "group"}
+        assert step["name"] in EXECUTABLE_STEPS
+        assert isinstance(step["description"], str) and step["description"]
+        assert step["status"] == "pending"
+    names = [s["name"] for s in plan["steps"]]
+    assert len(names) == len(set(names))
+    # Steps of a group are consecutive, so the executor batches all of them
+    for group in {s["group"] for s in plan["steps"] if s.get("group")}:
+        positions = [i for i, s in enumerate(plan["steps"]) if s.get("group") == group]
+        assert positions == list(range(positions[0], positions[-1] + 1))
+    return names
+
+
+@pytest.mark.parametrize("strategy", SUPPORTED_STRATEGIES)
+def test_backend_plan_matches_the_schema(strategy):
+    plan = agent.rule_based_plan({"service_id": "demo-api", "strategy": strategy})
+
+    names = assert_plan_schema(plan, "demo-api", strategy)
+    # Everything is built and checked before anything is deployed
+    assert names[:4] == ["run_unit_tests", "run_lint", "security_scan", "build_image"]
+    assert names[4] == "deploy_canary"
+    assert ("verify_metrics" in names) == (strategy in ("canary", "progressive"))
+    assert [s["name"] for s in plan["steps"] if s.get("group") == "ci"] == ["run_unit_tests", "run_lint", "security_scan"]
+
+
+@pytest.mark.parametrize("strategy", SUPPORTED_STRATEGIES)
+def test_frontend_plan_matches_the_schema(strategy):
+    plan = agent.rule_based_plan({"service_id": "demo-frontend", "strategy": strategy})
+
+    names = assert_plan_schema(plan, "demo-frontend", strategy)
+    assert names == ["run_unit_tests", "run_lint", "deploy_static_site"]
+
+
+@pytest.mark.parametrize("state", [
+    {"service_id": "demo-api", "strategy": "canary", "planning_mode": "llm"},
+    {"service_id": "demo-api", "strategy": "shadow"},
+    {"service_id": "unknown-service", "strategy": "canary"},
+])
+def test_requests_the_rules_dont_cover_go_to_the_llm(state):
+    assert agent.rule_based_plan(state) is None
+
+
+def test_planner_node_uses_the_rule_plan_without_the_llm(monkeypatch):
+    monkeypatch.setattr(agent, "cached_plan", lambda state: None)
+    monkeypatch.setattr(agent, "get_planner_llm", lambda: pytest.fail("called the LLM planner"))
+    state = {"messages": [HumanMessage(content="Deploy demo-api")], "service_id": "demo-api", "strategy": "rolling"}
+
+    update = asyncio.run(agent.planner_node(state))
+
+    assert update["deployment_status"] == "executing"
+    assert update["current_step_index"] == 0
+    assert_plan_schema(update["plan"], "demo-api", "rolling")
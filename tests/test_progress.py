@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import httpx
+from langchain_core.messages import HumanMessage
+
+import server
+from utils import deployment_tools
+from utils.progress import ProgressBroker, stream_progress
+
+
+async def collect(broker, thread_id):
+    return [event async for event in broker.subscribe(thread_id)]
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_late_subscriber_gets_the_replay_buffer_then_live_events():
+    async def main():
+        broker = ProgressBroker()
+        broker.open("t1")
+        broker.publish("t1", {"node": "planner"})
+        broker.publish("t1", {"node": "executor"})
+
+        late = asyncio.create_task(collect(broker, "t1"))
+        await asyncio.sleep(0)
+        broker.publish("t1", {"node": "execution_result"})
+        broker.close("t1")
+        return await late
+
+    assert [e["node"] for e in asyncio.run(main())] == ["planner", "executor", "execution_result"]
+
+
+def test_replay_buffer_keeps_the_latest_events():
+    async def main():
+        broker = ProgressBroker(buffer_size=2)
+        broker.open("t1")
+        for node in ("planner", "executor", "execution_result"):
+            broker.publish("t1", {"node": node})
+        late = asyncio.create_task(collect(broker, "t1"))
+        await asyncio.sleep(0)
+        broker.close("t1")
+        return await late
+
+    assert [e["node"] for e in asyncio.run(main())] == ["executor", "execution_result"]
+
+
+def test_closed_or_unknown_deployment_has_nothing_to_stream():
+    async def main():
+        broker = ProgressBroker()
+        broker.open("t1")
+        broker.publish("t1", {"node": "planner"})
+        broker.close("t1")
+        return await collect(broker, "t1"), await collect(broker, "unknown")
+
+    assert asyncio.run(main()) == ([], [])
+
+
+def test_stream_progress_yields_one_event_per_node(healthy_pipeline):
+    async def main():
+        config = {"configurable": {"thread_id": "progress-stream"}}
+        inputs = {"messages": [HumanMessage(content="Deploy demo-api")], "service_id": "demo-api", "strategy": "canary"}
+        return [event async for event in stream_progress(server.get_agent(), inputs, config)]
+
+    events = asyncio.run(main())
+
+    assert events[0]["node"] == "planner"
+    assert events[0]["status"] == "executing"
+    assert all(e["node"] not in ("executor_tools", "verifier_tools") for e in events)
+    assert events[-1]["status"] == "completed"
+    assert any(e["node"] == "execution_result" and e.get("tool_result") for e in events)
+
+
+def test_late_events_subscriber_sees_the_whole_run(healthy_pipeline, monkeypatch):
+    # Slow enough that the run is still going when the second client connects
+    monkeypatch.setattr(deployment_tools, "MOCK_LATENCY_SCALE", 0.1)
+
+    async def main():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            body = {"thread_id": "progress-late", "service_id": "demo-api"}
+            stream = asyncio.create_task(client.post("/deploy/stream", json=body))
+            while not server.progress_broker._buffers.get("progress-late"):
+                await asyncio.sleep(0.01)
+            late = await client.get("/deploy/progress-late/events")
+            return await stream, late
+
+    stream, late = asyncio.run(main())
+    streamed, replayed = parse_sse(stream.text), parse_sse(late.text)
+
+    assert replayed[0] == streamed[0]
+    assert replayed[0][1]["node"] == "planner"
+    assert [e for t, e in replayed if t == "progress"] == [e for t, e in streamed if t == "progress"]
+    assert replayed[-1] == ("end", {"status": "completed"})
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from utils import deployment_tools
+from utils.deployment_tools import PROGRESSIVE_CLUSTER_ERROR, deploy_to_k8s, run_progressive_canary
+
+
+def test_progressive_rejected_against_cluster(monkeypatch):
+    monkeypatch.setenv("K8S_API_URL", "http://127.0.0.1:1")
+    args = {"service_id": "demo-api", "version": "v1.2.1", "strategy": "progressive"}
+
+    assert json.loads(deploy_to_k8s.invoke(args)) == {"status": "failed", "error": PROGRESSIVE_CLUSTER_ERROR}
+    result = json.loads(run_progressive_canary.invoke({"service_id": "demo-api", "rollout_id": "ro-1"}))
+    assert result["status"] == "aborted"
+    assert result["error"] == PROGRESSIVE_CLUSTER_ERROR
+
+
+def test_progressive_rejected_against_cluster_async(monkeypatch):
+    monkeypatch.setenv("USE_REAL_AWS", "TRUE")
+    args = {"service_id": "demo-api", "version": "v1.2.1", "strategy": "progressive"}
+    assert json.loads(asyncio.run(deploy_to_k8s.ainvoke(args)))["error"] == PROGRESSIVE_CLUSTER_ERROR
+
+
+def test_progressive_runs_in_mock_mode(monkeypatch):
+    monkeypatch.delenv("K8S_API_URL", raising=False)
+    monkeypatch.delenv("USE_REAL_AWS", raising=False)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_STAGE_SECONDS", 0)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_SAMPLE_INTERVAL", 0)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_MIN_REQUESTS", 1)
+
+    result = json.loads(run_progressive_canary.invoke({"service_id": "demo-api", "rollout_id": "ro-1", "stages": [5, 100]}))
+    assert result["status"] in ("promoted", "aborted")
+    assert "error" not in result
+
+
+def mock_mode(monkeypatch):
+    monkeypatch.delenv("K8S_API_URL", raising=False)
+    monkeypatch.delenv("USE_REAL_AWS", raising=False)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_STAGE_SECONDS", 10)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_SAMPLE_INTERVAL", 1)
+    monkeypatch.setattr(deployment_tools, "PROGRESSIVE_MIN_REQUESTS", 10**6)
+
+
+def test_stage_waits_are_scaled_by_mock_latency(monkeypatch):
+    mock_mode(monkeypatch)
+    monkeypatch.setattr(deployment_tools, "MOCK_LATENCY_SCALE", 0.01)
+
+    waits = list(deployment_tools._progressive_canary("demo-api", "ro-1", [5, 100]))
+
+    # Ten simulated one-second samples per stage, each slept for 10ms
+    assert waits == [0.01] * 20
+
+
+def test_stops_incomplete_when_the_time_budget_runs_out(monkeypatch):
+    mock_mode(monkeypatch)
+    monkeypatch.setattr(deployment_tools, "MOCK_LATENCY_SCALE", 0.02)
+
+    result = json.loads(run_progressive_canary.invoke(
+        {"service_id": "demo-api", "rollout_id": "ro-1", "stages": [5, 100], "timeout_seconds": 0.3}))
+
+    assert result["status"] == "incomplete"
+    assert result["stopped_at_percent"] == 100
+    assert [s["traffic_percent"] for s in result["stages"]] == [5]
+    assert result["elapsed_seconds"] <= 0.3
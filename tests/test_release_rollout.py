@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from utils import k8s_clients
+from utils.deployment_tools import deploy_to_k8s, promote_rollout, rollback_deployment
+from utils.fake_kube_api import FakeKubeAPI
+from utils.release_ledger import get_release_ledger
+
+
+@pytest.fixture
+def kube(monkeypatch):
+    api = FakeKubeAPI(rollout_seconds=0.05)
+    monkeypatch.setenv("K8S_API_URL", api.start())
+    monkeypatch.setattr(k8s_clients, "_manager", None)
+    yield api
+    api.stop()
+
+
+def image(api, name):
+    return api.deployments[("default", name)]["spec"]["template"]["spec"]["containers"][0]["image"]
+
+
+def run(tool, args, use_async):
+    return json.loads(asyncio.run(tool.ainvoke(args)) if use_async else tool.invoke(args))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_promote_applies_stable_and_removes_canary(kube, use_async):
+    deployed = run(deploy_to_k8s, {"service_id": "demo-api", "version": "v2.0.0", "strategy": "canary"}, use_async)
+    assert deployed["status"] == "success"
+    assert ("default", "demo-api-canary") in kube.deployments
+
+    promoted = run(promote_rollout, {"service_id": "demo-api", "rollout_id": deployed["rollout_id"]}, use_async)
+
+    assert promoted["status"] == "success"
+    assert image(kube, "demo-api").endswith("/demo-api:v2.0.0")
+    assert ("default", "demo-api-canary") not in kube.deployments
+    assert kube.deletes[-1] == {"name": "demo-api-canary", "propagation_policy": "Foreground"}
+    assert get_release_ledger().last_known_good("demo-api", "default")["rollout_id"] == deployed["rollout_id"]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_rollback_removes_canary_before_reporting_recovery(kube, use_async):
+    good = run(deploy_to_k8s, {"service_id": "demo-api", "version": "v2.0.0", "strategy": "canary"}, use_async)
+    run(promote_rollout, {"service_id": "demo-api", "rollout_id": good["rollout_id"]}, use_async)
+    bad = run(deploy_to_k8s, {"service_id": "demo-api", "version": "v3.0.0", "strategy": "canary"}, use_async)
+    assert image(kube, "demo-api-canary").endswith(":v3.0.0")
+
+    rolled_back = run(rollback_deployment, {"service_id": "demo-api", "rollout_id": bad["rollout_id"], "reason": "test"}, use_async)
+
+    assert rolled_back["status"] == "success"
+    assert rolled_back["restored"]["image_tag"] == "v2.0.0"
+    assert ("default", "demo-api-canary") not in kube.deployments
+    assert image(kube, "demo-api").endswith(":v2.0.0")
+
+
+def test_rollback_without_release_still_removes_canary(kube):
+    deployed = run(deploy_to_k8s, {"service_id": "demo-frontend", "version": "v9.0.0", "strategy": "canary"}, False)
+    rolled_back = run(rollback_deployment, {"service_id": "demo-frontend", "rollout_id": deployed["rollout_id"], "reason": "test"}, False)
+
+    assert rolled_back["status"] == "success"
+    assert rolled_back["restored"] is None
+    assert ("default", "demo-frontend-canary") not in kube.deployments
+
+
+def test_promote_of_unstaged_rollout_fails_in_cluster_mode(kube):
+    result = run(promote_rollout, {"service_id": "demo-api", "rollout_id": "ro-missing"}, False)
+    assert result["status"] == "failed"
+    assert "never staged" in result["error"]
+    assert kube.applies == []
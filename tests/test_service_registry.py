@@ -0,0 +1,99 @@
+import json
+import sqlite3
+
+import pytest
+
+from utils import service_registry
+from utils.service_registry import SQLITE_MAX_PARAMS, ServiceRegistry
+
+
+def service(service_id, **fields):
+    return {"id": service_id, "namespace": "default", "type": "backend", **fields}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "services.sqlite")
+
+
+def test_seed_follows_the_current_seed(db_path):
+    ServiceRegistry(db_path).seed([service("api", replicas=2), service("retired")])
+
+    # Restart with an updated seed
+    registry = ServiceRegistry(db_path)
+    registry.seed([service("api", replicas=4), service("web", type="frontend")])
+
+    assert registry.get("api")["replicas"] == 4
+    assert registry.get("retired") is None
+    assert [s["id"] for s in registry.list_by_type("frontend")] == ["web"]
+
+
+def test_seed_never_overwrites_upserted_services(db_path):
+    registry = ServiceRegistry(db_path)
+    registry.seed([service("api", replicas=2)])
+    registry.upsert(service("api", replicas=8))
+    registry.upsert(service("custom"))
+
+    registry.seed([service("web")])
+
+    assert registry.get("api")["replicas"] == 8
+    assert registry.get("custom") is not None
+
+
+def test_seed_invalidates_cached_entries(db_path):
+    registry = ServiceRegistry(db_path)
+    registry.seed([service("api", replicas=2)])
+    assert registry.get("api")["replicas"] == 2
+
+    registry.seed([service("api", replicas=3)])
+
+    assert registry.get("api")["replicas"] == 3
+
+
+def test_database_from_before_seed_ownership_is_reseeded(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE services (id TEXT PRIMARY KEY, namespace TEXT NOT NULL, type TEXT NOT NULL, "
+                 "data TEXT NOT NULL, updated_at REAL NOT NULL)")
+    conn.execute("INSERT INTO services VALUES ('api', 'default', 'backend', ?, 0)", (json.dumps(service("api", replicas=1)),))
+    conn.commit()
+    conn.close()
+
+    registry = ServiceRegistry(db_path)
+    registry.seed([service("api", replicas=5)])
+
+    assert registry.get("api")["replicas"] == 5
+
+
+def test_get_many_chunks_lookups_below_the_variable_limit(db_path, monkeypatch):
+    registry = ServiceRegistry(db_path, cache_size=1024)
+    registry.seed([service(f"svc-{i}") for i in range(SQLITE_MAX_PARAMS + 20)])
+    monkeypatch.setattr(service_registry, "SQLITE_MAX_PARAMS", 100)
+    statements = []
+    registry.conn.set_trace_callback(statements.append)
+
+    ids = [f"svc-{i}" for i in range(SQLITE_MAX_PARAMS + 20)] + ["missing"]
+    found = registry.get_many(ids)
+
+    assert list(found) == ids
+    assert found["missing"] is None and found["svc-0"]["id"] == "svc-0"
+    assert len([s for s in statements if s.startswith("SELECT id, data")]) == 6
+
+    # Hits and misses are cached now
+    statements.clear()
+    assert registry.get_many(ids) == found
+    assert statements == []
+
+
+def test_cache_expires_and_is_invalidated_by_writes(db_path):
+    registry = ServiceRegistry(db_path, cache_ttl_seconds=0)
+    registry.upsert(service("api", replicas=1))
+    assert registry.get("api")["replicas"] == 1
+
+    # Written behind the registry's back: only visible once the entry expires
+    registry.conn.execute("UPDATE services SET data=? WHERE id='api'", (json.dumps(service("api", replicas=2)),))
+    assert registry.get("api")["replicas"] == 2
+
+    cached = ServiceRegistry(db_path)
+    assert cached.get("api")["replicas"] == 2
+    cached.delete("api")
+    assert cached.get("api") is None
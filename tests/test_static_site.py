@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from utils import deployment_tools, http_client
+from utils.deployment_tools import trigger_static_site_deployment
+from utils.fake_static_site_api import FakeStaticSiteAPI
+
+ARGS = {"repo_url": "https://github.com/user/site", "app_name": "site"}
+
+
+@pytest.fixture
+def site(monkeypatch):
+    apis = []
+
+    def start(**kwargs):
+        api = FakeStaticSiteAPI(**kwargs)
+        monkeypatch.setenv("STATIC_SITE_DEPLOY_API_URL", api.start())
+        apis.append(api)
+        return api
+
+    monkeypatch.setattr(http_client, "MAX_RETRIES", 3)
+    monkeypatch.setattr(http_client, "BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(deployment_tools, "STATIC_SITE_POLL_INTERVAL", 0.01)
+    # Fresh pooled clients, so connection reuse is measured from the first request
+    monkeypatch.setattr(http_client, "_sync_client", None)
+    monkeypatch.setattr(http_client, "_async_clients", {})
+    yield start
+    for api in apis:
+        api.stop()
+
+
+def run(args, use_async):
+    if use_async:
+        return json.loads(asyncio.run(trigger_static_site_deployment.ainvoke(args)))
+    return json.loads(trigger_static_site_deployment.invoke(args))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_throttled_deploy_is_retried_on_one_connection(site, use_async):
+    api = site(fail_first=2, fail_status=503)
+
+    result = run(ARGS, use_async)
+
+    assert result["status"] == "success"
+    assert [r["method"] for r in api.requests] == ["POST"] * 3
+    assert len(api.connections) == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_submit_then_poll_reuses_the_connection(site, use_async):
+    api = site(fail_first=1, fail_status=429, async_mode=True, polls_until_done=3)
+
+    result = run(ARGS, use_async)
+
+    assert result["status"] == "success"
+    assert [r["method"] for r in api.requests] == ["POST", "POST", "GET", "GET", "GET"]
+    assert len(api.connections) == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_gives_up_after_max_retries(site, use_async):
+    api = site(fail_first=10, fail_status=503)
+
+    result = run(ARGS, use_async)
+
+    assert result["status"] == "failed"
+    assert "503" in result["error"]
+    assert len(api.requests) == http_client.MAX_RETRIES + 1
+
+
+def test_non_idempotent_deploy_is_not_retried_on_502(site):
+    api = site(fail_first=1, fail_status=502)
+
+    result = run(ARGS, False)
+
+    assert result["status"] == "failed"
+    assert len(api.requests) == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_mock_deploy_without_an_api_url(monkeypatch, use_async):
+    monkeypatch.setenv("STATIC_SITE_DEPLOY_API_URL", "MOCK")
+
+    result = run(ARGS, use_async)
+
+    assert result == {"status": "success", "response": {"message": "Mock deployment successful", "url": "https://site.example.com"}}
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import server
+
+
+@pytest.fixture
+def deployed(api, healthy_pipeline, request):
+    """Runs a deployment to completion; returns its thread id."""
+    thread_id = f"status-{request.node.name}"
+    response, = api(("POST", "/deploy", {"json": {"thread_id": thread_id, "service_id": "demo-api"}}))
+    assert response.json()["status"] == "completed"
+    return thread_id
+
+
+def add_log(thread_id, content):
+    """Appends a message to the deployment, i.e. writes a new checkpoint."""
+    config = {"configurable": {"thread_id": thread_id}}
+    asyncio.run(server.get_agent().aupdate_state(config, {"messages": [AIMessage(content=content)]}))
+
+
+def test_unchanged_status_is_304_until_a_new_checkpoint(api, deployed):
+    path = f"/deploy/{deployed}/status"
+    first, = api(("GET", path))
+    etag = first.headers["ETag"]
+
+    cached, other = api(("GET", path, {"headers": {"If-None-Match": etag}}),
+                        ("GET", path, {"headers": {"If-None-Match": 'W/"stale"'}}))
+
+    assert first.status_code == 200 and first.json()["status"] == "completed"
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert other.status_code == 200
+
+    add_log(deployed, "operator note")
+    changed, = api(("GET", path, {"headers": {"If-None-Match": etag}}))
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_since_returns_only_newer_log_lines(api, deployed):
+    path = f"/deploy/{deployed}/status"
+    first, = api(("GET", path))
+    cursor = first.json()["next_cursor"]
+    assert first.json()["logs"]
+
+    add_log(deployed, "first note")
+    add_log(deployed, "second note")
+    newer, page = api(("GET", f"{path}?since={cursor}"), ("GET", f"{path}?since={cursor}&limit=1"))
+
+    assert newer.json()["logs"] == ["first note", "second note"]
+    assert newer.json()["next_cursor"] == cursor + 2
+    assert page.json()["logs"] == ["first note"]
+    assert page.json()["next_cursor"] == cursor + 1
+    caught_up, = api(("GET", f"{path}?since={cursor + 2}"))
+    assert caught_up.json()["logs"] == []
+
+
+def test_unknown_deployment_is_404(api):
+    response, = api(("GET", "/deploy/missing/status"))
+    assert response.status_code == 404
+
+
+def test_bulk_status(api, deployed):
+    first, = api(("POST", "/deploy/status", {"json": {"thread_ids": [deployed, "missing"]}}))
+    documents = first.json()["deployments"]
+
+    assert [d["thread_id"] for d in documents] == [deployed, "missing"]
+    assert documents[0]["status"] == "completed"
+    assert documents[1] == {"thread_id": "missing", "status": "not_found"}
+
+    etag = documents[0]["etag"]
+    body = {"thread_ids": [deployed, "missing"], "etags": {deployed: etag, "missing": etag}}
+    again, = api(("POST", "/deploy/status", {"json": body}))
+    assert again.json()["deployments"] == [
+        {"thread_id": deployed, "etag": etag, "not_modified": True},
+        {"thread_id": "missing", "status": "not_found"},
+    ]
+
+    add_log(deployed, "operator note")
+    cursor = documents[0]["next_cursor"]
+    changed, = api(("POST", "/deploy/status", {"json": {**body, "since": {deployed: cursor}}}))
+    document = changed.json()["deployments"][0]
+    assert document["etag"] != etag
+    assert document["logs"] == ["operator note"]
@@ -0,0 +1,66 @@
+import pytest
+
+from utils.verification import METRIC_LIMITS, RollingWindow, ThresholdPolicy, evaluate_metrics, percentile
+
+HEALTHY = {"avg_latency_ms": 50, "error_rate_percent": 0.2, "cpu_usage_percent": 40}
+
+
+def test_healthy_metrics_promote():
+    verdict = evaluate_metrics(HEALTHY, ThresholdPolicy(gray_zone_percent=10))
+    assert verdict["decision"] == "promote"
+    assert verdict["violations"] == verdict["borderline"] == []
+
+
+@pytest.mark.parametrize("latency, decision", [
+    (179, "promote"),      # below the gray zone (200 - 10%)
+    (180, "borderline"),   # lower edge of the gray zone
+    (220, "borderline"),   # upper edge of the gray zone
+    (221, "rollback"),     # past the gray zone
+])
+def test_gray_zone_around_the_limit(latency, decision):
+    verdict = evaluate_metrics({**HEALTHY, "avg_latency_ms": latency}, ThresholdPolicy(gray_zone_percent=10))
+    assert verdict["decision"] == decision
+
+
+def test_violation_wins_over_borderline():
+    metrics = {**HEALTHY, "avg_latency_ms": 200, "error_rate_percent": 5.0}
+    verdict = evaluate_metrics(metrics, ThresholdPolicy(gray_zone_percent=10))
+    assert verdict["decision"] == "rollback"
+    assert [f["metric"] for f in verdict["violations"]] == ["error_rate_percent"]
+    assert [f["metric"] for f in verdict["borderline"]] == ["avg_latency_ms"]
+
+
+def test_service_policy_overrides_the_limits():
+    policy = ThresholdPolicy.from_dict({"max_latency_ms": 40, "unknown": 1})
+    assert evaluate_metrics(HEALTHY, policy)["decision"] == "rollback"
+
+
+@pytest.mark.parametrize("missing", ["avg_latency_ms", "error_rate_percent", "cpu_usage_percent"])
+def test_missing_metric_is_borderline(missing):
+    metrics = {k: v for k, v in HEALTHY.items() if k != missing}
+    verdict = evaluate_metrics(metrics, ThresholdPolicy())
+    assert verdict["decision"] == "borderline"
+    limit = getattr(ThresholdPolicy(), METRIC_LIMITS[missing])
+    assert verdict["borderline"] == [{"metric": missing, "value": None, "limit": limit}]
+
+
+def test_none_metric_is_borderline_and_violation_still_rolls_back():
+    verdict = evaluate_metrics({**HEALTHY, "error_rate_percent": None, "avg_latency_ms": 900}, ThresholdPolicy())
+    assert verdict["decision"] == "rollback"
+    assert [f["metric"] for f in verdict["borderline"]] == ["error_rate_percent"]
+
+
+def test_p99_is_checked_only_when_reported():
+    assert evaluate_metrics(HEALTHY, ThresholdPolicy())["decision"] == "promote"
+    assert evaluate_metrics({**HEALTHY, "p99_latency_ms": 900}, ThresholdPolicy())["decision"] == "rollback"
+
+
+def test_rolling_window_snapshot():
+    window = RollingWindow(max_latencies=3)
+    window.add({"latencies_ms": [10, 20, 30, 40], "requests": 4, "errors": 1, "cpu_usage_percent": 50})
+
+    snapshot = window.snapshot()
+    assert snapshot["avg_latency_ms"] == 30.0
+    assert snapshot["p99_latency_ms"] == 40
+    assert snapshot["error_rate_percent"] == 25.0
+    assert percentile([], 50) == 0.0
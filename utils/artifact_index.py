@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+DEFAULT_DB_PATH = "/tmp/kube-garden-artifacts.sqlite"
+
+# CI steps whose successful result depends only on the commit and build config
+REUSABLE_STEPS = ("run_unit_tests", "build_image")
+
+# Service metadata fields that change what a build produces
+BUILD_CONFIG_FIELDS = ("build_command", "dockerfile", "build_args", "runtime")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    repo_url TEXT NOT NULL,
+    commit_sha TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    step TEXT NOT NULL,
+    build_id TEXT,
+    image_tag TEXT,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (repo_url, commit_sha, config_hash, step)
+);
+"""
+
+
+class ArtifactKey(NamedTuple):
+    repo_url: str
+    commit_sha: str
+    config_hash: str
+
+
+def build_config_hash(service: Dict[str, Any]) -> str:
+    """Hash of the build-relevant service config and the CodeBuild project it runs in."""
+    config = {field: service.get(field) for field in BUILD_CONFIG_FIELDS}
+    config["project"] = os.environ.get("CODEBUILD_PROJECT_NAME", "kube-garden-build")
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def artifact_key(repo_url: str, commit_sha: str, service: Dict[str, Any]) -> Optional[ArtifactKey]:
+    """None when the build can't be identified (no repo or commit)."""
+    if not repo_url or not commit_sha:
+        return None
+    return ArtifactKey(repo_url, commit_sha, build_config_hash(service))
+
+
+def image_tag_for(commit_sha: str) -> str:
+    """Tag `build_image` pushes for a commit."""
+    return f"sha-{commit_sha[:12]}"
+
+
+class ArtifactIndex:
+    """
+    Successful CI results by (repo URL, commit SHA, build config). A step
+    recorded here doesn't need to run again for the same build; a recorded
+    `build_image` also gives the image tag to deploy.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def lookup(self, key: ArtifactKey) -> Dict[str, Dict[str, Any]]:
+        """Recorded steps for a build, by step name."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT step, build_id, image_tag, recorded_at FROM artifacts "
+                "WHERE repo_url=? AND commit_sha=? AND config_hash=?",
+                key,
+            ).fetchall()
+        return {step: {"build_id": build_id, "image_tag": image_tag, "recorded_at": recorded_at}
+                for step, build_id, image_tag, recorded_at in rows}
+
+    def record(self, key: ArtifactKey, step: str, build_id: Optional[str] = None,
+               image_tag: Optional[str] = None) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, step, build_id, image_tag, time.time()),
+            )
+
+    def forget(self, key: ArtifactKey) -> None:
+        """Drops a build, e.g. after its image was deleted from the registry."""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM artifacts WHERE repo_url=? AND commit_sha=? AND config_hash=?", key
+            )
+
+
+_index: Optional[ArtifactIndex] = None
+
+
+def get_artifact_index() -> ArtifactIndex:
+    global _index
+    if _index is None:
+        _index = ArtifactIndex(os.environ.get("ARTIFACT_INDEX_PATH", DEFAULT_DB_PATH))
+    return _index
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import traceback
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.deployment_tools import SUPPORTED_STRATEGIES, generate_deployment_plan, lookup_services
+
+MAX_TRACKED_BATCHES = 100
+FAILED_STATUSES = ("failed", "rolled_back", "skipped")
+
+
+class BatchValidationError(ValueError):
+    pass
+
+
+def order_services(service_ids: List[str], depends_on: Dict[str, List[str]]) -> List[str]:
+    """
+    Topologically sorts the batch. Raises BatchValidationError on unknown
+    dependencies or cycles.
+    """
+    for service_id, deps in depends_on.items():
+        if service_id not in service_ids:
+            raise BatchValidationError(f"Dependency declared for '{service_id}', which is not in the batch")
+        for dep in deps:
+            if dep not in service_ids:
+                raise BatchValidationError(f"'{service_id}' depends on '{dep}', which is not in the batch")
+
+    ordered: List[str] = []
+    visiting = set()
+
+    def visit(service_id: str):
+        if service_id in ordered:
+            return
+        if service_id in visiting:
+            raise BatchValidationError(f"Dependency cycle involving '{service_id}'")
+        visiting.add(service_id)
+        for dep in depends_on.get(service_id, []):
+            visit(dep)
+        visiting.discard(service_id)
+        ordered.append(service_id)
+
+    for service_id in service_ids:
+        visit(service_id)
+    return ordered
+
+
+def plan_batch(items: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Plans every registered service of the batch in one pass, without the LLM.
+    Services that need the LLM planner map to None.
+    """
+    services = lookup_services([item["service_id"] for item in items])
+    plans = {}
+    for item in items:
+        service_id = item["service_id"]
+        if item.get("planning_mode") == "llm" or item.get("strategy") not in SUPPORTED_STRATEGIES or not services.get(service_id):
+            plans[service_id] = None
+            continue
+        plans[service_id] = json.loads(generate_deployment_plan.invoke({"service_id": service_id, "strategy": item["strategy"]}))
+    return plans
+
+
+class BatchScheduler:
+    """
+    Runs the services of a batch in dependency order. One scheduler serves
+    the whole process: its global and per-namespace concurrency limits hold
+    across all batches. A batch may ask for lower limits of its own, never
+    higher ones. A service whose dependency failed or rolled back is skipped.
+    """
+
+    def __init__(
+        self,
+        run_service: Callable[[Dict[str, Any]], Awaitable[str]],
+        max_concurrency: Optional[int] = None,
+        max_per_namespace: Optional[int] = None,
+    ):
+        self.run_service = run_service
+        self.max_concurrency = max_concurrency or int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+        self.max_per_namespace = max_per_namespace or int(os.environ.get("BATCH_MAX_PER_NAMESPACE", "4"))
+        self.batches: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._overall = asyncio.Semaphore(self.max_concurrency)
+        self._namespaces: Dict[str, asyncio.Semaphore] = {}
+
+    def _limits(self, max_concurrency: Optional[int], max_per_namespace: Optional[int]) -> Dict[str, int]:
+        """A batch's own limits, clamped to the process-wide ones."""
+        for name, value in (("max_concurrency", max_concurrency), ("max_per_namespace", max_per_namespace)):
+            if value is not None and value < 1:
+                raise BatchValidationError(f"{name} must be at least 1")
+        return {
+            "max_concurrency": min(max_concurrency or self.max_concurrency, self.max_concurrency),
+            "max_per_namespace": min(max_per_namespace or self.max_per_namespace, self.max_per_namespace),
+        }
+
+    def submit(self, batch_id: str, items: List[Dict[str, Any]], depends_on: Dict[str, List[str]],
+               max_concurrency: Optional[int] = None, max_per_namespace: Optional[int] = None) -> Dict[str, Any]:
+        limits = self._limits(max_concurrency, max_per_namespace)
+        service_ids = [item["service_id"] for item in items]
+        if len(set(service_ids)) != len(service_ids):
+            raise BatchValidationError("Each service may appear only once per batch")
+        if batch_id in self._tasks and not self._tasks[batch_id].done():
+            raise BatchValidationError(f"Batch '{batch_id}' is already running")
+
+        order = order_services(service_ids, depends_on)
+        plans = plan_batch(items)
+        services = lookup_services(service_ids)
+        by_id = {item["service_id"]: item for item in items}
+
+        doc = {
+            "batch_id": batch_id,
+            "status": "queued",
+            "order": order,
+            "limits": limits,
+            "services": {
+                service_id: {
+                    "thread_id": f"{batch_id}:{service_id}",
+                    "namespace": (services.get(service_id) or {}).get("namespace", "default"),
+                    "depends_on": depends_on.get(service_id, []),
+                    "planned_by": "rules" if plans[service_id] else "llm",
+                    "status": "queued",
+                }
+                for service_id in order
+            },
+        }
+        self.batches[batch_id] = doc
+        self.batches.move_to_end(batch_id)
+        while len(self.batches) > MAX_TRACKED_BATCHES:
+            self.batches.popitem(last=False)
+
+        jobs = [{**by_id[s], "thread_id": doc["services"][s]["thread_id"], "plan": plans[s]} for s in order]
+        self._tasks[batch_id] = asyncio.create_task(self._run(doc, jobs))
+        return doc
+
+    async def _run(self, doc: Dict[str, Any], jobs: List[Dict[str, Any]]) -> None:
+        doc["status"] = "running"
+        overall = asyncio.Semaphore(doc["limits"]["max_concurrency"])
+        namespaces: Dict[str, asyncio.Semaphore] = {}
+        finished: Dict[str, asyncio.Event] = {job["service_id"]: asyncio.Event() for job in jobs}
+
+        async def run_one(job: Dict[str, Any]):
+            entry = doc["services"][job["service_id"]]
+            try:
+                for dep in entry["depends_on"]:
+                    await finished[dep].wait()
+                failed_deps = [d for d in entry["depends_on"] if doc["services"][d]["status"] in FAILED_STATUSES]
+                if failed_deps:
+                    entry.update(status="skipped", error=f"Dependencies did not succeed: {failed_deps}")
+                    return
+
+                namespace = namespaces.setdefault(entry["namespace"], asyncio.Semaphore(doc["limits"]["max_per_namespace"]))
+                shared_namespace = self._namespaces.setdefault(entry["namespace"], asyncio.Semaphore(self.max_per_namespace))
+                # The batch's own slots first, so a throttled batch holds no shared ones while it waits
+                async with overall, namespace, self._overall, shared_namespace:
+                    entry["status"] = "running"
+                    entry["status"] = await self.run_service(job)
+            except Exception as e:
+                traceback.print_exc()
+                entry.update(status="failed", error=str(e))
+            finally:
+                finished[job["service_id"]].set()
+
+        await asyncio.gather(*(run_one(job) for job in jobs))
+
+        statuses = [entry["status"] for entry in doc["services"].values()]
+        if all(status == "completed" for status in statuses):
+            doc["status"] = "completed"
+        elif any(status == "completed" for status in statuses):
+            doc["status"] = "partial"
+        else:
+            doc["status"] = "failed"
+        self._tasks.pop(doc["batch_id"], None)
@@ -0,0 +1,467 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_DB_PATH = "/tmp/kube-garden-checkpoints.sqlite"
+TERMINAL_STATUSES = ("completed", "rolled_back", "failed")
+SQLITE_MAX_PARAMS = 500  # bound parameters per IN (...) lookup
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata BLOB NOT NULL,
+    metadata_type TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    status TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_status_updated ON threads (status, updated_at);
+"""
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    File-backed checkpointer for the deployment graph.
+
+    - Payloads are serialized with the graph's serde and zlib-compressed.
+    - Channel values are stored once per version, not once per checkpoint.
+    - Only the latest `max_checkpoints_per_thread` checkpoints of a thread are
+      kept; older ones are trimmed in batches of `trim_batch`.
+    - Threads that finished (completed/rolled_back/failed) more than
+      `ttl_seconds` ago are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        *,
+        ttl_seconds: float = 24 * 3600,
+        max_checkpoints_per_thread: int = 20,
+        eviction_interval_seconds: float = 60,
+        trim_batch: int = 10,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.eviction_interval_seconds = eviction_interval_seconds
+        self.trim_batch = max(1, trim_batch)
+        self._last_eviction = 0.0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")}
+        if "metadata_type" not in columns:
+            # Databases created before metadata got its own serde type
+            self.conn.execute("ALTER TABLE checkpoints ADD COLUMN metadata_type TEXT")
+
+    # --- Serialization ---
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data)
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        return self.serde.loads_typed((type_, zlib.decompress(data)))
+
+    # --- Reads ---
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, data FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row and row[0] != "empty":
+                values[channel] = self._load(*row)
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str):
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self._load(type_, value)) for task_id, channel, type_, value in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint = self._load(type_, checkpoint_b)
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self._load(metadata_type or type_, metadata_b),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if not row:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def latest_checkpoint_ids(self, thread_ids: Sequence[str], checkpoint_ns: str = "") -> Dict[str, str]:
+        """
+        Latest checkpoint id per thread, in one indexed query and without
+        loading any checkpoint. Threads without checkpoints are left out.
+        """
+        ids: Dict[str, str] = {}
+        thread_ids = list(thread_ids)
+        with self._lock:
+            for i in range(0, len(thread_ids), SQLITE_MAX_PARAMS):
+                chunk = thread_ids[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ", ".join("?" for _ in chunk)
+                ids.update(self.conn.execute(
+                    f"SELECT thread_id, MAX(checkpoint_id) FROM checkpoints "
+                    f"WHERE checkpoint_ns=? AND thread_id IN ({placeholders}) GROUP BY thread_id",
+                    (checkpoint_ns, *chunk),
+                ).fetchall())
+        return ids
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints"
+        )
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config:
+            clauses.append("thread_id=?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id=?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id<?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                item = self._to_tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(item)
+        yield from results
+
+    # --- Writes ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+
+        type_, checkpoint_b = self._dump(c)
+        metadata_type, metadata_b = self._dump(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for channel, version in new_versions.items():
+                    blob = self._dump(values[channel]) if channel in values else ("empty", None)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                        (thread_id, checkpoint_ns, channel, str(version), *blob),
+                    )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                    "type, checkpoint, metadata, metadata_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     type_, checkpoint_b, metadata_b, metadata_type),
+                )
+                status = values.get("deployment_status") if "deployment_status" in new_versions else None
+                self.conn.execute(
+                    "INSERT INTO threads VALUES (?, ?, ?) ON CONFLICT(thread_id) DO UPDATE SET "
+                    "status=COALESCE(excluded.status, threads.status), updated_at=excluded.updated_at",
+                    (thread_id, status, time.time()),
+                )
+                # A finished thread gets no more puts, so trim it all the way now
+                self._trim_thread(thread_id, checkpoint_ns, force=status in TERMINAL_STATUSES)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self._maybe_evict()
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, *self._dump(value), task_path))
+
+        # Regular writes are idempotent per (task, idx); special channels overwrite
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [r for r in rows if r[4] >= 0],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [r for r in rows if r[4] < 0],
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete_thread(thread_id)
+
+    def _delete_thread(self, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "writes", "threads"):
+            self.conn.execute(f"DELETE FROM {table} WHERE thread_id=?", (thread_id,))
+
+    def active_threads(self, status: str, max_age_seconds: Optional[float] = None, limit: int = -1) -> List[str]:
+        """
+        Threads whose latest checkpoint has the given deployment_status, most
+        recently updated first. `max_age_seconds` skips threads that haven't
+        checkpointed since (e.g. a process died mid-verification).
+        """
+        since = time.time() - max_age_seconds if max_age_seconds is not None else 0
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM threads WHERE status=? AND updated_at>=? ORDER BY updated_at DESC LIMIT ?",
+                (status, since, limit),
+            ).fetchall()]
+
+    # --- Retention ---
+
+    def _trim_thread(self, thread_id: str, checkpoint_ns: str, force: bool = False) -> None:
+        """
+        Drops all but the newest checkpoints of a thread, with their writes and
+        unreferenced blobs. Only runs once the thread is `trim_batch` checkpoints
+        over the cap (or with `force`), so puts don't decode the kept
+        checkpoints every time.
+        """
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM checkpoints WHERE thread_id=? AND checkpoint_ns=?",
+            (thread_id, checkpoint_ns),
+        ).fetchone()
+        threshold = self.max_checkpoints_per_thread if force else self.max_checkpoints_per_thread + self.trim_batch - 1
+        if count <= threshold:
+            return
+
+        kept = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? "
+            "ORDER BY checkpoint_id DESC LIMIT ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        ).fetchall()
+        referenced = set()
+        for _, type_, checkpoint_b in kept:
+            for channel, version in self._load(type_, checkpoint_b)["channel_versions"].items():
+                referenced.add((channel, str(version)))
+
+        oldest_kept = kept[-1][0]
+        self.conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id<?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        self.conn.execute(
+            "DELETE FROM writes WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id<?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        blobs = self.conn.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id=? AND checkpoint_ns=?",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        self.conn.executemany(
+            "DELETE FROM blobs WHERE thread_id=? AND checkpoint_ns=? AND channel=? AND version=?",
+            [(thread_id, checkpoint_ns, channel, version) for channel, version in blobs if (channel, version) not in referenced],
+        )
+
+    def _maybe_evict(self) -> None:
+        now = time.time()
+        if now - self._last_eviction < self.eviction_interval_seconds:
+            return
+        self._last_eviction = now
+        self.evict_finished(now)
+
+    def evict_finished(self, now: Optional[float] = None) -> int:
+        """Deletes threads that reached a terminal status more than `ttl_seconds` ago."""
+        cutoff = (now or time.time()) - self.ttl_seconds
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        expired = [
+            row[0] for row in self.conn.execute(
+                f"SELECT thread_id FROM threads WHERE status IN ({placeholders}) AND updated_at<?",
+                (*TERMINAL_STATUSES, cutoff),
+            ).fetchall()
+        ]
+        for thread_id in expired:
+            self._delete_thread(thread_id)
+        if expired:
+            print(f"🧹 Evicted {len(expired)} finished deployment thread(s) from checkpoints")
+        return len(expired)
+
+    # --- Async API ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alatest_checkpoint_ids(self, thread_ids: Sequence[str], checkpoint_ns: str = "") -> Dict[str, str]:
+        return await asyncio.to_thread(self.latest_checkpoint_ids, thread_ids, checkpoint_ns)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """
+    Builds the checkpointer selected by the CHECKPOINTER env var ("sqlite" or "memory").
+    """
+    kind = os.environ.get("CHECKPOINTER", "sqlite")
+    if kind == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown CHECKPOINTER: {kind}")
+
+    return SQLiteCheckpointer(
+        os.environ.get("CHECKPOINT_DB_PATH", DEFAULT_DB_PATH),
+        ttl_seconds=float(os.environ.get("CHECKPOINT_TTL_SECONDS", 24 * 3600)),
+        max_checkpoints_per_thread=int(os.environ.get("CHECKPOINT_MAX_PER_THREAD", "20")),
+        trim_batch=int(os.environ.get("CHECKPOINT_TRIM_BATCH", "10")),
+    )
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+CODEBUILD_BATCH_LIMIT = 100  # batch_get_builds accepts at most 100 ids
+
+FINISHED_STATUSES = {
+    "SUCCEEDED": "success",
+    "FAILED": "failed",
+    "FAULT": "failed",
+    "TIMED_OUT": "failed",
+    "STOPPED": "failed",
+}
+
+
+class FakeCodeBuildClient:
+    """
+    In-process stand-in for the boto3 CodeBuild client (mock mode).
+    Builds finish after a random duration and fail with `failure_rate`.
+    """
+
+    def __init__(self, min_duration: float = 0.5, max_duration: float = 2.0,
+                 failure_rate: float = 0.05, seed: Optional[int] = None):
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.builds: Dict[str, Dict[str, Any]] = {}
+        self.batch_calls = 0
+
+    def start_build(self, projectName: str, **kwargs) -> Dict[str, Any]:
+        build_id = f"{projectName}:{self.rng.randint(10**7, 10**8 - 1)}"
+        self.builds[build_id] = {
+            "id": build_id,
+            "projectName": projectName,
+            "environmentVariables": kwargs.get("environmentVariablesOverride", []),
+            "sourceVersion": kwargs.get("sourceVersion"),
+            "ends_at": time.monotonic() + self.rng.uniform(self.min_duration, self.max_duration),
+            "final_status": "FAILED" if self.rng.random() < self.failure_rate else "SUCCEEDED",
+        }
+        return {"build": self._describe(build_id)}
+
+    def batch_get_builds(self, ids: List[str]) -> Dict[str, Any]:
+        self.batch_calls += 1
+        return {
+            "builds": [self._describe(i) for i in ids if i in self.builds],
+            "buildsNotFound": [i for i in ids if i not in self.builds],
+        }
+
+    def _describe(self, build_id: str) -> Dict[str, Any]:
+        build = self.builds[build_id]
+        done = time.monotonic() >= build["ends_at"]
+        return {
+            "id": build_id,
+            "projectName": build["projectName"],
+            "sourceVersion": build["sourceVersion"],
+            "buildStatus": build["final_status"] if done else "IN_PROGRESS",
+            "buildComplete": done,
+        }
+
+
+_fake_client: Optional[FakeCodeBuildClient] = None
+
+
+def get_codebuild_client():
+    """
+    Real CodeBuild client when USE_REAL_AWS=true, otherwise a shared fake.
+    """
+    global _fake_client
+    if os.environ.get("USE_REAL_AWS", "").lower() == "true":
+        import boto3
+        return boto3.client("codebuild")
+    if _fake_client is None:
+        # Same knobs as the other mock tools (see utils/deployment_tools.py)
+        scale = float(os.environ.get("MOCK_LATENCY_SCALE", "1"))
+        seed = os.environ.get("MOCK_SEED")
+        _fake_client = FakeCodeBuildClient(0.5 * scale, 2.0 * scale, seed=int(seed) if seed else None)
+    return _fake_client
+
+
+def summarize_build(build: Dict[str, Any]) -> Dict[str, Any]:
+    status = build.get("buildStatus", "IN_PROGRESS")
+    return {
+        "build_id": build["id"],
+        "status": FINISHED_STATUSES.get(status, "running"),
+        "build_status": status,
+    }
+
+
+class BuildTracker:
+    """
+    Tracks many in-flight builds with one batched status lookup per poll.
+
+    The poll interval starts at `min_interval` and grows by `backoff` up to
+    `max_interval` while nothing changes; it resets whenever a build finishes.
+    """
+
+    def __init__(self, client=None, min_interval: float = None, max_interval: float = None, backoff: float = 1.5):
+        self._client = client
+        self.min_interval = min_interval or float(os.environ.get("CI_POLL_MIN_SECONDS", "0.5"))
+        self.max_interval = max_interval or float(os.environ.get("CI_POLL_MAX_SECONDS", "15"))
+        self.backoff = backoff
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        return self._client or get_codebuild_client()
+
+    def start(self, service_id: str, step_name: str, source_version: Optional[str] = None) -> Dict[str, Any]:
+        """Starts a build and returns immediately with its id."""
+        kwargs: Dict[str, Any] = {
+            "projectName": os.environ.get("CODEBUILD_PROJECT_NAME", "kube-garden-build"),
+            "environmentVariablesOverride": [
+                {"name": "SERVICE_ID", "value": service_id, "type": "PLAINTEXT"},
+                {"name": "CI_STEP", "value": step_name, "type": "PLAINTEXT"},
+            ],
+        }
+        if source_version:
+            from utils.artifact_index import image_tag_for
+
+            kwargs["sourceVersion"] = source_version
+            # Tag the image by commit so the artifact index can find it again
+            kwargs["environmentVariablesOverride"].append(
+                {"name": "IMAGE_TAG", "value": image_tag_for(source_version), "type": "PLAINTEXT"})
+        return summarize_build(self.client.start_build(**kwargs)["build"])
+
+    async def astart(self, service_id: str, step_name: str, source_version: Optional[str] = None) -> Dict[str, Any]:
+        """Async `start`; the CodeBuild call runs off the event loop, like the status polls."""
+        return await asyncio.to_thread(self.start, service_id, step_name, source_version)
+
+    def poll_once(self, build_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Looks up the given builds in batches of CODEBUILD_BATCH_LIMIT."""
+        results = {}
+        for i in range(0, len(build_ids), CODEBUILD_BATCH_LIMIT):
+            response = self.client.batch_get_builds(ids=build_ids[i:i + CODEBUILD_BATCH_LIMIT])
+            for build in response.get("builds", []):
+                results[build["id"]] = summarize_build(build)
+            for missing in response.get("buildsNotFound", []):
+                results[missing] = {"build_id": missing, "status": "failed", "build_status": "NOT_FOUND"}
+        return results
+
+    def wait_sync(self, build_ids: List[str], timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Blocking variant of `wait` for sync callers."""
+        deadline = time.monotonic() + timeout if timeout else None
+        pending = list(build_ids)
+        done: Dict[str, Dict[str, Any]] = {}
+        interval = self.min_interval
+        while pending:
+            finished = {b: s for b, s in self.poll_once(pending).items() if s["status"] != "running"}
+            done.update(finished)
+            pending = [b for b in pending if b not in done]
+            if not pending:
+                break
+            if deadline and time.monotonic() + interval > deadline:
+                raise TimeoutError(f"Builds still running: {pending}")
+            interval = self.min_interval if finished else min(self.max_interval, interval * self.backoff)
+            time.sleep(interval)
+        return done
+
+    async def wait(self, build_ids: List[str], timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Waits until all builds finish. Every caller shares the same poll loop,
+        so concurrent deployments cost one batch lookup per interval.
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for build_id in build_ids:
+            future = loop.create_future()
+            self._waiters.setdefault(build_id, []).append(future)
+            futures.append(future)
+
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_loop())
+
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout)
+        return {r["build_id"]: r for r in results}
+
+    async def _poll_loop(self) -> None:
+        interval = self.min_interval
+        while self._waiters:
+            await asyncio.sleep(interval)
+            build_ids = [b for b, futures in self._waiters.items() if any(not f.done() for f in futures)]
+            if not build_ids:
+                self._waiters.clear()
+                break
+            try:
+                statuses = await asyncio.to_thread(self.poll_once, build_ids)
+            except Exception as e:
+                print(f"⚠️  CI status lookup failed: {e}")
+                interval = min(self.max_interval, interval * self.backoff)
+                continue
+
+            finished = False
+            for build_id, status in statuses.items():
+                if status["status"] == "running":
+                    continue
+                finished = True
+                for future in self._waiters.pop(build_id, []):
+                    if not future.done():
+                        future.set_result(status)
+            interval = self.min_interval if finished else min(self.max_interval, interval * self.backoff)
+
+
+_trackers: Dict[int, BuildTracker] = {}
+_sync_tracker: Optional[BuildTracker] = None
+
+
+def get_tracker() -> BuildTracker:
+    """
+    Shared tracker. Async waiters are bound to an event loop, so async
+    callers get one tracker per loop.
+    """
+    global _sync_tracker
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        if _sync_tracker is None:
+            _sync_tracker = BuildTracker()
+        return _sync_tracker
+    if id(loop) not in _trackers:
+        _trackers.clear()
+        _trackers[id(loop)] = BuildTracker()
+    return _trackers[id(loop)]
@@ -0,0 +1,100 @@
+import os
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+# Number of recent messages kept verbatim in DeploymentState.messages
+MESSAGE_WINDOW = int(os.environ.get("MESSAGE_WINDOW", "12"))
+
+SUMMARY_ID = "msg-summary"
+
+
+def message_seq(message: BaseMessage) -> Optional[int]:
+    """Absolute position of a message in the deployment's history (None for the summary)."""
+    if message.id and message.id.startswith("msg-") and message.id != SUMMARY_ID:
+        return int(message.id[4:])
+    return None
+
+
+def _summarize(dropped: List[BaseMessage], previous: Optional[BaseMessage]) -> AIMessage:
+    count = len(dropped) + (previous.additional_kwargs.get("compacted", 0) if previous else 0)
+    tools = sorted({m.name for m in dropped if isinstance(m, ToolMessage) and m.name})
+    if previous:
+        tools = sorted(set(tools) | set(previous.additional_kwargs.get("tools", [])))
+    return AIMessage(
+        content=f"[{count} earlier messages compacted; tool calls: {', '.join(tools) or 'none'}. See step_results.]",
+        id=SUMMARY_ID,
+        additional_kwargs={"compacted": count, "tools": tools},
+    )
+
+
+def compact_messages(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Reducer for DeploymentState.messages.
+
+    Appends new messages with a stable `msg-<seq>` id, then keeps the original
+    request, a running summary of dropped messages and the last MESSAGE_WINDOW
+    messages. The window never starts with a ToolMessage, so tool results stay
+    attached to the AIMessage that requested them.
+
+    Messages that already carry an id from this reducer replace the message
+    with that id (or are dropped if it was compacted), so reapplying them is
+    a no-op, as with `add_messages`.
+    """
+    last_seq = -1
+    for message in reversed(left):
+        seq = message_seq(message)
+        if seq is not None:
+            last_seq = seq
+            break
+
+    merged = list(left)
+    positions = {m.id: i for i, m in enumerate(left) if m.id}
+    for message in right:
+        if message.id in positions:
+            merged[positions[message.id]] = message
+            continue
+        seq = message_seq(message)
+        if seq is not None and seq <= last_seq:
+            # Already folded into the summary
+            continue
+        last_seq += 1
+        merged.append(message.model_copy(update={"id": f"msg-{last_seq}"}))
+    if len(merged) <= MESSAGE_WINDOW + 2:
+        return merged
+
+    head: List[BaseMessage] = []
+    previous_summary = None
+    body = merged
+    if body and isinstance(body[0], HumanMessage):
+        head, body = [body[0]], body[1:]
+    if body and body[0].id == SUMMARY_ID:
+        previous_summary, body = body[0], body[1:]
+
+    start = max(0, len(body) - MESSAGE_WINDOW)
+    while start > 0 and isinstance(body[start], ToolMessage):
+        start -= 1
+    if start == 0:
+        return merged
+
+    return head + [_summarize(body[:start], previous_summary)] + body[start:]
+
+
+def paginate_logs(messages: List[BaseMessage], cursor: Optional[int] = None,
+                  limit: Optional[int] = None) -> Tuple[List[str], Optional[int]]:
+    """
+    Returns the log lines after `cursor` (a message seq) and the cursor of the
+    last returned line. The compaction summary is only included on the first page.
+    """
+    logs: List[str] = []
+    next_cursor = cursor
+    for message in messages:
+        seq = message_seq(message)
+        if cursor is not None and (seq is None or seq <= cursor):
+            continue
+        if limit is not None and len(logs) >= limit:
+            break
+        logs.append(message.content)
+        if seq is not None:
+            next_cursor = seq
+    return logs, next_cursor
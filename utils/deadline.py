@@ -0,0 +1,55 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+# Time kept in reserve when the deadline comes from Lambda: the step running
+# when the budget ends has to finish and be checkpointed before the hard timeout.
+DEADLINE_MARGIN_SECONDS = float(os.environ.get("DEPLOY_DEADLINE_MARGIN_SECONDS", "15"))
+
+
+def run_deadline(aws_context: Any = None) -> Optional[float]:
+    """
+    Epoch time by which a run should stop at a step boundary: the Lambda
+    invocation's remaining time minus DEPLOY_DEADLINE_MARGIN_SECONDS, or
+    DEPLOY_TIME_BUDGET_SECONDS from now outside Lambda. None means no limit.
+    """
+    if aws_context is not None and hasattr(aws_context, "get_remaining_time_in_millis"):
+        return time.time() + aws_context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_SECONDS
+    budget = os.environ.get("DEPLOY_TIME_BUDGET_SECONDS")
+    return time.time() + float(budget) if budget else None
+
+
+def time_left(config: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Seconds until the run's deadline (see `run_deadline`), or None without one."""
+    deadline = ((config or {}).get("configurable") or {}).get("deadline")
+    return None if deadline is None else deadline - time.time()
+
+
+def resume_event(thread_id: str) -> Dict[str, Any]:
+    """API Gateway proxy event for POST /deploy/{thread_id}/resume."""
+    path = f"/deploy/{thread_id}/resume"
+    return {
+        "resource": "/{proxy+}", "path": path, "httpMethod": "POST",
+        "headers": {"host": "localhost", "content-type": "application/json"},
+        "multiValueHeaders": {}, "queryStringParameters": None, "multiValueQueryStringParameters": None,
+        "pathParameters": {"proxy": path.lstrip("/")}, "stageVariables": None, "body": None, "isBase64Encoded": False,
+        "requestContext": {"resourcePath": "/{proxy+}", "httpMethod": "POST", "path": path, "stage": "Prod",
+                           "identity": {"sourceIp": "127.0.0.1"}, "requestId": f"resume-{thread_id}"},
+    }
+
+
+def reinvoke_resume(thread_id: str, aws_context: Any) -> None:
+    """
+    Invokes this Lambda again, asynchronously, to resume a suspended deployment.
+    The new invocation may land on another instance, so this only works with a
+    checkpointer shared between instances (e.g. CHECKPOINT_DB_PATH on EFS).
+    """
+    import boto3
+
+    print(f"🔁 Re-invoking {aws_context.function_name} to resume {thread_id}")
+    boto3.client("lambda").invoke(
+        FunctionName=aws_context.invoked_function_arn,
+        InvocationType="Event",
+        Payload=json.dumps(resume_event(thread_id)).encode(),
+    )
@@ -1,11 +1,13 @@
 import os
 import json
+import math
 import time
 import random
+import asyncio
 from typing import List, Dict, Any, Optional
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 
-# Mock Data for Hackathon
+# Mock Data for Hackathon (seeds the service registry)
 MOCK_SERVICES = {
     "demo-api": {
         "id": "demo-api",
@@ -23,147 +25,664 @@ MOCK_SERVICES = {
     }
 }
 
-@tool
-def get_service_metadata(service_id: str) -> str:
+SUPPORTED_STRATEGIES = ("canary", "progressive", "blue-green", "rolling")
+
+# Mock mode knobs: MOCK_SEED makes simulated outcomes reproducible and
+# MOCK_LATENCY_SCALE scales simulated waits (0 = no waiting), for benchmarks
+MOCK_LATENCY_SCALE = float(os.environ.get("MOCK_LATENCY_SCALE", "1"))
+mock_random = random.Random(os.environ.get("MOCK_SEED"))
+
+def _mock_sleep(seconds: float) -> None:
+    time.sleep(seconds * MOCK_LATENCY_SCALE)
+
+async def _amock_sleep(seconds: float) -> None:
+    await asyncio.sleep(seconds * MOCK_LATENCY_SCALE)
+
+def _inline_coroutine(func):
+    """Async entry point for tools that only do in-process work and never wait."""
+    async def coroutine(*args, **kwargs):
+        return func(*args, **kwargs)
+    return coroutine
+
+def _threaded_coroutine(func):
+    """Async entry point for tools whose blocking work is local SQLite (registry, ledger): runs off the loop."""
+    async def coroutine(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return coroutine
+
+def lookup_service(service_id: str) -> Optional[Dict[str, Any]]:
     """
-    Retrieves metadata for a given service ID.
-    Useful for understanding the service context before planning deployment.
+    Returns the registry entry for a service, or None if it is unknown.
     """
-    service = MOCK_SERVICES.get(service_id)
+    from utils.service_registry import get_registry
+    return get_registry().get(service_id)
+
+def lookup_services(service_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Bulk variant of `lookup_service` for multi-service plans.
+    """
+    from utils.service_registry import get_registry
+    return get_registry().get_many(service_ids)
+
+def _get_service_metadata(service_id: str) -> str:
+    service = lookup_service(service_id)
     if not service:
         return json.dumps({"error": "Service not found"})
     return json.dumps(service)
 
-@tool
-def generate_deployment_plan(service_id: str, strategy: str = "canary") -> str:
-    """
-    Generates a deployment plan based on the service and strategy.
-    Returns a JSON string representing the plan steps.
-    """
+# Registry cache misses read SQLite, so the async variant runs on a worker thread
+get_service_metadata = StructuredTool.from_function(
+    func=_get_service_metadata,
+    coroutine=_threaded_coroutine(_get_service_metadata),
+    name="get_service_metadata",
+    description="Retrieves metadata for a given service ID. Useful for understanding the service context before planning deployment."
+)
+
+def _generate_deployment_plan(service_id: str, strategy: str = "canary") -> str:
     # In a real scenario, this might query current state and policies.
     # For now, we generate a standard plan.
     
-    service = MOCK_SERVICES.get(service_id)
+    from utils.plan_cache import get_plan_cache, plan_key
+
+    service = lookup_service(service_id)
+    key = plan_key(service, strategy) if service else None
+    if key:
+        cached = get_plan_cache().get(key)
+        if cached:
+            return json.dumps(cached)
+
     service_type = service.get("type", "backend") if service else "backend"
     
+    # Consecutive steps sharing a "group" are independent and run concurrently
     steps = [
-        {"name": "run_unit_tests", "description": "Run unit tests via CI", "status": "pending"}
+        {"name": "run_unit_tests", "description": "Run unit tests via CI", "status": "pending", "group": "ci"},
+        {"name": "run_lint", "description": "Run lint checks via CI", "status": "pending", "group": "ci"}
     ]
     
     if service_type == "frontend":
         steps.append({"name": "deploy_static_site", "description": "Deploy static site to AWS Lambda", "status": "pending"})
     else:
-        steps.append({"name": "deploy_canary", "description": f"Deploy {strategy} version (10% traffic)", "status": "pending"})
+        steps.append({"name": "security_scan", "description": "Run security scan via CI", "status": "pending", "group": "ci"})
+        steps.append({"name": "build_image", "description": "Build and push container image", "status": "pending"})
+        if strategy == "progressive":
+            steps.append({"name": "deploy_canary", "description": "Deploy progressive rollout (first stage traffic)", "status": "pending"})
+            steps.append({"name": "verify_metrics", "description": "Shift traffic stage by stage while streaming metrics; abort on breach", "status": "pending"})
+        else:
+            steps.append({"name": "deploy_canary", "description": f"Deploy {strategy} version (10% traffic)", "status": "pending"})
+        if strategy == "canary":
+            steps.append({"name": "verify_metrics", "description": "Verify canary metrics, then promote or rollback", "status": "pending"})
         
     plan = {
         "service_id": service_id,
         "strategy": strategy,
         "steps": steps
     }
+    if key:
+        get_plan_cache().put(key, plan)
     return json.dumps(plan)
 
-@tool
-def trigger_ci_pipeline(service_id: str, step_name: str) -> str:
-    """
-    Triggers a CI/CD pipeline step (e.g., CodeBuild).
-    Returns the build ID and status.
-    """
-    # Mocking AWS CodeBuild trigger
+generate_deployment_plan = StructuredTool.from_function(
+    func=_generate_deployment_plan,
+    coroutine=_threaded_coroutine(_generate_deployment_plan),
+    name="generate_deployment_plan",
+    description="Generates a deployment plan based on the service and strategy. Returns a JSON string representing the plan steps."
+)
+
+def _start_ci_build(service_id: str, step_name: str, commit_sha: str = "") -> str:
+    from utils.ci_tracker import get_tracker
+
+    print(f"🚀 Starting CI Step: {step_name} for {service_id}")
+    try:
+        build = get_tracker().start(service_id, step_name, source_version=commit_sha or None)
+    except Exception as e:
+        return json.dumps({"status": "failed", "error": str(e)})
+    return json.dumps({"status": "started", "build_id": build["build_id"], "step_name": step_name})
+
+async def _astart_ci_build(service_id: str, step_name: str, commit_sha: str = "") -> str:
+    from utils.ci_tracker import get_tracker
+
+    print(f"🚀 Starting CI Step: {step_name} for {service_id}")
+    try:
+        build = await get_tracker().astart(service_id, step_name, source_version=commit_sha or None)
+    except Exception as e:
+        return json.dumps({"status": "failed", "error": str(e)})
+    return json.dumps({"status": "started", "build_id": build["build_id"], "step_name": step_name})
+
+start_ci_build = StructuredTool.from_function(
+    func=_start_ci_build,
+    coroutine=_astart_ci_build,
+    name="start_ci_build",
+    description="Starts a CI/CD pipeline step (e.g., CodeBuild) without waiting for it. Builds `commit_sha` if given, otherwise the branch head. Returns the build ID; use `wait_for_ci_builds` to get the outcome."
+)
+
+def _wait_for_ci_builds(build_ids: List[str], timeout_seconds: Optional[float] = None) -> str:
+    from utils.ci_tracker import get_tracker
+
+    tracker = get_tracker()
+    try:
+        builds = tracker.wait_sync(build_ids, timeout=timeout_seconds)
+    except TimeoutError:
+        builds = tracker.poll_once(build_ids)
+    return json.dumps({"builds": builds})
+
+async def _await_ci_builds(build_ids: List[str], timeout_seconds: Optional[float] = None) -> str:
+    from utils.ci_tracker import get_tracker
+
+    tracker = get_tracker()
+    try:
+        builds = await tracker.wait(build_ids, timeout=timeout_seconds)
+    except TimeoutError:
+        # Out of time: report where each build stands, running ones included
+        builds = await asyncio.to_thread(tracker.poll_once, build_ids)
+    return json.dumps({"builds": builds})
+
+wait_for_ci_builds = StructuredTool.from_function(
+    func=_wait_for_ci_builds,
+    coroutine=_await_ci_builds,
+    name="wait_for_ci_builds",
+    description="Waits for CI builds started with `start_ci_build` and returns the status of each build. With `timeout_seconds`, returns when it expires; builds still running are reported with status 'running'."
+)
+
+def _trigger_ci_pipeline(service_id: str, step_name: str) -> str:
+    from utils.ci_tracker import get_tracker
+
     print(f"🚀 Triggering CI Step: {step_name} for {service_id}")
-    time.sleep(1) # Simulate API call
-    
-    # Simulate random failure for demonstration (very low probability)
-    if random.random() < 0.05:
-        return json.dumps({"status": "failed", "error": "Build failed due to test errors"})
-        
-    return json.dumps({"status": "success", "build_id": f"build-{random.randint(1000, 9999)}"})
+    tracker = get_tracker()
+    build = tracker.start(service_id, step_name)
+    result = tracker.wait_sync([build["build_id"]])[build["build_id"]]
+    return _ci_pipeline_result(result)
 
-@tool
-def deploy_to_k8s(service_id: str, version: str, strategy: str) -> str:
-    """
-    Applies Kubernetes manifests to deploy the service.
-    Supports 'canary', 'blue-green', 'rolling'.
-    """
+async def _atrigger_ci_pipeline(service_id: str, step_name: str) -> str:
+    from utils.ci_tracker import get_tracker
+
+    print(f"🚀 Triggering CI Step: {step_name} for {service_id}")
+    tracker = get_tracker()
+    build = await tracker.astart(service_id, step_name)
+    result = (await tracker.wait([build["build_id"]]))[build["build_id"]]
+    return _ci_pipeline_result(result)
+
+def _ci_pipeline_result(result: Dict[str, Any]) -> str:
+    if result["status"] != "success":
+        return json.dumps({"status": "failed", "build_id": result["build_id"], "error": f"Build {result['build_status']}"})
+    return json.dumps({"status": "success", "build_id": result["build_id"]})
+
+# Start + wait in one call, kept for callers that want a single blocking step
+trigger_ci_pipeline = StructuredTool.from_function(
+    func=_trigger_ci_pipeline,
+    coroutine=_atrigger_ci_pipeline,
+    name="trigger_ci_pipeline",
+    description="Triggers a CI/CD pipeline step (e.g., CodeBuild) and waits for it. Returns the build ID and status."
+)
+
+K8S_ROLLOUT_TIMEOUT = float(os.environ.get("K8S_ROLLOUT_TIMEOUT", "300"))
+
+def _rollout_timeout(timeout_seconds: Optional[float]) -> float:
+    """K8S_ROLLOUT_TIMEOUT, capped by the caller's remaining time budget."""
+    return K8S_ROLLOUT_TIMEOUT if timeout_seconds is None else max(0.0, min(K8S_ROLLOUT_TIMEOUT, timeout_seconds))
+
+def _out_of_budget(timeout: float) -> bool:
+    """Whether a wait that ended unfinished was cut short by the time budget, not by K8S_ROLLOUT_TIMEOUT."""
+    return timeout < K8S_ROLLOUT_TIMEOUT
+
+def _cluster_name(service: Dict[str, Any]) -> str:
+    return service.get("cluster", os.environ.get("EKS_CLUSTER_NAME", "kube-garden-cluster"))
+
+def _canary_name(service_id: str) -> str:
+    return f"{service_id}-canary"
+
+def _cluster_target(service_id: str, version: str, strategy: str):
+    from utils.k8s_clients import deployment_manifest
+
+    service = lookup_service(service_id) or {"id": service_id}
+    name = _canary_name(service_id) if strategy in ("canary", "progressive") else service_id
+    return _cluster_name(service), deployment_manifest(service, name, version, strategy)
+
+def _cluster_deploy_result(service_id: str, version: str, cluster: str, name: str, ready: bool,
+                           uid: str, generation: int, timeout: float) -> str:
+    if not ready and _out_of_budget(timeout):
+        # Applied, but the budget ended first; re-applying on resume is a no-op that waits again
+        return json.dumps({"status": "suspended", "message": f"Rollout of {name} still in progress at the deadline"})
+    return json.dumps({
+        "status": "success" if ready else "failed",
+        "message": f"Deployed {service_id}:{version} successfully" if ready else f"Rollout of {name} not ready after {timeout}s",
+        "rollout_id": f"ro-{uid[:8]}-{generation}",
+        "deployment": name,
+        "cluster": cluster
+    })
+
+def _deploy_to_cluster(service_id: str, version: str, strategy: str, timeout: float) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    cluster, manifest = _cluster_target(service_id, version, strategy)
+    metadata = manifest["metadata"]
+    manager = get_cluster_manager()
+    try:
+        applied = manager.apply(cluster, manifest)
+        ready, _ = manager.wait_for_rollout(cluster, metadata["namespace"], metadata["name"], timeout)
+    except Exception as e:
+        return json.dumps({"status": "failed", "error": str(e)})
+    return _cluster_deploy_result(service_id, version, cluster, metadata["name"], ready,
+                                  applied.metadata.uid, applied.metadata.generation, timeout)
+
+async def _adeploy_to_cluster(service_id: str, version: str, strategy: str, timeout: float) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    cluster, manifest = await asyncio.to_thread(_cluster_target, service_id, version, strategy)
+    metadata = manifest["metadata"]
+    manager = get_cluster_manager()
+    try:
+        applied = await manager.aapply(cluster, manifest)
+        ready, _ = await manager.await_rollout(cluster, metadata["namespace"], metadata["name"], timeout)
+    except Exception as e:
+        return json.dumps({"status": "failed", "error": str(e)})
+    return _cluster_deploy_result(service_id, version, cluster, metadata["name"], ready,
+                                  applied["metadata"]["uid"], applied["metadata"]["generation"], timeout)
+
+def _uses_cluster() -> bool:
+    return os.environ.get("USE_REAL_AWS", "").lower() == "true" or bool(os.environ.get("K8S_API_URL"))
+
+def _mock_deploy_result(service_id: str, version: str) -> str:
     # Mocking `kubectl apply` or Argo Rollouts
-    print(f"☸️  Deploying {service_id} ({version}) with {strategy} strategy")
-    time.sleep(1)
-    
     return json.dumps({
         "status": "success", 
         "message": f"Deployed {service_id}:{version} successfully",
-        "rollout_id": f"ro-{random.randint(1000,9999)}"
+        "rollout_id": f"ro-{mock_random.randint(1000,9999)}"
     })
 
-@tool
-def get_deployment_metrics(service_id: str, window_minutes: int = 5) -> str:
-    """
-    Fetches performance metrics (Latency, Error Rate, CPU) from Observability system.
-    Used for verification.
-    """
+def _stage_release(service_id: str, version: str, result: str) -> str:
+    """Records a successful rollout in the release ledger, to be marked good on promotion."""
+    from utils.release_ledger import get_release_ledger
+
+    data = json.loads(result)
+    if data.get("status") == "success" and data.get("rollout_id"):
+        get_release_ledger().stage(lookup_service(service_id) or {"id": service_id}, data["rollout_id"], version)
+    return result
+
+# Progressive traffic shifting and its samples are simulated; a cluster has no
+# traffic router or per-request metrics wired in to drive them yet
+PROGRESSIVE_CLUSTER_ERROR = "progressive strategy is only supported in mock mode; use 'canary' against a cluster"
+
+def _rejects_strategy(strategy: str) -> bool:
+    return strategy == "progressive" and _uses_cluster()
+
+def _deploy_to_k8s(service_id: str, version: str, strategy: str, timeout_seconds: Optional[float] = None) -> str:
+    if _rejects_strategy(strategy):
+        return json.dumps({"status": "failed", "error": PROGRESSIVE_CLUSTER_ERROR})
+    print(f"☸️  Deploying {service_id} ({version}) with {strategy} strategy")
+    if _uses_cluster():
+        return _stage_release(service_id, version, _deploy_to_cluster(service_id, version, strategy, _rollout_timeout(timeout_seconds)))
+    _mock_sleep(1)
+    return _stage_release(service_id, version, _mock_deploy_result(service_id, version))
+
+async def _adeploy_to_k8s(service_id: str, version: str, strategy: str, timeout_seconds: Optional[float] = None) -> str:
+    if _rejects_strategy(strategy):
+        return json.dumps({"status": "failed", "error": PROGRESSIVE_CLUSTER_ERROR})
+    print(f"☸️  Deploying {service_id} ({version}) with {strategy} strategy")
+    if _uses_cluster():
+        result = await _adeploy_to_cluster(service_id, version, strategy, _rollout_timeout(timeout_seconds))
+    else:
+        await _amock_sleep(1)
+        result = _mock_deploy_result(service_id, version)
+    return await asyncio.to_thread(_stage_release, service_id, version, result)
+
+deploy_to_k8s = StructuredTool.from_function(
+    func=_deploy_to_k8s,
+    coroutine=_adeploy_to_k8s,
+    name="deploy_to_k8s",
+    description="Applies Kubernetes manifests to deploy the service. Supports 'canary', 'blue-green', 'rolling', and 'progressive' (stage-by-stage traffic shifting; mock mode only, rejected against a cluster). With `timeout_seconds`, a rollout still in progress when it expires is reported with status 'suspended'."
+)
+
+def _get_deployment_metrics(service_id: str, window_minutes: int = 5) -> str:
     # Mocking CloudWatch/Prometheus
     print(f"📊 Fetching metrics for {service_id} (last {window_minutes}m)")
     
     # Simulate healthy metrics usually, but sometimes degraded
-    is_healthy = random.random() > 0.2
+    is_healthy = mock_random.random() > 0.2
     
     if is_healthy:
         metrics = {
-            "avg_latency_ms": random.randint(20, 100),
-            "error_rate_percent": round(random.uniform(0, 0.5), 2),
-            "cpu_usage_percent": random.randint(30, 60)
+            "avg_latency_ms": mock_random.randint(20, 100),
+            "error_rate_percent": round(mock_random.uniform(0, 0.5), 2),
+            "cpu_usage_percent": mock_random.randint(30, 60)
         }
     else:
         metrics = {
-            "avg_latency_ms": random.randint(200, 500), # High latency
-            "error_rate_percent": round(random.uniform(2.0, 5.0), 2), # High error rate
-            "cpu_usage_percent": random.randint(80, 95)
+            "avg_latency_ms": mock_random.randint(200, 500), # High latency
+            "error_rate_percent": round(mock_random.uniform(2.0, 5.0), 2), # High error rate
+            "cpu_usage_percent": mock_random.randint(80, 95)
         }
         
     return json.dumps(metrics)
 
-@tool
-def promote_rollout(service_id: str, rollout_id: str) -> str:
-    """
-    Promotes a canary rollout to stable (100% traffic).
-    """
+get_deployment_metrics = StructuredTool.from_function(
+    func=_get_deployment_metrics,
+    coroutine=_inline_coroutine(_get_deployment_metrics),
+    name="get_deployment_metrics",
+    description="Fetches performance metrics (Latency, Error Rate, CPU) from Observability system. Used for verification."
+)
+
+def _release_summary(release: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: release[k] for k in ("rollout_id", "image_tag", "manifest_digest", "current_version", "promoted_at")}
+
+def _promotion_target(service_id: str, rollout_id: str):
+    """The service and the release staged for the rollout (None if it was never staged)."""
+    from utils.release_ledger import get_release_ledger
+
     print(f"✅ Promoting rollout {rollout_id} for {service_id}")
-    return json.dumps({"status": "success", "message": "Promotion completed"})
+    return lookup_service(service_id) or {"id": service_id}, get_release_ledger().release(service_id, rollout_id)
+
+def _promote_result(service_id: str, rollout_id: str, release: Optional[Dict[str, Any]],
+                    ready: bool = True, error: Optional[str] = None, timeout: float = K8S_ROLLOUT_TIMEOUT) -> str:
+    """Marks the release last-known-good once the stable Deployment runs it."""
+    from utils.release_ledger import get_release_ledger
 
-@tool
-def rollback_deployment(service_id: str, rollout_id: str, reason: str) -> str:
+    if error is None and not ready and _out_of_budget(timeout):
+        # Promoting again on resume re-applies the same manifest and waits again
+        return json.dumps({"status": "suspended", "message": f"Promotion of {service_id}:{release['image_tag']} still in progress at the deadline"})
+    if error or not ready:
+        return json.dumps({"status": "failed",
+                           "error": error or f"Rollout of {service_id}:{release['image_tag']} not ready after {timeout}s"})
+    result = {"status": "success", "message": "Promotion completed"}
+    release = get_release_ledger().promote(service_id, rollout_id)
+    if release:
+        result["release"] = _release_summary(release)
+    return json.dumps(result)
+
+def _unstaged_error(service_id: str, rollout_id: str) -> str:
+    return f"Rollout {rollout_id} of {service_id} was never staged; no stable manifest to apply"
+
+def _promote_rollout(service_id: str, rollout_id: str, timeout_seconds: Optional[float] = None) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    service, release = _promotion_target(service_id, rollout_id)
+    if not _uses_cluster():
+        return _promote_result(service_id, rollout_id, release)
+    if release is None:
+        return _promote_result(service_id, rollout_id, None, error=_unstaged_error(service_id, rollout_id))
+    # Stable takes over the rollout's version, then the canary goes away
+    cluster, metadata = _cluster_name(service), release["manifest"]["metadata"]
+    manager = get_cluster_manager()
+    timeout = _rollout_timeout(timeout_seconds)
+    deadline = time.monotonic() + timeout
+    try:
+        manager.apply(cluster, release["manifest"])
+        ready, _ = manager.wait_for_rollout(cluster, metadata["namespace"], metadata["name"], timeout)
+        if ready:
+            manager.delete(cluster, metadata["namespace"], _canary_name(service_id), max(0.0, deadline - time.monotonic()))
+    except TimeoutError as e:
+        # The canary was still terminating when the wait ended
+        return _promote_result(service_id, rollout_id, release, False, None if _out_of_budget(timeout) else str(e), timeout)
+    except Exception as e:
+        return _promote_result(service_id, rollout_id, release, error=str(e), timeout=timeout)
+    return _promote_result(service_id, rollout_id, release, ready, timeout=timeout)
+
+async def _apromote_rollout(service_id: str, rollout_id: str, timeout_seconds: Optional[float] = None) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    # Ledger reads and writes are SQLite: kept off the event loop
+    service, release = await asyncio.to_thread(_promotion_target, service_id, rollout_id)
+    ready, error = True, None
+    timeout = _rollout_timeout(timeout_seconds)
+    if _uses_cluster() and release is None:
+        error = _unstaged_error(service_id, rollout_id)
+    elif _uses_cluster():
+        cluster, metadata = _cluster_name(service), release["manifest"]["metadata"]
+        manager = get_cluster_manager()
+        deadline = time.monotonic() + timeout
+        try:
+            await manager.aapply(cluster, release["manifest"])
+            ready, _ = await manager.await_rollout(cluster, metadata["namespace"], metadata["name"], timeout)
+            if ready:
+                await manager.adelete(cluster, metadata["namespace"], _canary_name(service_id), max(0.0, deadline - time.monotonic()))
+        except TimeoutError as e:
+            ready, error = False, None if _out_of_budget(timeout) else str(e)
+        except Exception as e:
+            error = str(e)
+    return await asyncio.to_thread(_promote_result, service_id, rollout_id, release, ready, error, timeout)
+
+promote_rollout = StructuredTool.from_function(
+    func=_promote_rollout,
+    coroutine=_apromote_rollout,
+    name="promote_rollout",
+    description="Promotes a canary rollout to stable (100% traffic): applies the stable manifest, removes the canary and records the release as last-known-good. With `timeout_seconds`, a promotion still in progress when it expires is reported with status 'suspended'."
+)
+
+def _rollback_target(service_id: str, rollout_id: str, reason: str):
     """
-    Rolls back the deployment to the previous stable version.
+    Marks the rollout as rolled back and returns the service with its
+    last-known-good release from the ledger (None if nothing was promoted yet).
     """
+    from utils.release_ledger import get_release_ledger
+
     print(f"↩️  Rolling back {service_id} (Rollout: {rollout_id}). Reason: {reason}")
-    return json.dumps({"status": "success", "message": "Rollback completed"})
+    ledger = get_release_ledger()
+    service = lookup_service(service_id) or {"id": service_id}
+    ledger.mark_rolled_back(service_id, rollout_id)
+    return service, ledger.last_known_good(service_id, service.get("namespace", "default"))
 
-@tool
-def trigger_static_site_deployment(
-    repo_url: str, 
-    app_name: str, 
-    branch: str = "main", 
-    output_dir: str = "dist", 
-    build_command: str = "npm run build",
-    github_token: str = ""
-) -> str:
+def _rollback_result(service_id: str, release: Optional[Dict[str, Any]], started: float,
+                     ready: bool = True, error: Optional[str] = None, timeout: float = K8S_ROLLOUT_TIMEOUT) -> str:
+    from utils.telemetry import TIME_TO_RECOVERY
+
+    elapsed = round(time.monotonic() - started, 3)
+    if error is None and not ready and _out_of_budget(timeout):
+        # The cluster finishes the rollout on its own; only the wait for it ended
+        return json.dumps({"status": "in_progress", "restored": _release_summary(release) if release else None,
+                           "message": f"Rollback of {service_id} applied; still rolling out at the deadline"})
+    outcome = "success" if ready and not error else "failed"
+    if release is None and outcome == "success":
+        return json.dumps({"status": "success", "restored": None, "time_to_recovery_seconds": elapsed,
+                           "message": f"Rollback completed; no promoted release of {service_id} on record, stable left as is"})
+    TIME_TO_RECOVERY.observe(elapsed, outcome=outcome)
+    result = {"status": outcome, "restored": _release_summary(release) if release else None, "time_to_recovery_seconds": elapsed}
+    if outcome == "success":
+        print(f"↩️  Restored {service_id}:{release['image_tag']} in {elapsed}s")
+        result["message"] = f"Rollback completed: {service_id} restored to {release['image_tag']}"
+    else:
+        result["error"] = error or f"Rollout of {release['image_tag']} not ready after {timeout}s"
+    return json.dumps(result)
+
+def _rollback_deployment(service_id: str, rollout_id: str, reason: str, timeout_seconds: Optional[float] = None) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    started = time.monotonic()
+    service, release = _rollback_target(service_id, rollout_id, reason)
+    if not _uses_cluster():
+        if release is not None:
+            _mock_sleep(1)
+        return _rollback_result(service_id, release, started)
+    cluster, namespace = _cluster_name(service), service.get("namespace", "default")
+    manager = get_cluster_manager()
+    timeout = _rollout_timeout(timeout_seconds)
+    try:
+        # Take the bad version out of service first, then re-apply the recorded
+        # snapshot as is: no planner, CI or registry lookups
+        try:
+            manager.delete(cluster, namespace, _canary_name(service_id), timeout)
+        except TimeoutError:
+            if not _out_of_budget(timeout):
+                raise
+        if release is None:
+            return _rollback_result(service_id, None, started)
+        metadata = release["manifest"]["metadata"]
+        manager.apply(cluster, release["manifest"])
+        ready, _ = manager.wait_for_rollout(cluster, metadata["namespace"], metadata["name"], max(0.0, timeout - (time.monotonic() - started)))
+    except Exception as e:
+        return _rollback_result(service_id, release, started, error=str(e), timeout=timeout)
+    return _rollback_result(service_id, release, started, ready, timeout=timeout)
+
+async def _arollback_deployment(service_id: str, rollout_id: str, reason: str, timeout_seconds: Optional[float] = None) -> str:
+    from utils.k8s_clients import get_cluster_manager
+
+    started = time.monotonic()
+    service, release = await asyncio.to_thread(_rollback_target, service_id, rollout_id, reason)
+    if not _uses_cluster():
+        if release is not None:
+            await _amock_sleep(1)
+        return _rollback_result(service_id, release, started)
+    cluster, namespace = _cluster_name(service), service.get("namespace", "default")
+    manager = get_cluster_manager()
+    timeout = _rollout_timeout(timeout_seconds)
+    try:
+        try:
+            await manager.adelete(cluster, namespace, _canary_name(service_id), timeout)
+        except TimeoutError:
+            if not _out_of_budget(timeout):
+                raise
+        if release is None:
+            return _rollback_result(service_id, None, started)
+        metadata = release["manifest"]["metadata"]
+        await manager.aapply(cluster, release["manifest"])
+        ready, _ = await manager.await_rollout(cluster, metadata["namespace"], metadata["name"], max(0.0, timeout - (time.monotonic() - started)))
+    except Exception as e:
+        return _rollback_result(service_id, release, started, error=str(e), timeout=timeout)
+    return _rollback_result(service_id, release, started, ready, timeout=timeout)
+
+rollback_deployment = StructuredTool.from_function(
+    func=_rollback_deployment,
+    coroutine=_arollback_deployment,
+    name="rollback_deployment",
+    description="Rolls back the deployment: removes the canary and re-applies the last-known-good (last promoted) release. Reports the time to recovery. With `timeout_seconds`, stops waiting when it expires and reports status 'in_progress'."
+)
+
+# Progressive canary: traffic stages and how long/often each one is sampled
+PROGRESSIVE_STAGES = [int(p) for p in os.environ.get("PROGRESSIVE_STAGES", "5,25,50,100").split(",")]
+PROGRESSIVE_STAGE_SECONDS = float(os.environ.get("PROGRESSIVE_STAGE_SECONDS", "10"))
+PROGRESSIVE_SAMPLE_INTERVAL = float(os.environ.get("PROGRESSIVE_SAMPLE_INTERVAL", "1"))
+PROGRESSIVE_MIN_REQUESTS = int(os.environ.get("PROGRESSIVE_MIN_REQUESTS", "100"))
+
+def _mock_canary_sample(degraded: bool, traffic_percent: int) -> Dict[str, Any]:
+    # Mocking a Prometheus/CloudWatch query over the last sample interval
+    requests = max(1, traffic_percent * 20)
+    latency_range = (250, 600) if degraded else (20, 100)
+    error_chance = 0.03 if degraded else 0.001
+    return {
+        "latencies_ms": [mock_random.uniform(*latency_range) for _ in range(min(requests, 50))],
+        "requests": requests,
+        "errors": sum(mock_random.random() < error_chance for _ in range(requests)),
+        "cpu_usage_percent": mock_random.randint(80, 95) if degraded else mock_random.randint(30, 60),
+    }
+
+def _progressive_canary(service_id: str, rollout_id: str, stages: Optional[List[int]],
+                        timeout_seconds: Optional[float] = None):
     """
-    Triggers the Lambda-based static site deployment.
+    Walks the traffic stages, re-evaluating the rolling aggregate after every
+    sample. Yields the seconds to wait before the next sample and returns the
+    result, so the sync and async tools share one implementation. Each stage
+    is PROGRESSIVE_STAGE_SECONDS of simulated samples, slept scaled by
+    MOCK_LATENCY_SCALE. With `timeout_seconds`, a sample that would not fit in
+    it ends the walk with status "incomplete" instead.
+    """
+    from utils.verification import RollingWindow, evaluate_metrics, policy_for_service
+
+    if _uses_cluster():
+        # Never judge a real rollout on simulated samples
+        return {"status": "aborted", "error": PROGRESSIVE_CLUSTER_ERROR, "stages": [], "elapsed_seconds": 0}
+    stages = stages or PROGRESSIVE_STAGES
+    policy = policy_for_service(lookup_service(service_id))
+    degraded = mock_random.random() < 0.2
+    samples_per_stage = max(1, math.ceil(PROGRESSIVE_STAGE_SECONDS / PROGRESSIVE_SAMPLE_INTERVAL)) if PROGRESSIVE_SAMPLE_INTERVAL > 0 else 1
+    wait = PROGRESSIVE_SAMPLE_INTERVAL * MOCK_LATENCY_SCALE
+    started = time.monotonic()
+    deadline = started + timeout_seconds if timeout_seconds is not None else None
+    completed = []
+
+    for percent in stages:
+        print(f"🚦 Shifting {percent}% traffic to {service_id} rollout {rollout_id}")
+        window = RollingWindow()
+        for _ in range(samples_per_stage):
+            if deadline is not None and time.monotonic() + wait > deadline:
+                print(f"⏸️  Time budget spent at {percent}% traffic, progressive rollout incomplete")
+                return {
+                    "status": "incomplete",
+                    "stopped_at_percent": percent,
+                    "stages": completed,
+                    "elapsed_seconds": round(time.monotonic() - started, 2),
+                }
+            yield wait
+            window.add(_mock_canary_sample(degraded, percent))
+            if window.requests >= PROGRESSIVE_MIN_REQUESTS:
+                verdict = evaluate_metrics(window.snapshot(), policy)
+                if verdict["decision"] == "rollback":
+                    print(f"🛑 Aborting at {percent}%: thresholds breached")
+                    return {
+                        "status": "aborted",
+                        "aborted_at_percent": percent,
+                        "violations": verdict["violations"],
+                        "metrics": verdict["metrics"],
+                        "stages": completed,
+                        "elapsed_seconds": round(time.monotonic() - started, 2),
+                    }
+        # The gray zone counts as healthy here: there is no LLM in this loop
+        completed.append({"traffic_percent": percent, "metrics": window.snapshot()})
+
+    return {"status": "promoted", "stages": completed, "elapsed_seconds": round(time.monotonic() - started, 2)}
+
+def _run_progressive_canary(service_id: str, rollout_id: str, stages: Optional[List[int]] = None,
+                            timeout_seconds: Optional[float] = None) -> str:
+    run = _progressive_canary(service_id, rollout_id, stages, timeout_seconds)
+    try:
+        while True:
+            time.sleep(next(run))
+    except StopIteration as done:
+        return json.dumps(done.value)
+
+async def _arun_progressive_canary(service_id: str, rollout_id: str, stages: Optional[List[int]] = None,
+                                   timeout_seconds: Optional[float] = None) -> str:
+    run = _progressive_canary(service_id, rollout_id, stages, timeout_seconds)
+    try:
+        while True:
+            await asyncio.sleep(next(run))
+    except StopIteration as done:
+        return json.dumps(done.value)
+
+run_progressive_canary = StructuredTool.from_function(
+    func=_run_progressive_canary,
+    coroutine=_arun_progressive_canary,
+    name="run_progressive_canary",
+    description="Shifts traffic to a rollout stage by stage (e.g. 5->25->50->100%), streaming metrics and aborting as soon as a threshold is breached. Does not promote or roll back. With `timeout_seconds`, stops with status 'incomplete' when it runs out."
+)
+
+# Static site API: a 202 response with a status URL switches to submit-then-poll
+STATIC_SITE_POLL_INTERVAL = float(os.environ.get("STATIC_SITE_POLL_INTERVAL", "5"))
+STATIC_SITE_POLL_TIMEOUT = float(os.environ.get("STATIC_SITE_POLL_TIMEOUT", "600"))
+STATIC_SITE_TERMINAL_STATUSES = ("success", "succeeded", "completed", "failed", "error")
+
+def _static_site_mock(app_name: str) -> str:
+    print(f"⚠️  Using MOCK Static Site Deployment for {app_name}")
+    return json.dumps({
+        "status": "success", 
+        "response": {
+            "message": "Mock deployment successful", 
+            "url": f"https://{app_name}.example.com"
+        }
+    })
+
+def _static_site_status_url(response) -> Optional[str]:
+    if response.status_code != 202:
+        return None
+    body = response.json() if response.content else {}
+    return body.get("status_url") or response.headers.get("Location")
+
+def _static_site_result(body: Dict[str, Any]) -> str:
+    if str(body.get("status", "success")).lower() in ("failed", "error"):
+        return json.dumps({"status": "failed", "error": body.get("error", "Static site deployment failed"), "response": body})
+    return json.dumps({"status": "success", "response": body})
+
+def _static_site_deployment(repo_url: str, app_name: str, branch: str, output_dir: str,
+                            build_command: str, github_token: str):
+    """
+    Submits the deployment and, on a 202, polls its status URL. Yields the
+    seconds to wait or a (method, url, kwargs) request to send, and gets the
+    response back; returns the result, so the sync and async tools share one
+    implementation. A failed request is thrown back into the generator.
     """
-    import requests
-    
     api_url = os.environ.get("STATIC_SITE_DEPLOY_API_URL")
     
     # Mock for local testing if URL is MOCK or not set
     if not api_url or api_url == "MOCK":
-        print(f"⚠️  Using MOCK Static Site Deployment for {app_name}")
-        time.sleep(2)
-        return json.dumps({
-            "status": "success", 
-            "response": {
-                "message": "Mock deployment successful", 
-                "url": f"https://{app_name}.example.com"
-            }
-        })
+        yield 2 * MOCK_LATENCY_SCALE
+        return _static_site_mock(app_name)
         
     payload = {
         "github_token": github_token,
@@ -176,8 +695,84 @@ def trigger_static_site_deployment(
     
     print(f"🚀 Triggering Static Site Deployment for {app_name}...")
     try:
-        response = requests.post(api_url, json=payload, timeout=30)
+        response = yield ("POST", api_url, {"json": payload, "headers": {"Prefer": "respond-async"}})
         response.raise_for_status()
-        return json.dumps({"status": "success", "response": response.json()})
+
+        status_url = _static_site_status_url(response)
+        if not status_url:
+            return _static_site_result(response.json())
+
+        deadline = time.monotonic() + STATIC_SITE_POLL_TIMEOUT
+        while time.monotonic() < deadline:
+            yield STATIC_SITE_POLL_INTERVAL
+            poll = yield ("GET", status_url, {"idempotent": True})
+            poll.raise_for_status()
+            body = poll.json()
+            if str(body.get("status", "")).lower() in STATIC_SITE_TERMINAL_STATUSES:
+                return _static_site_result(body)
+        return json.dumps({"status": "failed", "error": f"Timed out waiting for {status_url}"})
     except Exception as e:
         return json.dumps({"status": "failed", "error": str(e)})
+
+def _static_site_deploy(
+    repo_url: str, 
+    app_name: str, 
+    branch: str = "main", 
+    output_dir: str = "dist", 
+    build_command: str = "npm run build",
+    github_token: str = ""
+) -> str:
+    from utils.http_client import request_with_retries
+
+    run = _static_site_deployment(repo_url, app_name, branch, output_dir, build_command, github_token)
+    try:
+        step = next(run)
+        while True:
+            if not isinstance(step, tuple):
+                time.sleep(step)
+                step = next(run)
+                continue
+            method, url, kwargs = step
+            try:
+                response = request_with_retries(method, url, **kwargs)
+            except Exception as e:
+                step = run.throw(e)
+            else:
+                step = run.send(response)
+    except StopIteration as done:
+        return done.value
+
+async def _astatic_site_deploy(
+    repo_url: str, 
+    app_name: str, 
+    branch: str = "main", 
+    output_dir: str = "dist", 
+    build_command: str = "npm run build",
+    github_token: str = ""
+) -> str:
+    from utils.http_client import arequest_with_retries
+
+    run = _static_site_deployment(repo_url, app_name, branch, output_dir, build_command, github_token)
+    try:
+        step = next(run)
+        while True:
+            if not isinstance(step, tuple):
+                await asyncio.sleep(step)
+                step = next(run)
+                continue
+            method, url, kwargs = step
+            try:
+                response = await arequest_with_retries(method, url, **kwargs)
+            except Exception as e:
+                step = run.throw(e)
+            else:
+                step = run.send(response)
+    except StopIteration as done:
+        return done.value
+
+trigger_static_site_deployment = StructuredTool.from_function(
+    func=_static_site_deploy,
+    coroutine=_astatic_site_deploy,
+    name="trigger_static_site_deployment",
+    description="Triggers the Lambda-based static site deployment."
+)
@@ -0,0 +1,210 @@
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEPLOYMENT_PATH = re.compile(r"^/apis/apps/v1/namespaces/([^/]+)/deployments(?:/([^/]+))?$")
+
+
+class FakeKubeAPI:
+    """
+    Minimal in-process Kubernetes API server for local runs: server-side
+    apply, delete and list/watch of Deployments. An applied Deployment becomes
+    ready `rollout_seconds` later; a deleted one terminates as long.
+    """
+
+    def __init__(self, rollout_seconds: float = 0.5):
+        self.rollout_seconds = rollout_seconds
+        self.deployments: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Deleted Deployments, kept so watches still see the DELETED event
+        self.tombstones: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.resource_version = 0
+        self.requests = 0
+        self.connections = set()
+        self.applies = []
+        self.deletes = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- State ---
+
+    def _bump(self, deployment: Dict[str, Any]) -> None:
+        self.resource_version += 1
+        deployment["metadata"]["resourceVersion"] = str(self.resource_version)
+
+    def apply(self, namespace: str, name: str, manifest: Dict[str, Any], query: Dict[str, list]) -> Dict[str, Any]:
+        with self._lock:
+            self.applies.append({"name": name, "field_manager": query.get("fieldManager", [None])[0],
+                                 "force": query.get("force", [None])[0]})
+            current = self.deployments.get((namespace, name))
+            metadata = {**manifest.get("metadata", {}), "name": name, "namespace": namespace}
+            if current is None:
+                metadata.update(uid=str(uuid.uuid4()), generation=1)
+                status = {}
+            else:
+                changed = current["spec"] != manifest.get("spec")
+                metadata.update(uid=current["metadata"]["uid"],
+                                generation=current["metadata"]["generation"] + (1 if changed else 0))
+                status = current["status"]
+            deployment = {"apiVersion": "apps/v1", "kind": "Deployment", "metadata": metadata,
+                          "spec": manifest.get("spec", {}), "status": status,
+                          "_ready_at": time.monotonic() + self.rollout_seconds}
+            self._bump(deployment)
+            self.deployments[(namespace, name)] = deployment
+            self.tombstones.pop((namespace, name), None)
+            return self._public(deployment)
+
+    def delete(self, namespace: str, name: str, query: Dict[str, list]) -> bool:
+        """Starts terminating a Deployment (foreground: it stays listed until its pods are gone)."""
+        with self._lock:
+            deployment = self.deployments.get((namespace, name))
+            if deployment is None:
+                return False
+            self.deletes.append({"name": name, "propagation_policy": query.get("propagationPolicy", [None])[0]})
+            if "_deleted_at" not in deployment:
+                deployment["metadata"]["deletionTimestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                deployment["_deleted_at"] = time.monotonic() + self.rollout_seconds
+                self._bump(deployment)
+            return True
+
+    def _tick(self) -> None:
+        """Completes rollouts and deletions whose time has come."""
+        now = time.monotonic()
+        for key, deployment in list(self.deployments.items()):
+            if "_deleted_at" in deployment:
+                if now >= deployment["_deleted_at"]:
+                    del self.deployments[key]
+                    self._bump(deployment)
+                    self.tombstones[key] = deployment
+                continue
+            generation = deployment["metadata"]["generation"]
+            if now >= deployment["_ready_at"] and deployment["status"].get("observedGeneration") != generation:
+                replicas = deployment["spec"].get("replicas", 1)
+                deployment["status"] = {"observedGeneration": generation, "replicas": replicas,
+                                        "updatedReplicas": replicas, "readyReplicas": replicas,
+                                        "availableReplicas": replicas}
+                self._bump(deployment)
+
+    def _select(self, namespace: str, field_selector: str, deployments=None):
+        name = field_selector.split("=", 1)[1] if field_selector.startswith("metadata.name=") else None
+        deployments = self.deployments if deployments is None else deployments
+        return [d for (ns, n), d in deployments.items() if ns == namespace and (name is None or n == name)]
+
+    @staticmethod
+    def _public(deployment: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in deployment.items() if not k.startswith("_")}
+
+    def list(self, namespace: str, field_selector: str) -> Dict[str, Any]:
+        with self._lock:
+            self._tick()
+            return {"apiVersion": "apps/v1", "kind": "DeploymentList",
+                    "metadata": {"resourceVersion": str(self.resource_version)},
+                    "items": [self._public(d) for d in self._select(namespace, field_selector)]}
+
+    def changes_since(self, namespace: str, field_selector: str, resource_version: int):
+        """Watch events (type, object) after `resource_version`, oldest first."""
+        with self._lock:
+            self._tick()
+            events = [("MODIFIED", d) for d in self._select(namespace, field_selector)]
+            events += [("DELETED", d) for d in self._select(namespace, field_selector, self.tombstones)]
+            events = [(t, self._public(d)) for t, d in events if int(d["metadata"]["resourceVersion"]) > resource_version]
+            return sorted(events, key=lambda e: int(e[1]["metadata"]["resourceVersion"]))
+
+    # --- Server ---
+
+    def start(self) -> str:
+        """Serves on a free localhost port in a daemon thread; returns the base URL."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Like the real API server (TCP_NODELAY); otherwise small writes wait on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _route(self):
+                with api._lock:
+                    api.requests += 1
+                    api.connections.add(self.client_address)
+                url = urlparse(self.path)
+                match = DEPLOYMENT_PATH.match(url.path)
+                return match, parse_qs(url.query)
+
+            def do_PATCH(self):
+                match, query = self._route()
+                if not match or not match.group(2):
+                    return self._send(404, {"kind": "Status", "code": 404})
+                if self.headers.get("Content-Type") != "application/apply-patch+yaml":
+                    return self._send(415, {"kind": "Status", "code": 415, "message": "expected server-side apply"})
+                manifest = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self._send(200, api.apply(match.group(1), match.group(2), manifest, query))
+
+            def do_DELETE(self):
+                match, query = self._route()
+                if not match or not match.group(2):
+                    return self._send(404, {"kind": "Status", "code": 404})
+                # DeleteOptions may come as a body or as query parameters
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+                if body and json.loads(body).get("propagationPolicy"):
+                    query.setdefault("propagationPolicy", [json.loads(body)["propagationPolicy"]])
+                if not api.delete(match.group(1), match.group(2), query):
+                    return self._send(404, {"kind": "Status", "apiVersion": "v1", "status": "Failure", "code": 404,
+                                            "reason": "NotFound", "message": f"deployments \"{match.group(2)}\" not found"})
+                self._send(200, {"kind": "Status", "apiVersion": "v1", "status": "Success",
+                                 "details": {"name": match.group(2), "group": "apps", "kind": "deployments"}})
+
+            def do_GET(self):
+                match, query = self._route()
+                if not match or match.group(2):
+                    return self._send(404, {"kind": "Status", "code": 404})
+                namespace = match.group(1)
+                field_selector = query.get("fieldSelector", [""])[0]
+                if query.get("watch", ["false"])[0].lower() != "true":
+                    return self._send(200, api.list(namespace, field_selector))
+
+                # Watch: newline-delimited events in chunks (as the real API server does) until the timeout
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                seen = int(query.get("resourceVersion", ["0"])[0] or 0)
+                deadline = time.monotonic() + float(query.get("timeoutSeconds", ["30"])[0])
+                try:
+                    while time.monotonic() < deadline:
+                        for event_type, deployment in api.changes_since(namespace, field_selector, seen):
+                            seen = max(seen, int(deployment["metadata"]["resourceVersion"]))
+                            line = json.dumps({"type": event_type, "object": deployment}).encode() + b"\n"
+                            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                            self.wfile.flush()
+                        time.sleep(0.02)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            # Async clients open many connections at once; the default backlog of 5 drops them
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
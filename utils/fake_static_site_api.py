@@ -0,0 +1,104 @@
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeStaticSiteAPI:
+    """
+    Minimal in-process stand-in for the static site deployment Lambda, for
+    local runs. The first `fail_first` deploy requests answer `fail_status`
+    (e.g. 503 while the Lambda is throttled). With `async_mode`, a deploy
+    that asks for `Prefer: respond-async` gets 202 and a status URL that
+    reports "running" for `polls_until_done - 1` polls.
+    """
+
+    def __init__(self, fail_first: int = 0, fail_status: int = 503, async_mode: bool = False,
+                 polls_until_done: int = 2):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.async_mode = async_mode
+        self.polls_until_done = polls_until_done
+        self.requests: List[Dict[str, Any]] = []
+        self.connections = set()
+        self.polls: Dict[str, int] = {}
+        self.base_url: Optional[str] = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- State ---
+
+    def deploy(self, payload: Dict[str, Any], respond_async: bool):
+        """(status code, body) for a deploy request."""
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self.fail_status, {"message": "Rate exceeded"}
+            site = {"status": "success", "message": "Deployment successful", "url": f"https://{payload.get('app_name')}.example.com"}
+            if not (self.async_mode and respond_async):
+                return 200, site
+            deployment_id = uuid.uuid4().hex[:12]
+            self.polls[deployment_id] = 0
+            return 202, {"status": "running", "status_url": f"{self.base_url}/status/{deployment_id}"}
+
+    def status(self, deployment_id: str):
+        with self._lock:
+            if deployment_id not in self.polls:
+                return 404, {"message": "Not found"}
+            self.polls[deployment_id] += 1
+            if self.polls[deployment_id] < self.polls_until_done:
+                return 200, {"status": "running"}
+            return 200, {"status": "success", "message": "Deployment successful", "url": f"https://{deployment_id}.example.com"}
+
+    # --- Server ---
+
+    def start(self) -> str:
+        """Serves on a free localhost port in a daemon thread; returns the deploy URL."""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _record(self) -> None:
+                with api._lock:
+                    api.requests.append({"method": self.command, "path": self.path})
+                    api.connections.add(self.client_address)
+
+            def do_POST(self):
+                self._record()
+                if self.path != "/deploy":
+                    return self._send(404, {"message": "Not found"})
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                self._send(*api.deploy(payload, self.headers.get("Prefer") == "respond-async"))
+
+            def do_GET(self):
+                self._record()
+                if not self.path.startswith("/status/"):
+                    return self._send(404, {"message": "Not found"})
+                self._send(*api.status(self.path[len("/status/"):]))
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        return f"{self.base_url}/deploy"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
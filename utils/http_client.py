@@ -0,0 +1,104 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Status codes worth retrying. 502/504 may mean the upstream already acted on
+# the request, so they are only retried for idempotent calls.
+RETRY_ALWAYS = {429, 503}
+RETRY_IDEMPOTENT = {502, 504}
+
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.environ.get("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = 8.0
+
+TIMEOUT = httpx.Timeout(
+    connect=float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3")),
+    read=float(os.environ.get("HTTP_READ_TIMEOUT", "30")),
+    write=10.0,
+    pool=5.0,
+)
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_sync_client: Optional[httpx.Client] = None
+_async_clients: Dict[int, httpx.AsyncClient] = {}
+
+
+def get_client() -> httpx.Client:
+    """Shared keep-alive client for sync callers."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = httpx.Client(timeout=TIMEOUT, limits=LIMITS, http2=HTTP2)
+    return _sync_client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared keep-alive client for async callers.
+    Connections are bound to an event loop, so there is one client per loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(id(loop))
+    if client is None or client.is_closed:
+        _async_clients.clear()  # clients of previous (closed) loops can't be reused
+        client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS, http2=HTTP2)
+        _async_clients[id(loop)] = client
+    return client
+
+
+def _should_retry(attempt: int, idempotent: bool, response: Optional[httpx.Response] = None,
+                  error: Optional[Exception] = None) -> bool:
+    if attempt >= MAX_RETRIES:
+        return False
+    if error is not None:
+        # A failed connect never reached the server; anything else might have
+        return idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    if response.status_code in RETRY_ALWAYS:
+        return True
+    return idempotent and response.status_code in RETRY_IDEMPOTENT
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def request_with_retries(method: str, url: str, *, idempotent: bool = False, **kwargs: Any) -> httpx.Response:
+    client = get_client()
+    attempt = 0
+    while True:
+        try:
+            response = client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(attempt, idempotent, error=e):
+                raise
+        else:
+            if not _should_retry(attempt, idempotent, response=response):
+                return response
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def arequest_with_retries(method: str, url: str, *, idempotent: bool = False, **kwargs: Any) -> httpx.Response:
+    client = get_async_client()
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(attempt, idempotent, error=e):
+                raise
+        else:
+            if not _should_retry(attempt, idempotent, response=response):
+                return response
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
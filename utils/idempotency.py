@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, NamedTuple, Optional
+
+TERMINAL_STATUSES = ("completed", "rolled_back", "failed")
+
+# Request fields that don't change what gets deployed
+IGNORED_FIELDS = ("thread_id", "async_mode")
+# Credentials: kept out of the fingerprint stored with the checkpoint, and a
+# retry with a rotated token is still the same request
+CREDENTIAL_FIELDS = ("github_token",)
+
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    """
+    Hash of a deploy request's payload, identical for retries of the same
+    request. Ignores IGNORED_FIELDS and CREDENTIAL_FIELDS.
+    """
+    body = {k: v for k, v in payload.items() if k not in IGNORED_FIELDS + CREDENTIAL_FIELDS}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Running(NamedTuple):
+    request_hash: str
+    done: asyncio.Future
+
+
+class InFlightDeployments:
+    """
+    Deployments currently executing in this process, by thread_id. Retries of
+    a running deployment wait on its `done` future instead of starting the
+    graph again.
+    """
+
+    def __init__(self):
+        self._running: Dict[str, Running] = {}
+
+    def get(self, thread_id: str) -> Optional[Running]:
+        return self._running.get(thread_id)
+
+    def start(self, thread_id: str, request_hash: str) -> Running:
+        """
+        Claims the thread. Synchronous on purpose: call it before the first
+        `await` after `get`, so concurrent retries can't both see it free.
+        """
+        running = Running(request_hash, asyncio.get_running_loop().create_future())
+        self._running[thread_id] = running
+        return running
+
+    def finish(self, thread_id: str, running: Optional[Running] = None) -> None:
+        """Releases the thread; with `running`, only if that claim still holds it."""
+        if running is not None and self._running.get(thread_id) is not running:
+            return
+        running = self._running.pop(thread_id, None)
+        if running and not running.done.done():
+            running.done.set_result(None)
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import traceback
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+# A queued job is a plain dict so it can be serialized by remote queues:
+#   {"thread_id": str, "service_id": str, "inputs": dict, "config": dict, "claim": Running}
+# "claim" is the submitting process's in-flight entry (utils/idempotency.py),
+# released by the job; a remote queue would leave it out and claim on receipt.
+Job = Dict[str, Any]
+
+MAX_TRACKED_JOBS = 1000
+
+
+class JobQueue(ABC):
+    """
+    Queue interface used by the deployment worker pool.
+    Swap in a remote implementation (e.g. SQS) by implementing these methods.
+    """
+
+    @abstractmethod
+    async def put(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self) -> Job:
+        ...
+
+    def task_done(self) -> None:
+        """Acknowledges the last job returned by `get`."""
+
+    @abstractmethod
+    def qsize(self) -> int:
+        ...
+
+
+class LocalJobQueue(JobQueue):
+    """
+    In-process queue backed by asyncio.Queue.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def put(self, job: Job) -> None:
+        await self._queue.put(job)
+
+    async def get(self) -> Job:
+        return await self._queue.get()
+
+    def task_done(self) -> None:
+        self._queue.task_done()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class DeploymentWorkerPool:
+    """
+    Bounded pool of workers that drive queued deployments through the graph.
+
+    `max_workers` caps the number of deployments running at once and
+    `max_per_service` caps how many of them may target the same service.
+    Jobs for a saturated service are parked and re-queued when a slot frees up.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Job], Awaitable[Any]],
+        queue: Optional[JobQueue] = None,
+        max_workers: Optional[int] = None,
+        max_per_service: Optional[int] = None,
+    ):
+        self.run_job = run_job
+        self.queue = queue or LocalJobQueue()
+        self.max_workers = max_workers or int(os.environ.get("DEPLOY_MAX_WORKERS", "4"))
+        self.max_per_service = max_per_service or int(os.environ.get("DEPLOY_MAX_PER_SERVICE", "1"))
+
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, int] = defaultdict(int)
+        self._deferred: Dict[str, Deque[Job]] = defaultdict(deque)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def start(self) -> None:
+        """Spawns the workers on the running event loop (idempotent)."""
+        self._workers = [w for w in self._workers if not w.done()]
+        for _ in range(self.max_workers - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job: Job) -> None:
+        self.start()
+        self._track(job["thread_id"], {"status": "queued", "service_id": job["service_id"]})
+        await self.queue.put(job)
+
+    def job_status(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(thread_id)
+
+    def _track(self, thread_id: str, info: Dict[str, Any]) -> None:
+        self._jobs[thread_id] = info
+        self._jobs.move_to_end(thread_id)
+        while len(self._jobs) > MAX_TRACKED_JOBS:
+            self._jobs.popitem(last=False)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            service_id = job["service_id"]
+
+            if self._active[service_id] >= self.max_per_service:
+                self._deferred[service_id].append(job)
+                self.queue.task_done()
+                continue
+
+            self._active[service_id] += 1
+            self._track(job["thread_id"], {"status": "running", "service_id": service_id})
+            try:
+                await self.run_job(job)
+                self._track(job["thread_id"], {"status": "finished", "service_id": service_id})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                self._track(job["thread_id"], {"status": "failed", "service_id": service_id, "error": str(e)})
+            finally:
+                self._active[service_id] -= 1
+                if self._deferred[service_id]:
+                    await self.queue.put(self._deferred[service_id].popleft())
+                self.queue.task_done()
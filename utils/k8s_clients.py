@@ -0,0 +1,384 @@
+import asyncio
+import base64
+import json
+import os
+import ssl
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+TOKEN_PREFIX = "k8s-aws-v1."
+# EKS accepts a presigned STS token for 15 minutes
+TOKEN_TTL_SECONDS = 15 * 60
+TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get("EKS_TOKEN_REFRESH_MARGIN_SECONDS", "60"))
+FIELD_MANAGER = "kube-garden"
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("K8S_ASYNC_MAX_CONNECTIONS", "512"))
+
+
+class EKSTokenCache:
+    """
+    Mints EKS bearer tokens (a presigned STS GetCallerIdentity URL, the same
+    as `aws eks get-token`) and reuses each one until shortly before it expires.
+    """
+
+    def __init__(self, region: Optional[str] = None, session=None, clock=time.time):
+        self.region = region or os.environ.get("AWS_REGION", "ap-northeast-2")
+        self._session = session
+        self.clock = clock
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.minted = 0
+
+    def get(self, cluster_name: str) -> str:
+        with self._lock:
+            cached = self._tokens.get(cluster_name)
+            if cached and self.clock() < cached[1] - TOKEN_REFRESH_MARGIN_SECONDS:
+                return cached[0]
+            token = self._mint(cluster_name)
+            self._tokens[cluster_name] = (token, self.clock() + TOKEN_TTL_SECONDS)
+            self.minted += 1
+            return token
+
+    def _mint(self, cluster_name: str) -> str:
+        import boto3
+        from botocore.signers import RequestSigner
+
+        session = self._session or boto3.session.Session()
+        sts = session.client("sts", region_name=self.region)
+        signer = RequestSigner(sts.meta.service_model.service_id, self.region, "sts", "v4",
+                               session.get_credentials(), session.events)
+        url = signer.generate_presigned_url(
+            {
+                "method": "GET",
+                "url": f"https://sts.{self.region}.amazonaws.com/?Action=GetCallerIdentity&Version=2011-06-15",
+                "body": {},
+                "headers": {"x-k8s-aws-id": cluster_name},
+                "context": {},
+            },
+            region_name=self.region,
+            expires_in=60,
+            operation_name="",
+        )
+        return TOKEN_PREFIX + base64.urlsafe_b64encode(url.encode()).decode().rstrip("=")
+
+
+def deployment_manifest(service: Dict[str, Any], name: str, version: str, strategy: str) -> Dict[str, Any]:
+    """Deployment applied for a rollout; canary-like strategies get their own track."""
+    service_id = service["id"]
+    track = "canary" if strategy in ("canary", "progressive") else "stable"
+    labels = {"app": service_id, "track": track}
+    registry = os.environ.get("IMAGE_REGISTRY", "registry.local")
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": name, "namespace": service.get("namespace", "default"), "labels": labels,
+                     "annotations": {"kube-garden/version": version, "kube-garden/strategy": strategy}},
+        "spec": {
+            "replicas": int(service.get("canary_replicas" if track == "canary" else "replicas", 1)),
+            "selector": {"matchLabels": labels},
+            "template": {
+                "metadata": {"labels": labels},
+                "spec": {"containers": [{"name": service_id, "image": f"{registry}/{service_id}:{version}"}]},
+            },
+        },
+    }
+
+
+def rollout_complete(deployment: Dict[str, Any]) -> bool:
+    """
+    Same condition as `kubectl rollout status`: new generation observed and all
+    replicas updated and available. Takes the Deployment as its API JSON.
+    """
+    spec = deployment.get("spec") or {}
+    status = deployment.get("status") or {}
+    desired = spec.get("replicas", 1)
+    return (
+        status.get("observedGeneration", 0) >= deployment["metadata"].get("generation", 0)
+        and status.get("updatedReplicas", 0) >= desired
+        and status.get("availableReplicas", 0) >= desired
+    )
+
+
+def _watch_timeouts(remaining: float) -> Dict[str, Any]:
+    """
+    Watch request timeouts for the time left. The server-side one is whole
+    seconds (at least 1); the client read timeout also ends sub-second waits.
+    """
+    return {"timeout_seconds": max(1, int(remaining)), "_request_timeout": remaining}
+
+
+def _stream_timeout(remaining: float):
+    import httpx
+
+    # Same as the pooled client (see `_async_client`), except for the read timeout
+    return httpx.Timeout(30, read=remaining)
+
+
+class ClusterClientManager:
+    """
+    Keeps one pooled kubernetes `ApiClient` per cluster for the life of the
+    process, so warm Lambda invocations reuse TLS connections. Cluster
+    endpoints come from `eks:DescribeCluster` once; the bearer token is read
+    from the token cache on every request. With `api_url` set (a local fake
+    API server or `kubectl proxy`), EKS is bypassed entirely.
+
+    Async callers use `aapply`/`await_rollout`/`adelete`, which talk to the
+    same API server over a pooled httpx client per cluster and event loop, so
+    a rollout wait holds no thread.
+    """
+
+    def __init__(self, token_cache: Optional[EKSTokenCache] = None, api_url: Optional[str] = None,
+                 pool_size: Optional[int] = None):
+        self.api_url = api_url
+        self.tokens = token_cache or (None if api_url else EKSTokenCache())
+        self.pool_size = pool_size or int(os.environ.get("K8S_POOL_SIZE", "8"))
+        self._clients: Dict[str, Any] = {}
+        self._async_clients: Dict[Tuple[str, int], Any] = {}
+        self._lock = threading.Lock()
+
+    def _cluster_endpoint(self, cluster_name: str) -> Tuple[str, Optional[str]]:
+        import boto3
+
+        cluster = boto3.client("eks", region_name=self.tokens.region).describe_cluster(name=cluster_name)["cluster"]
+        ca_file = tempfile.NamedTemporaryFile(prefix=f"{cluster_name}-", suffix=".crt", delete=False)
+        ca_file.write(base64.b64decode(cluster["certificateAuthority"]["data"]))
+        ca_file.close()
+        return cluster["endpoint"], ca_file.name
+
+    def api_client(self, cluster_name: str):
+        with self._lock:
+            client = self._clients.get(cluster_name)
+            if client is None:
+                client = self._clients[cluster_name] = self._build_client(cluster_name)
+            return client
+
+    def _build_client(self, cluster_name: str):
+        from kubernetes import client
+
+        config = client.Configuration()
+        config.connection_pool_maxsize = self.pool_size
+        if self.api_url:
+            config.host = self.api_url
+        else:
+            config.host, config.ssl_ca_cert = self._cluster_endpoint(cluster_name)
+            config.api_key_prefix = {"authorization": "Bearer"}
+            config.api_key = {"authorization": self.tokens.get(cluster_name)}
+            # Called before every request; a no-op until the token nears expiry
+            config.refresh_api_key_hook = lambda c: c.api_key.update(authorization=self.tokens.get(cluster_name))
+        print(f"☸️  New API client for cluster {cluster_name} ({config.host})")
+        return client.ApiClient(config)
+
+    def apply(self, cluster_name: str, manifest: Dict[str, Any]):
+        """Server-side apply of a Deployment; returns the applied object."""
+        from kubernetes import client
+
+        apps = client.AppsV1Api(self.api_client(cluster_name))
+        return apps.patch_namespaced_deployment(
+            manifest["metadata"]["name"],
+            manifest["metadata"]["namespace"],
+            manifest,
+            field_manager=FIELD_MANAGER,
+            force=True,
+            _content_type="application/apply-patch+yaml",
+        )
+
+    def wait_for_rollout(self, cluster_name: str, namespace: str, name: str, timeout: float = 300):
+        """
+        Blocks until the Deployment is rolled out, driven by a watch instead of
+        polling. Returns (ready, deployment).
+        """
+        from kubernetes import client, watch
+        from urllib3.exceptions import ReadTimeoutError
+
+        apps = client.AppsV1Api(self.api_client(cluster_name))
+        selector = f"metadata.name={name}"
+        listed = apps.list_namespaced_deployment(namespace, field_selector=selector)
+        deployment = listed.items[0] if listed.items else None
+        if deployment is not None and rollout_complete(apps.api_client.sanitize_for_serialization(deployment)):
+            return True, deployment
+
+        deadline = time.monotonic() + timeout
+        resource_version = listed.metadata.resource_version
+        while (remaining := deadline - time.monotonic()) > 0:
+            watcher = watch.Watch()
+            try:
+                for event in watcher.stream(apps.list_namespaced_deployment, namespace, field_selector=selector,
+                                            resource_version=resource_version, **_watch_timeouts(remaining)):
+                    deployment = event["object"]
+                    resource_version = deployment.metadata.resource_version
+                    if event["type"] != "DELETED" and rollout_complete(event["raw_object"]):
+                        watcher.stop()
+                        return True, deployment
+            except ReadTimeoutError:
+                break
+        return False, deployment
+
+    def delete(self, cluster_name: str, namespace: str, name: str, timeout: float = 300) -> bool:
+        """
+        Deletes a Deployment with foreground propagation and blocks until it
+        and its pods are gone. Returns False if there was nothing to delete.
+        """
+        from kubernetes import client, watch
+        from kubernetes.client.rest import ApiException
+        from urllib3.exceptions import ReadTimeoutError
+
+        apps = client.AppsV1Api(self.api_client(cluster_name))
+        try:
+            apps.delete_namespaced_deployment(name, namespace, propagation_policy="Foreground")
+        except ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+
+        selector = f"metadata.name={name}"
+        listed = apps.list_namespaced_deployment(namespace, field_selector=selector)
+        if not listed.items:
+            return True
+        deadline = time.monotonic() + timeout
+        resource_version = listed.metadata.resource_version
+        while (remaining := deadline - time.monotonic()) > 0:
+            watcher = watch.Watch()
+            try:
+                for event in watcher.stream(apps.list_namespaced_deployment, namespace, field_selector=selector,
+                                            resource_version=resource_version, **_watch_timeouts(remaining)):
+                    if event["type"] == "DELETED":
+                        watcher.stop()
+                        return True
+                    resource_version = event["object"].metadata.resource_version
+            except ReadTimeoutError:
+                break
+        raise TimeoutError(f"Deployment {namespace}/{name} still terminating after {timeout}s")
+
+    # --- Async ---
+
+    async def _async_client(self, cluster_name: str):
+        import httpx
+        from utils.http_client import HTTP2
+
+        key = (cluster_name, id(asyncio.get_running_loop()))
+        client = self._async_clients.get(key)
+        if client is None or client.is_closed:
+            # The first client for a cluster calls eks:DescribeCluster; keep that off the loop
+            config = (await asyncio.to_thread(self.api_client, cluster_name)).configuration
+            if key in self._async_clients and not self._async_clients[key].is_closed:
+                # Another task created it while this one waited
+                return self._async_clients[key]
+            verify = ssl.create_default_context(cafile=config.ssl_ca_cert) if config.ssl_ca_cert else True
+            # Every in-flight rollout watch holds a connection (or an HTTP/2 stream), so
+            # the cap is on concurrent rollouts, not on the keep-alive pool
+            client = httpx.AsyncClient(
+                base_url=config.host,
+                verify=verify,
+                http2=HTTP2,
+                limits=httpx.Limits(max_connections=ASYNC_MAX_CONNECTIONS, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(30, read=None),
+            )
+            self._async_clients[key] = client
+        return client
+
+    def _auth_headers(self, cluster_name: str) -> Dict[str, str]:
+        if self.api_url:
+            return {}
+        return {"Authorization": f"Bearer {self.tokens.get(cluster_name)}"}
+
+    async def aapply(self, cluster_name: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Async `apply`; returns the applied Deployment as JSON."""
+        client = await self._async_client(cluster_name)
+        metadata = manifest["metadata"]
+        response = await client.patch(
+            f"/apis/apps/v1/namespaces/{metadata['namespace']}/deployments/{metadata['name']}",
+            params={"fieldManager": FIELD_MANAGER, "force": "true"},
+            content=json.dumps(manifest),
+            headers={**self._auth_headers(cluster_name), "Content-Type": "application/apply-patch+yaml"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def await_rollout(self, cluster_name: str, namespace: str, name: str, timeout: float = 300):
+        """Async `wait_for_rollout`, streaming the watch on the event loop. Returns (ready, deployment JSON)."""
+        import httpx
+
+        client = await self._async_client(cluster_name)
+        path = f"/apis/apps/v1/namespaces/{namespace}/deployments"
+        selector = f"metadata.name={name}"
+        response = await client.get(path, params={"fieldSelector": selector}, headers=self._auth_headers(cluster_name))
+        response.raise_for_status()
+        listed = response.json()
+        deployment = listed["items"][0] if listed.get("items") else None
+        if deployment is not None and rollout_complete(deployment):
+            return True, deployment
+
+        deadline = time.monotonic() + timeout
+        resource_version = listed["metadata"]["resourceVersion"]
+        while (remaining := deadline - time.monotonic()) > 0:
+            params = {"fieldSelector": selector, "watch": "true", "resourceVersion": resource_version,
+                      "timeoutSeconds": _watch_timeouts(remaining)["timeout_seconds"]}
+            try:
+                async with client.stream("GET", path, params=params, headers=self._auth_headers(cluster_name),
+                                         timeout=_stream_timeout(remaining)) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event["type"] == "ERROR":
+                            raise RuntimeError(f"Watch of {namespace}/{name} failed: {event['object'].get('message')}")
+                        deployment = event["object"]
+                        resource_version = deployment["metadata"]["resourceVersion"]
+                        if event["type"] != "DELETED" and rollout_complete(deployment):
+                            return True, deployment
+            except httpx.ReadTimeout:
+                break
+        return False, deployment
+
+    async def adelete(self, cluster_name: str, namespace: str, name: str, timeout: float = 300) -> bool:
+        """Async `delete`: returns once the Deployment is gone, False if it didn't exist."""
+        import httpx
+
+        client = await self._async_client(cluster_name)
+        path = f"/apis/apps/v1/namespaces/{namespace}/deployments"
+        response = await client.delete(f"{path}/{name}", params={"propagationPolicy": "Foreground"},
+                                       headers=self._auth_headers(cluster_name))
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+
+        selector = f"metadata.name={name}"
+        response = await client.get(path, params={"fieldSelector": selector}, headers=self._auth_headers(cluster_name))
+        response.raise_for_status()
+        listed = response.json()
+        if not listed.get("items"):
+            return True
+        deadline = time.monotonic() + timeout
+        resource_version = listed["metadata"]["resourceVersion"]
+        while (remaining := deadline - time.monotonic()) > 0:
+            params = {"fieldSelector": selector, "watch": "true", "resourceVersion": resource_version,
+                      "timeoutSeconds": _watch_timeouts(remaining)["timeout_seconds"]}
+            try:
+                async with client.stream("GET", path, params=params, headers=self._auth_headers(cluster_name),
+                                         timeout=_stream_timeout(remaining)) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event["type"] == "ERROR":
+                            raise RuntimeError(f"Watch of {namespace}/{name} failed: {event['object'].get('message')}")
+                        if event["type"] == "DELETED":
+                            return True
+                        resource_version = event["object"]["metadata"]["resourceVersion"]
+            except httpx.ReadTimeout:
+                break
+        raise TimeoutError(f"Deployment {namespace}/{name} still terminating after {timeout}s")
+
+
+_manager: Optional[ClusterClientManager] = None
+
+
+def get_cluster_manager() -> ClusterClientManager:
+    """Process-wide manager, kept across warm invocations."""
+    global _manager
+    if _manager is None:
+        _manager = ClusterClientManager(api_url=os.environ.get("K8S_API_URL"))
+    return _manager
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+DEFAULT_DB_PATH = "/tmp/kube-garden-llm-cache.sqlite"
+
+# "off": no caching; "readwrite": serve hits, store misses;
+# "record": always call the model and store the response;
+# "replay": serve from the cache only, a miss is an error (no network).
+MODES = ("off", "readwrite", "record", "replay")
+
+# Fields that differ between otherwise identical conversations
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    llm_string TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    generations TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class LLMCacheMiss(RuntimeError):
+    pass
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Drops message ids and provider metadata from a serialized chat prompt."""
+    try:
+        messages = json.loads(prompt)
+    except json.JSONDecodeError:
+        return prompt
+    for message in messages if isinstance(messages, list) else []:
+        kwargs = message.get("kwargs") if isinstance(message, dict) else None
+        if isinstance(kwargs, dict):
+            for field in VOLATILE_FIELDS:
+                kwargs.pop(field, None)
+    return json.dumps(messages, sort_keys=True)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """The model and bound tools live in `llm_string`, the conversation in `prompt`."""
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+
+def _serialize(generations: Sequence[Generation]) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message)} if isinstance(g, ChatGeneration) else {"text": g.text}
+        for g in generations
+    ])
+
+
+def _deserialize(raw: str) -> RETURN_VAL_TYPE:
+    return [
+        ChatGeneration(message=messages_from_dict([g["message"]])[0]) if "message" in g else Generation(text=g["text"])
+        for g in json.loads(raw)
+    ]
+
+
+class TieredLLMCache(BaseCache):
+    """
+    LLM response cache with an in-memory LRU in front of a SQLite file, so
+    responses survive restarts and can be shipped to CI for offline replay.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, mode: str = "readwrite", memory_size: int = 256):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _remember(self, key: str, raw: str) -> None:
+        self._memory[key] = raw
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.mode == "record":
+            return None
+        key = cache_key(normalize_prompt(prompt), llm_string)
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is None:
+                row = self.conn.execute("SELECT generations FROM responses WHERE key=?", (key,)).fetchone()
+                raw = row[0] if row else None
+            if raw is not None:
+                self._remember(key, raw)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if raw is None:
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded LLM response for key {key[:12]} (LLM_CACHE_MODE=replay)")
+            return None
+        return _deserialize(raw)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode == "replay":
+            return
+        normalized = normalize_prompt(prompt)
+        key = cache_key(normalized, llm_string)
+        raw = _serialize(return_val)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, normalized, raw, time.time()),
+            )
+            self._remember(key, raw)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            self.conn.execute("DELETE FROM responses")
+
+
+_cache: Optional[TieredLLMCache] = None
+
+
+def llm_cache_mode() -> str:
+    return os.environ.get("LLM_CACHE_MODE", "readwrite")
+
+
+def get_llm_cache() -> Optional[TieredLLMCache]:
+    """Shared cache for the chat models, or None when LLM_CACHE_MODE=off."""
+    global _cache
+    if llm_cache_mode() == "off":
+        return None
+    if _cache is None:
+        _cache = TieredLLMCache(
+            os.environ.get("LLM_CACHE_PATH", DEFAULT_DB_PATH),
+            mode=llm_cache_mode(),
+            memory_size=int(os.environ.get("LLM_CACHE_MEMORY_SIZE", "256")),
+        )
+    return _cache
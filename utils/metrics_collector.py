@@ -0,0 +1,264 @@
+import os
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import Future
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.deployment_tools import lookup_services
+from utils.verification import METRIC_LIMITS, REQUIRED_METRICS, ThresholdPolicy, policy_for_service
+
+# Metrics fetched per rollout, in column order of the health matrix
+SERIES = REQUIRED_METRICS
+
+# (thread_id, service_id, rollout_id)
+Rollout = Tuple[str, str, str]
+
+
+class FakeMetricsSource:
+    """
+    Local stand-in for CloudWatch/Prometheus. About one rollout in five is
+    degraded, decided by a hash of its rollout_id so repeated queries agree.
+    """
+
+    def __init__(self, points: int = 30, seed: int = 0):
+        self.points = points
+        self.seed = seed
+        self.queries = 0
+
+    def query(self, rollouts: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """One multi-series query: {metric: array of shape (len(rollouts), points)}."""
+        self.queries += 1
+        n = len(rollouts)
+        rng = np.random.default_rng([self.seed, self.queries])
+        degraded = np.array([zlib.crc32(rollout_id.encode()) % 5 == 0 for _, rollout_id in rollouts], dtype=bool)[:, None]
+        shape = (n, self.points)
+        return {
+            "avg_latency_ms": np.where(degraded, rng.uniform(200, 500, shape), rng.uniform(20, 100, shape)),
+            "error_rate_percent": np.where(degraded, rng.uniform(2.0, 5.0, shape), rng.uniform(0, 0.5, shape)),
+            "cpu_usage_percent": np.where(degraded, rng.uniform(80, 95, shape), rng.uniform(30, 60, shape)),
+        }
+
+
+class CloudWatchMetricsSource:
+    """
+    Fetches every rollout's series with a single GetMetricData call (up to 500
+    series per call). Metrics are expected under `namespace` with the
+    dimensions Service and Rollout.
+    """
+
+    STATS = {"avg_latency_ms": ("Latency", "Average"), "error_rate_percent": ("ErrorRate", "Average"), "cpu_usage_percent": ("CPUUtilization", "Average")}
+
+    def __init__(self, namespace: str, window_minutes: int = 5, period_seconds: int = 60):
+        import boto3
+
+        self.client = boto3.client("cloudwatch")
+        self.namespace = namespace
+        self.window_minutes = window_minutes
+        self.period_seconds = period_seconds
+
+    def query(self, rollouts: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        from datetime import datetime, timedelta, timezone
+
+        queries = []
+        for i, (service_id, rollout_id) in enumerate(rollouts):
+            for metric, (name, stat) in self.STATS.items():
+                queries.append({
+                    "Id": f"m{i}_{SERIES.index(metric)}",
+                    "MetricStat": {
+                        "Metric": {"Namespace": self.namespace, "MetricName": name, "Dimensions": [
+                            {"Name": "Service", "Value": service_id}, {"Name": "Rollout", "Value": rollout_id}]},
+                        "Period": self.period_seconds,
+                        "Stat": stat,
+                    },
+                })
+
+        end = datetime.now(timezone.utc)
+        results: Dict[str, List[float]] = {}
+        for start in range(0, len(queries), 500):
+            kwargs = {"MetricDataQueries": queries[start:start + 500], "StartTime": end - timedelta(minutes=self.window_minutes), "EndTime": end}
+            while True:
+                response = self.client.get_metric_data(**kwargs)
+                for result in response["MetricDataResults"]:
+                    results.setdefault(result["Id"], []).extend(result["Values"])
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+
+        points = max([len(v) for v in results.values()] + [1])
+        series = {metric: np.full((len(rollouts), points), np.nan) for metric in SERIES}
+        for query_id, values in results.items():
+            i, column = (int(x) for x in query_id[1:].split("_"))
+            series[SERIES[column]][i, :len(values)] = values
+        return series
+
+
+def _finding(metrics: Dict[str, Optional[float]], limits: np.ndarray, column: int) -> Dict[str, Any]:
+    metric = SERIES[column]
+    return {"metric": metric, "value": metrics[metric], "limit": float(limits[column])}
+
+
+def score_rollouts(series: Dict[str, np.ndarray], policies: List[ThresholdPolicy]) -> List[Dict[str, Any]]:
+    """
+    Evaluates all rollouts at once. Produces the same verdict shape as
+    `evaluate_metrics`, plus a `health_score`: the headroom of the tightest
+    metric (1 = idle, 0 = at the limit, negative = over it). A metric with no
+    datapoints is reported as None and makes the rollout borderline, never
+    promoted.
+    """
+    counts = np.stack([np.count_nonzero(~np.isnan(series[metric]), axis=1) for metric in SERIES], axis=1)
+    sums = np.stack([np.nansum(series[metric], axis=1) for metric in SERIES], axis=1)
+    missing = counts == 0
+    values = sums / np.maximum(counts, 1)
+    limits = np.array([[getattr(p, METRIC_LIMITS[metric]) for metric in SERIES] for p in policies], dtype=float)
+    bands = np.array([p.gray_zone_percent / 100 for p in policies])[:, None]
+
+    ratio = values / limits
+    violated = (ratio > 1 + bands) & ~missing
+    borderline = ((ratio >= 1 - bands) | missing) & ~violated
+    # Absent data leaves no headroom
+    health = 1 - np.max(np.where(missing, 1.0, ratio), axis=1)
+
+    verdicts = []
+    for i, policy in enumerate(policies):
+        metrics = {metric: None if missing[i, j] else round(float(values[i, j]), 2) for j, metric in enumerate(SERIES)}
+        violations = [_finding(metrics, limits[i], j) for j in np.flatnonzero(violated[i])]
+        gray = [_finding(metrics, limits[i], j) for j in np.flatnonzero(borderline[i])]
+        verdicts.append({
+            "decision": "rollback" if violations else "borderline" if gray else "promote",
+            "violations": violations,
+            "borderline": gray,
+            "metrics": metrics,
+            "policy": asdict(policy),
+            "health_score": round(float(health[i]), 3),
+        })
+    return verdicts
+
+
+class MetricsCollector:
+    """
+    Background loop that verifies every in-flight rollout together. Each cycle
+    it gathers the rollouts waiting in a verifier step plus those the
+    checkpointer reports as verifying, issues one multi-series query, scores
+    them with NumPy and resolves each waiting verifier's Future.
+    """
+
+    def __init__(self, source=None, cycle_seconds: Optional[float] = None, checkpointer=None):
+        self.source = source or FakeMetricsSource()
+        self.cycle_seconds = cycle_seconds if cycle_seconds is not None else float(os.environ.get("METRICS_CYCLE_SECONDS", "1"))
+        self.checkpointer = checkpointer
+        # Verifying threads idle longer than this are left to the stale-run sweep
+        self.active_ttl_seconds = float(os.environ.get("METRICS_ACTIVE_TTL_SECONDS", "900"))
+        self.max_active = int(os.environ.get("METRICS_MAX_ACTIVE_ROLLOUTS", "500"))
+        self.cycles = 0
+        self._active: Dict[str, Tuple[str, str]] = {}
+        self._waiters: Dict[Rollout, List[Future]] = {}
+        self._latest: Dict[Rollout, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def request(self, thread_id: str, service_id: str, rollout_id: str) -> Future:
+        """Future resolving to the rollout's verdict from the next cycle (or a fresh one from the last)."""
+        key = (thread_id, service_id, rollout_id)
+        future: Future = Future()
+        with self._lock:
+            latest = self._latest.pop(key, None)
+            if latest and time.monotonic() - latest[0] <= self.cycle_seconds:
+                future.set_result(latest[1])
+                return future
+            self._waiters.setdefault(key, []).append(future)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="metrics-collector", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Let verifiers arriving within the cycle join the same query
+            time.sleep(self.cycle_seconds)
+            try:
+                self.collect_once()
+            except Exception:
+                traceback.print_exc()
+            with self._lock:
+                if not self._waiters:
+                    self._wakeup.clear()
+
+    def active_rollouts(self) -> List[Rollout]:
+        """
+        Rollouts the checkpointer reports as being verified recently, capped at
+        `max_active`. A thread's checkpoint is loaded once while it stays verifying.
+        """
+        if not hasattr(self.checkpointer, "active_threads"):
+            return []
+        thread_ids = self.checkpointer.active_threads("verifying", max_age_seconds=self.active_ttl_seconds, limit=self.max_active)
+        active = {}
+        for thread_id in thread_ids:
+            if thread_id not in self._active:
+                saved = self.checkpointer.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+                values = saved.checkpoint["channel_values"] if saved else {}
+                if not (values.get("service_id") and values.get("rollout_id")):
+                    continue
+                self._active[thread_id] = (values["service_id"], values["rollout_id"])
+            active[thread_id] = self._active[thread_id]
+        self._active = active
+        return [(thread_id, service_id, rollout_id) for thread_id, (service_id, rollout_id) in active.items()]
+
+    def collect_once(self) -> int:
+        with self._lock:
+            waiting = dict(self._waiters)
+            self._waiters.clear()
+
+        rollouts = list(dict.fromkeys(list(waiting) + self.active_rollouts()))
+        if not rollouts:
+            return 0
+
+        try:
+            series = self.source.query([(service_id, rollout_id) for _, service_id, rollout_id in rollouts])
+            services = lookup_services([service_id for _, service_id, _ in rollouts])
+            verdicts = score_rollouts(series, [policy_for_service(services.get(s)) for _, s, _ in rollouts])
+        except Exception as e:
+            for futures in waiting.values():
+                for future in futures:
+                    future.set_exception(e)
+            raise
+
+        self.cycles += 1
+        now = time.monotonic()
+        with self._lock:
+            # Verdicts for rollouts nobody waited on yet are kept for one cycle
+            self._latest = {}
+            for rollout, verdict in zip(rollouts, verdicts):
+                if rollout in waiting:
+                    for future in waiting[rollout]:
+                        future.set_result(verdict)
+                else:
+                    self._latest[rollout] = (now, verdict)
+        print(f"📈 Metrics cycle {self.cycles}: {len(rollouts)} rollout(s), {len(waiting)} waiting verifier(s)")
+        return len(rollouts)
+
+
+_collector: Optional[MetricsCollector] = None
+
+
+def get_collector() -> MetricsCollector:
+    global _collector
+    if _collector is None:
+        if os.environ.get("USE_REAL_AWS", "false").lower() == "true":
+            source = CloudWatchMetricsSource(os.environ.get("METRICS_NAMESPACE", "KubeGarden/Rollouts"))
+        else:
+            source = FakeMetricsSource()
+        _collector = MetricsCollector(source)
+    return _collector
+
+
+def attach_checkpointer(checkpointer) -> None:
+    """Lets the collector discover verifying rollouts from the graph's checkpointer."""
+    get_collector().checkpointer = checkpointer
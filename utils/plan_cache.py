@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Bump whenever the plan template in `generate_deployment_plan` or the
+# planning policy changes, so plans built by the old rules are not reused.
+PLAN_POLICY_VERSION = os.environ.get("PLAN_POLICY_VERSION", "2")
+
+
+def plan_key(service: Dict[str, Any], strategy: str) -> str:
+    """Content hash of everything a plan is derived from."""
+    payload = json.dumps(
+        {"service": service, "strategy": strategy, "policy_version": PLAN_POLICY_VERSION},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PlanCache:
+    """
+    LRU cache of deployment plans keyed by `plan_key`. Entries never go stale:
+    changed metadata or a new policy version simply produce a different key.
+    Plans are stored serialized, so callers always get a fresh copy to mutate.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._plans: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                return None
+            self._plans.move_to_end(key)
+        return json.loads(plan)
+
+    def put(self, key: str, plan: Dict[str, Any]) -> None:
+        with self._lock:
+            self._plans[key] = json.dumps(plan)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
+
+
+_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    global _cache
+    if _cache is None:
+        _cache = PlanCache(int(os.environ.get("PLAN_CACHE_SIZE", "256")))
+    return _cache
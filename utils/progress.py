@@ -0,0 +1,107 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+# Graph nodes that produce a progress event. Tool nodes are folded into the
+# *_result event that follows them.
+PROGRESS_NODES = ("planner", "plan_parser", "executor", "execution_result", "verifier", "verifier_result")
+TOOL_NODES = ("planner_tools", "executor_tools", "verifier_tools")
+
+REPLAY_BUFFER_SIZE = 50
+
+_END = object()
+
+
+def _parse_tool_result(content: Any) -> Any:
+    try:
+        return json.loads(content)
+    except (TypeError, ValueError):
+        return content
+
+
+async def stream_progress(agent, inputs: Optional[Dict[str, Any]], config: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the graph and yields one compact event per node transition.
+    Only the per-node updates are inspected, never the full message history.
+    """
+    plan: Dict[str, Any] = {}
+    step_index = 0
+    status = "planning"
+    tool_results: List[Any] = []
+
+    async for chunk in agent.astream(inputs, config=config, stream_mode="updates"):
+        for node, update in chunk.items():
+            update = update or {}
+
+            if node in TOOL_NODES:
+                tool_results = [_parse_tool_result(m.content) for m in update.get("messages", [])]
+                continue
+            if node not in PROGRESS_NODES:
+                continue
+
+            plan = update.get("plan") or plan
+            step_index = update.get("current_step_index", step_index)
+            status = update.get("deployment_status", status)
+
+            steps = plan.get("steps", [])
+            event = {
+                "node": node,
+                "step_index": step_index,
+                "step": steps[step_index]["name"] if step_index < len(steps) else None,
+                "status": status,
+            }
+            if node == "plan_parser" and "plan" in update:
+                event["plan_steps"] = [s["name"] for s in steps]
+            if node in ("execution_result", "verifier_result", "plan_parser") and tool_results:
+                event["tool_result"] = tool_results[0] if len(tool_results) == 1 else tool_results
+                tool_results = []
+            yield event
+
+
+def format_sse(event: Dict[str, Any], event_type: str = "progress") -> str:
+    return f"event: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+
+class ProgressBroker:
+    """
+    Fans progress events of background deployments out to SSE subscribers.
+    Keeps a short replay buffer so late subscribers see recent transitions.
+    """
+
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE):
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=buffer_size))
+        self._subscribers: Dict[str, List[asyncio.Queue]] = defaultdict(list)
+
+    def is_active(self, thread_id: str) -> bool:
+        return thread_id in self._buffers
+
+    def open(self, thread_id: str) -> None:
+        self._buffers[thread_id].clear()
+
+    def publish(self, thread_id: str, event: Dict[str, Any]) -> None:
+        self._buffers[thread_id].append(event)
+        for queue in self._subscribers.get(thread_id, []):
+            queue.put_nowait(event)
+
+    def close(self, thread_id: str) -> None:
+        for queue in self._subscribers.pop(thread_id, []):
+            queue.put_nowait(_END)
+        self._buffers.pop(thread_id, None)
+
+    async def subscribe(self, thread_id: str) -> AsyncIterator[Dict[str, Any]]:
+        if not self.is_active(thread_id):
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self._buffers[thread_id]:
+            queue.put_nowait(event)
+        self._subscribers[thread_id].append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is _END:
+                    return
+                yield event
+        finally:
+            if queue in self._subscribers.get(thread_id, []):
+                self._subscribers[thread_id].remove(queue)
@@ -8,7 +8,7 @@ You have access to the following tools:
 
 **Instructions:**
 1. First, fetch the service metadata using `get_service_metadata` to understand what you are deploying.
-2. Then, generate a deployment plan using `generate_deployment_plan`. You can specify a strategy (canary, blue-green, rolling) based on the user's request or default to 'canary'.
+2. Then, generate a deployment plan using `generate_deployment_plan`. You can specify a strategy (canary, progressive, blue-green, rolling) based on the user's request or default to 'canary'.
 3. Output the plan clearly.
 
 **User Request:**
@@ -16,11 +16,11 @@ You have access to the following tools:
 """
 
 # Metric Analyzer Prompt
+# Only used for borderline metrics; clear-cut cases are decided by utils/verification.py
 METRIC_ANALYZER_PROMPT = """
 You are a Site Reliability Engineer (SRE) Agent responsible for verifying deployments.
 
 You have access to:
-- `get_deployment_metrics`: Fetch current performance metrics.
 - `promote_rollout`: Promote the canary to 100% traffic.
 - `rollback_deployment`: Rollback to the previous version.
 
@@ -28,19 +28,24 @@ You have access to:
 Service: {service_id}
 Rollout ID: {rollout_id}
 
+**Current Metrics:**
+{metrics}
+
+**Thresholds:**
+- **Latency**: Should be under {max_latency_ms}ms (avg).
+- **Error Rate**: Should be under {max_error_rate_percent}%.
+- **CPU**: Should be under {max_cpu_percent}%.
+
+**Borderline Metrics:**
+{borderline}
+
 **Instructions:**
-1. Fetch metrics using `get_deployment_metrics`.
-2. Analyze the metrics:
-   - **Latency**: Should be under 200ms (avg).
-   - **Error Rate**: Should be under 1%.
-   - **CPU**: Should be under 80%.
-3. If metrics are HEALTHY:
+The metrics above are close to their thresholds, so an automatic decision was not made.
+1. Weigh the borderline metrics against the thresholds and the other metrics.
+2. If the canary is HEALTHY enough to serve all traffic:
    - Call `promote_rollout`.
    - Respond with "Verification Successful: Promoting to stable."
-4. If metrics are UNHEALTHY:
+3. Otherwise:
    - Call `rollback_deployment` with a reason.
    - Respond with "Verification Failed: Rolling back due to [Reason]."
-
-**Current Status:**
-Checking metrics for the new version...
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.k8s_clients import deployment_manifest
+
+DEFAULT_DB_PATH = "/tmp/kube-garden-releases.sqlite"
+
+# candidate: deployed, awaiting verification; promoted: last-known-good
+# material; rolled_back: never restored again
+RELEASE_STATUSES = ("candidate", "promoted", "rolled_back")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    service_id TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    rollout_id TEXT NOT NULL,
+    image_tag TEXT NOT NULL,
+    manifest_digest TEXT NOT NULL,
+    manifest TEXT NOT NULL,
+    current_version TEXT,
+    status TEXT NOT NULL,
+    deployed_at REAL NOT NULL,
+    promoted_at REAL
+);
+CREATE INDEX IF NOT EXISTS releases_service ON releases (service_id, namespace, status, promoted_at);
+CREATE INDEX IF NOT EXISTS releases_rollout ON releases (service_id, rollout_id);
+"""
+
+COLUMNS = ("id", "service_id", "namespace", "rollout_id", "image_tag", "manifest_digest", "manifest",
+           "current_version", "status", "deployed_at", "promoted_at")
+
+
+def manifest_digest(manifest: Dict[str, Any]) -> str:
+    return "sha256:" + hashlib.sha256(json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def stable_manifest(service: Dict[str, Any], image_tag: str) -> Dict[str, Any]:
+    """The stable Deployment a promotion of `image_tag` leaves running; what a rollback re-applies."""
+    return deployment_manifest(service, service["id"], image_tag, "promoted")
+
+
+class ReleaseLedger:
+    """
+    Per-service release history, indexed by service and namespace. Every
+    rollout is staged as a candidate with the stable manifest it would become;
+    `promote` marks it last-known-good, so a rollback can re-apply the snapshot
+    without asking the cluster or CI what was running before.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def stage(self, service: Dict[str, Any], rollout_id: str, image_tag: str) -> None:
+        manifest = stable_manifest(service, image_tag)
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO releases (service_id, namespace, rollout_id, image_tag, manifest_digest, manifest, "
+                "current_version, status, deployed_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'candidate', ?)",
+                (service["id"], service.get("namespace", "default"), rollout_id, image_tag,
+                 manifest_digest(manifest), json.dumps(manifest), service.get("current_version"), time.time()),
+            )
+
+    def release(self, service_id: str, rollout_id: str) -> Optional[Dict[str, Any]]:
+        """The staged release of a rollout, whatever its status. None if it was never staged."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM releases WHERE service_id=? AND rollout_id=? "
+                "ORDER BY id DESC LIMIT 1",
+                (service_id, rollout_id),
+            ).fetchone()
+        return self._release(row) if row else None
+
+    def promote(self, service_id: str, rollout_id: str) -> Optional[Dict[str, Any]]:
+        """Marks a staged rollout last-known-good. None if it was never staged."""
+        return self._set_status(service_id, rollout_id, "promoted", promoted_at=time.time())
+
+    def mark_rolled_back(self, service_id: str, rollout_id: str) -> Optional[Dict[str, Any]]:
+        return self._set_status(service_id, rollout_id, "rolled_back")
+
+    def _set_status(self, service_id: str, rollout_id: str, status: str,
+                    promoted_at: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM releases WHERE service_id=? AND rollout_id=? "
+                "ORDER BY id DESC LIMIT 1",
+                (service_id, rollout_id),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE releases SET status=?, promoted_at=COALESCE(?, promoted_at) WHERE id=?",
+                (status, promoted_at, row[0]),
+            )
+        return self._release(row, status=status)
+
+    def last_known_good(self, service_id: str, namespace: str) -> Optional[Dict[str, Any]]:
+        """Most recently promoted release that hasn't been rolled back since."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM releases WHERE service_id=? AND namespace=? AND status='promoted' "
+                "ORDER BY promoted_at DESC, id DESC LIMIT 1",
+                (service_id, namespace),
+            ).fetchone()
+        return self._release(row) if row else None
+
+    def history(self, service_id: str, namespace: str, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM releases WHERE service_id=? AND namespace=? ORDER BY id DESC LIMIT ?",
+                (service_id, namespace, limit),
+            ).fetchall()
+        return [self._release(row) for row in rows]
+
+    @staticmethod
+    def _release(row: tuple, **overrides: Any) -> Dict[str, Any]:
+        release = dict(zip(COLUMNS, row))
+        release["manifest"] = json.loads(release["manifest"])
+        release.update(overrides)
+        return release
+
+
+_ledger: Optional[ReleaseLedger] = None
+
+
+def get_release_ledger() -> ReleaseLedger:
+    global _ledger
+    if _ledger is None:
+        _ledger = ReleaseLedger(os.environ.get("RELEASE_LEDGER_PATH", DEFAULT_DB_PATH))
+    return _ledger
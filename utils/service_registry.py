@@ -0,0 +1,218 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_DB_PATH = "/tmp/kube-garden-services.sqlite"
+SQLITE_MAX_PARAMS = 500  # bound parameters per IN (...) lookup
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    id TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    seeded INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS services_namespace ON services (namespace);
+CREATE INDEX IF NOT EXISTS services_type ON services (type);
+"""
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small LRU cache whose entries also expire after `ttl_seconds`.
+    """
+
+    def __init__(self, max_size: int = 512, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return _MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+class ServiceRegistry:
+    """
+    Service catalog backed by SQLite (indexed by id, namespace and type) with
+    an in-process LRU+TTL cache in front of id lookups. Unknown ids are cached
+    too, so repeated misses don't hit the store.
+
+    Rows written by `seed` are owned by the seed and follow it; rows written
+    by `upsert` are never touched by a later seed.
+
+    Returned entries are shared with the cache; treat them as read-only.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, *, cache_size: int = 512, cache_ttl_seconds: float = 300):
+        self.path = path
+        self.cache = TTLCache(cache_size, cache_ttl_seconds)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(services)")}
+        if "seeded" not in columns:
+            # Databases created before ownership was tracked were only ever written by the seed
+            self.conn.execute("ALTER TABLE services ADD COLUMN seeded INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE services SET seeded=1")
+
+    # --- Reads ---
+
+    def get(self, service_id: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(service_id)
+        if cached is not _MISSING:
+            return cached
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM services WHERE id=?", (service_id,)).fetchone()
+        service = json.loads(row[0]) if row else None
+        self.cache.set(service_id, service)
+        return service
+
+    def get_many(self, service_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Bulk lookup: cache hits first, then one query per SQLITE_MAX_PARAMS misses."""
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        misses: List[str] = []
+        for service_id in service_ids:
+            cached = self.cache.get(service_id)
+            if cached is _MISSING:
+                misses.append(service_id)
+            else:
+                results[service_id] = cached
+
+        if misses:
+            found = {}
+            with self._lock:
+                for i in range(0, len(misses), SQLITE_MAX_PARAMS):
+                    chunk = misses[i:i + SQLITE_MAX_PARAMS]
+                    placeholders = ", ".join("?" for _ in chunk)
+                    rows = self.conn.execute(f"SELECT id, data FROM services WHERE id IN ({placeholders})", chunk).fetchall()
+                    found.update((service_id, json.loads(data)) for service_id, data in rows)
+            for service_id in misses:
+                results[service_id] = found.get(service_id)
+                self.cache.set(service_id, results[service_id])
+        return results
+
+    def list_by_namespace(self, namespace: str) -> List[Dict[str, Any]]:
+        return self._query("SELECT data FROM services WHERE namespace=? ORDER BY id", (namespace,))
+
+    def list_by_type(self, service_type: str) -> List[Dict[str, Any]]:
+        return self._query("SELECT data FROM services WHERE type=? ORDER BY id", (service_type,))
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # --- Writes ---
+
+    def upsert(self, service: Dict[str, Any], overwrite: bool = True) -> None:
+        """Writes a service; an overwritten seed entry is no longer owned by the seed."""
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        with self._lock:
+            self.conn.execute(
+                f"{verb} INTO services (id, namespace, type, data, updated_at, seeded) VALUES (?, ?, ?, ?, ?, 0)",
+                _row(service),
+            )
+        self.invalidate(service["id"])
+
+    def seed(self, services: Iterable[Dict[str, Any]]) -> None:
+        """
+        Brings the seed-owned rows in line with `services`: adds new ones,
+        refreshes changed ones and drops those no longer in the seed.
+        Services written through `upsert` are left alone.
+        """
+        services = list(services)
+        seed_ids = {service["id"] for service in services}
+        with self._lock:
+            for service in services:
+                self.conn.execute(
+                    "INSERT INTO services (id, namespace, type, data, updated_at, seeded) VALUES (?, ?, ?, ?, ?, 1) "
+                    "ON CONFLICT (id) DO UPDATE SET namespace=excluded.namespace, type=excluded.type, "
+                    "data=excluded.data, updated_at=excluded.updated_at "
+                    "WHERE services.seeded=1 AND services.data != excluded.data",
+                    _row(service),
+                )
+            stale = [row[0] for row in self.conn.execute("SELECT id FROM services WHERE seeded=1")
+                     if row[0] not in seed_ids]
+            for i in range(0, len(stale), SQLITE_MAX_PARAMS):
+                chunk = stale[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ", ".join("?" for _ in chunk)
+                self.conn.execute(f"DELETE FROM services WHERE id IN ({placeholders})", chunk)
+        self.invalidate()
+
+    def delete(self, service_id: str) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM services WHERE id=?", (service_id,))
+        self.invalidate(service_id)
+
+    def invalidate(self, service_id: Optional[str] = None) -> None:
+        """Drops one cached entry, or the whole cache if no id is given."""
+        self.cache.invalidate(service_id)
+
+
+def _row(service: Dict[str, Any]) -> tuple:
+    return (service["id"], service.get("namespace", "default"), service.get("type", "backend"),
+            json.dumps(service, sort_keys=True), time.time())
+
+
+_registry: Optional[ServiceRegistry] = None
+
+
+def get_registry() -> ServiceRegistry:
+    """
+    Shared registry. Seeded from SERVICE_REGISTRY_SEED (a JSON list or
+    id -> service mapping) or the built-in mock services on every start, so
+    seed-owned entries follow the current seed; entries written with
+    `upsert` are never overwritten by it.
+    """
+    global _registry
+    if _registry is None:
+        registry = ServiceRegistry(
+            os.environ.get("SERVICE_REGISTRY_PATH", DEFAULT_DB_PATH),
+            cache_size=int(os.environ.get("SERVICE_REGISTRY_CACHE_SIZE", "512")),
+            cache_ttl_seconds=float(os.environ.get("SERVICE_REGISTRY_CACHE_TTL", "300")),
+        )
+        seed_path = os.environ.get("SERVICE_REGISTRY_SEED")
+        if seed_path:
+            with open(seed_path) as f:
+                seed = json.load(f)
+        else:
+            from utils.deployment_tools import MOCK_SERVICES
+            seed = MOCK_SERVICES
+        registry.seed(seed.values() if isinstance(seed, dict) else seed)
+        _registry = registry
+    return _registry
@@ -0,0 +1,168 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_TRACKED_DEPLOYMENTS = 1000
+
+_lock = threading.Lock()
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        # label values -> (bucket counts, sum, count)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with _lock:
+            entry = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {bucket_count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return "\n".join(lines)
+
+
+NODE_DURATION = Histogram("kube_garden_node_duration_seconds", "Time spent in each graph node.", ["node"])
+TOOL_DURATION = Histogram("kube_garden_tool_duration_seconds", "Time spent in each deployment tool.", ["tool", "outcome"])
+LLM_DURATION = Histogram("kube_garden_llm_duration_seconds", "Latency of LLM calls.", ["model"])
+LLM_TOKENS = Counter("kube_garden_llm_tokens_total", "LLM tokens used.", ["model", "kind"])
+DEPLOYMENTS = Counter("kube_garden_deployments_total", "Finished deployments by final status.", ["status"])
+PLAN_CACHE = Counter("kube_garden_plan_cache_total", "Planner plan cache lookups (hits in llm mode are saved LLM calls).", ["result", "planning_mode"])
+ARTIFACT_REUSE = Counter("kube_garden_artifact_reuse_total", "CI steps skipped because the commit was already built.", ["step"])
+TIME_TO_RECOVERY = Histogram("kube_garden_time_to_recovery_seconds", "Time from rollback start until the last-known-good release is ready.", ["outcome"])
+
+REGISTRY = [NODE_DURATION, TOOL_DURATION, LLM_DURATION, LLM_TOKENS, DEPLOYMENTS, PLAN_CACHE, ARTIFACT_REUSE, TIME_TO_RECOVERY]
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# --- Per-deployment breakdown ---
+
+_deployments: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _breakdown(thread_id: str) -> Dict[str, Any]:
+    entry = _deployments.get(thread_id)
+    if entry is None:
+        entry = {"total_seconds": 0.0, "nodes": {}, "tools": {}, "llm": {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}}
+        _deployments[thread_id] = entry
+        while len(_deployments) > MAX_TRACKED_DEPLOYMENTS:
+            _deployments.popitem(last=False)
+    return entry
+
+
+def record_timing(thread_id: Optional[str], kind: str, name: str, seconds: float) -> None:
+    if not thread_id:
+        return
+    with _lock:
+        stats = _breakdown(thread_id)[kind].setdefault(name, {"count": 0, "seconds": 0.0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+
+
+def record_llm_call(thread_id: Optional[str], seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+    if not thread_id:
+        return
+    with _lock:
+        llm = _breakdown(thread_id)["llm"]
+        llm["calls"] += 1
+        llm["seconds"] += seconds
+        llm["prompt_tokens"] += prompt_tokens
+        llm["completion_tokens"] += completion_tokens
+
+
+def record_deployment(thread_id: str, status: str, seconds: float) -> None:
+    DEPLOYMENTS.inc(status=status)
+    with _lock:
+        _breakdown(thread_id)["total_seconds"] += seconds
+
+
+def deployment_timings(thread_id: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        entry = _deployments.get(thread_id)
+        return {k: (dict(v) if isinstance(v, dict) else v) for k, v in entry.items()} if entry else None
+
+
+def _thread_id(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """
+    Wraps a graph node so every run is timed into NODE_DURATION and the
+    deployment's breakdown.
+    """
+    # Not functools.wraps: LangGraph inspects the wrapper's own signature to pass `config`
+    takes_config = "config" in inspect.signature(node).parameters
+
+    if inspect.iscoroutinefunction(node):
+        async def async_wrapper(state, config):
+            start = time.perf_counter()
+            try:
+                return await (node(state, config) if takes_config else node(state))
+            finally:
+                elapsed = time.perf_counter() - start
+                NODE_DURATION.observe(elapsed, node=name)
+                record_timing(_thread_id(config), "nodes", name, elapsed)
+        async_wrapper.__name__ = node.__name__
+        return async_wrapper
+
+    def wrapper(state, config):
+        start = time.perf_counter()
+        try:
+            return node(state, config) if takes_config else node(state)
+        finally:
+            elapsed = time.perf_counter() - start
+            NODE_DURATION.observe(elapsed, node=name)
+            record_timing(_thread_id(config), "nodes", name, elapsed)
+    wrapper.__name__ = node.__name__
+    return wrapper
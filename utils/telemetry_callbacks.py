@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.telemetry import (
+    LLM_DURATION,
+    LLM_TOKENS,
+    TOOL_DURATION,
+    record_llm_call,
+    record_timing,
+)
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Times every tool and LLM call of a graph run and records token usage.
+    LangGraph copies `thread_id` into the callback metadata, which is used to
+    attribute each call to its deployment.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # run_id -> (start time, name, thread_id)
+        self._runs: Dict[UUID, Tuple[float, str, Optional[str]]] = {}
+
+    def _start(self, run_id: UUID, name: str, metadata: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), name, (metadata or {}).get("thread_id"))
+
+    def _finish(self, run_id: UUID):
+        with self._lock:
+            start, name, thread_id = self._runs.pop(run_id, (None, None, None))
+        if start is None:
+            return None, None, None
+        return time.perf_counter() - start, name, thread_id
+
+    # --- Tools ---
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name", "unknown"), metadata)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record_tool(run_id, "success")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record_tool(run_id, "error")
+
+    def _record_tool(self, run_id: UUID, outcome: str) -> None:
+        elapsed, name, thread_id = self._finish(run_id)
+        if elapsed is None:
+            return
+        TOOL_DURATION.observe(elapsed, tool=name, outcome=outcome)
+        record_timing(thread_id, "tools", name, elapsed)
+
+    # --- LLMs ---
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (metadata or {}).get("ls_model_name", "unknown")
+        self._start(run_id, model, metadata)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        elapsed, model, thread_id = self._finish(run_id)
+        if elapsed is None:
+            return
+
+        prompt_tokens, completion_tokens = _token_usage(response)
+        LLM_DURATION.observe(elapsed, model=model)
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        record_llm_call(thread_id, elapsed, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+_handler: Optional[TelemetryCallbackHandler] = None
+
+
+def get_callback_handler() -> TelemetryCallbackHandler:
+    global _handler
+    if _handler is None:
+        _handler = TelemetryCallbackHandler()
+    return _handler
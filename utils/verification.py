@@ -0,0 +1,127 @@
+import os
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class ThresholdPolicy:
+    """
+    Health thresholds for canary verification.
+    A metric within `gray_zone_percent` of its limit (on either side) is
+    borderline and is handed to the LLM instead of being decided by rule.
+    """
+    max_latency_ms: float = 200
+    max_p99_latency_ms: float = 500
+    max_error_rate_percent: float = 1.0
+    max_cpu_percent: float = 80
+    gray_zone_percent: float = float(os.environ.get("VERIFIER_GRAY_ZONE_PERCENT", "10"))
+
+    @classmethod
+    def from_dict(cls, overrides: Optional[Dict[str, Any]]) -> "ThresholdPolicy":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (overrides or {}).items() if k in known})
+
+
+# Metric name -> policy attribute holding its upper limit
+METRIC_LIMITS = {
+    "avg_latency_ms": "max_latency_ms",
+    "p99_latency_ms": "max_p99_latency_ms",
+    "error_rate_percent": "max_error_rate_percent",
+    "cpu_usage_percent": "max_cpu_percent",
+}
+
+# Reported by every metrics source; without one of them a rollout is never promoted.
+# p99 latency only comes from progressive canary windows and is checked when present.
+REQUIRED_METRICS = ("avg_latency_ms", "error_rate_percent", "cpu_usage_percent")
+
+
+def policy_for_service(service: Optional[Dict[str, Any]]) -> ThresholdPolicy:
+    """
+    Default policy, overridden by the service's `verification_policy` metadata.
+    """
+    return ThresholdPolicy.from_dict((service or {}).get("verification_policy"))
+
+
+def evaluate_metrics(metrics: Dict[str, Any], policy: ThresholdPolicy) -> Dict[str, Any]:
+    """
+    Compares metrics against the policy and returns a structured verdict.
+    `decision` is "promote", "rollback" or "borderline". A required metric
+    that is missing (or None) is borderline, like in the metrics collector.
+    """
+    violations = []
+    borderline = []
+    band = policy.gray_zone_percent / 100
+
+    for metric, limit_attr in METRIC_LIMITS.items():
+        value = metrics.get(metric)
+        limit = getattr(policy, limit_attr)
+        finding = {"metric": metric, "value": value, "limit": limit}
+
+        if value is None:
+            if metric in REQUIRED_METRICS:
+                borderline.append(finding)
+        elif value > limit * (1 + band):
+            violations.append(finding)
+        elif value >= limit * (1 - band):
+            borderline.append(finding)
+
+    if violations:
+        decision = "rollback"
+    elif borderline:
+        decision = "borderline"
+    else:
+        decision = "promote"
+
+    return {
+        "decision": decision,
+        "violations": violations,
+        "borderline": borderline,
+        "metrics": metrics,
+        "policy": asdict(policy),
+    }
+
+
+def describe_findings(findings) -> str:
+    return ", ".join(f"{f['metric']}={f['value']} (limit {f['limit']})" for f in findings)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(min(rank, len(ordered))) - 1]
+
+
+class RollingWindow:
+    """
+    Streaming aggregate of canary samples: latencies of the most recent
+    `max_latencies` requests, error ratio and CPU over the whole window.
+    A sample is {"latencies_ms": [...], "requests": n, "errors": n, "cpu_usage_percent": x}.
+    """
+
+    def __init__(self, max_latencies: int = 2000):
+        self.latencies = deque(maxlen=max_latencies)
+        self.cpu = deque(maxlen=10)
+        self.requests = 0
+        self.errors = 0
+
+    def add(self, sample: Dict[str, Any]) -> None:
+        self.latencies.extend(sample.get("latencies_ms", []))
+        self.requests += sample.get("requests", 0)
+        self.errors += sample.get("errors", 0)
+        if "cpu_usage_percent" in sample:
+            self.cpu.append(sample["cpu_usage_percent"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = list(self.latencies)
+        return {
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            "p50_latency_ms": round(percentile(latencies, 50), 1),
+            "p99_latency_ms": round(percentile(latencies, 99), 1),
+            "error_rate_percent": round(100 * self.errors / self.requests, 2) if self.requests else 0.0,
+            "cpu_usage_percent": round(sum(self.cpu) / len(self.cpu), 1) if self.cpu else 0.0,
+            "requests": self.requests,
+        }